@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# SPDX-License-Identifier: LGPL-2.0-or-later
+"""
+Measures latency of reading clipboard data after a change with 4 and 20
+configured formats.
+
+Uses Qt clipboard by default (works with QT_QPA_PLATFORM=offscreen). With
+--wayland, uses Wayland clipboard access (data-control or wl-paste) and reads
+current clipboard content, so copy some text or image first.
+
+Usage:
+
+    uv run python benchmarks/clipboard_formats.py [--changes 20] [--wayland]
+"""
+
+import argparse
+import sys
+import time
+
+from PySide6.QtCore import QEventLoop, QMimeData
+from PySide6.QtGui import QGuiApplication
+
+import infinitecopy.MimeFormats as formats
+from infinitecopy.Clipboard import Clipboard
+from infinitecopy.ClipboardFactory import ClipboardConfig
+from infinitecopy.WaylandClipboard import WaylandClipboard
+
+EXTRA_FORMATS = [
+    "text/uri-list",
+    "text/rtf",
+    "text/markdown",
+    "text/csv",
+    "text/x-moz-url",
+    "image/jpeg",
+    "image/gif",
+    "image/bmp",
+    "image/webp",
+    "image/tiff",
+    "application/json",
+    "application/pdf",
+    "application/x-qt-image",
+    "application/vnd.oasis.opendocument.text",
+    "x-special/gnome-copied-files",
+    "chromium/x-web-custom-data",
+]
+
+
+def setQtClipboard():
+    mimeData = QMimeData()
+    mimeData.setData(formats.mimeText, b"text " * 1000)
+    mimeData.setData(formats.mimeHtml, b"<b>html</b> " * 1000)
+    mimeData.setData(formats.mimePng, b"\x89PNG" * 10000)
+    QGuiApplication.clipboard().setMimeData(mimeData)
+
+
+def readChange(clipboard):
+    loop = QEventLoop()
+    result = []
+
+    def onChanged(data):
+        result.append(data)
+        loop.quit()
+
+    clipboard.changed.connect(onChanged)
+    clipboard.onClipboardChangedAfterDelay()
+    if not result:
+        loop.exec()
+    clipboard.changed.disconnect(onChanged)
+    return result[0]
+
+
+def run(formats_, changes, wayland):
+    config = ClipboardConfig()
+    config.formats = formats_
+    clipboard = WaylandClipboard(config) if wayland else Clipboard(config)
+
+    latencies = []
+    for _ in range(changes):
+        start = time.perf_counter()
+        data = readChange(clipboard)
+        latencies.append(time.perf_counter() - start)
+
+    if wayland:
+        clipboard.onAboutToQuit()
+    return latencies, len(data) - 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--changes", type=int, default=20)
+    parser.add_argument("--wayland", action="store_true")
+    args = parser.parse_args()
+
+    _app = QGuiApplication(sys.argv)
+    if not args.wayland:
+        setQtClipboard()
+
+    print(f"{'formats':<8} {'read':>5} {'avg ms':>10} {'max ms':>10}")
+    for formats_ in (
+        ClipboardConfig.formats,
+        ClipboardConfig.formats + EXTRA_FORMATS,
+    ):
+        latencies, count = run(formats_, args.changes, args.wayland)
+        print(
+            f"{len(formats_):<8} {count:>5}"
+            f" {sum(latencies) * 1000 / len(latencies):>10.3f}"
+            f" {max(latencies) * 1000:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
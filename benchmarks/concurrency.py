@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# SPDX-License-Identifier: LGPL-2.0-or-later
+"""
+Compares insert latency and reading from a separate connection while items
+are added with the default SQLite options and with the storage configuration.
+
+Usage:
+
+    uv run python benchmarks/concurrency.py [--items 1000]
+"""
+
+import argparse
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from database import withModel
+from PySide6.QtCore import QByteArray, QCoreApplication
+from PySide6.QtSql import QSqlDatabase, QSqlQuery
+
+import infinitecopy.MimeFormats as formats
+from infinitecopy.Storage import StorageConfig
+
+
+class DefaultStorageConfig(StorageConfig):
+    journalMode = None
+    synchronous = None
+    cacheSizeKiB = None
+    mmapSize = None
+    tempStore = None
+    autoVacuum = None
+
+
+def read(path, stop, latencies):
+    name = f"{path}-reader"
+    db = QSqlDatabase.addDatabase("QSQLITE", name)
+    db.setDatabaseName(path)
+    db.setConnectOptions(f"QSQLITE_BUSY_TIMEOUT={StorageConfig.busyTimeoutMs}")
+    if not db.open():
+        raise SystemExit(db.lastError().text())
+
+    query = QSqlQuery(db)
+    query.prepare("SELECT count(), max(id) FROM item;")
+    while not stop.is_set():
+        start = time.perf_counter()
+        if query.exec():
+            query.next()
+        query.finish()
+        latencies.append(time.perf_counter() - start)
+
+    del query
+    db.close()
+    del db
+    QSqlDatabase.removeDatabase(name)
+
+
+def insertItems(model, count, path, config):
+    model.storageConfig = config
+    model.create()
+
+    stop = threading.Event()
+    latencies = []
+    reader = threading.Thread(target=read, args=(path, stop, latencies))
+    reader.start()
+
+    start = time.perf_counter()
+    for i in range(count):
+        text = f"item {i} " * 100
+        model.addItemNoEmpty({formats.mimeText: QByteArray(text.encode("utf-8"))})
+    insertTime = time.perf_counter() - start
+
+    stop.set()
+    reader.join()
+    return insertTime, latencies
+
+
+def run(count, path, config):
+    return withModel(path, lambda model: insertItems(model, count, path, config))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=1000)
+    args = parser.parse_args()
+
+    _app = QCoreApplication(sys.argv)
+
+    print(f"{'options':<10} {'insert ms':>10} {'reads/s':>10} {'max read ms':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, config in (
+            ("default", DefaultStorageConfig),
+            ("tuned", StorageConfig),
+        ):
+            path = str(Path(tmp, f"items-{name}.sql"))
+            insertTime, latencies = run(args.items, path, config)
+            print(
+                f"{name:<10}"
+                f" {insertTime * 1000 / args.items:>10.3f}"
+                f" {len(latencies) / insertTime:>10.0f}"
+                f" {max(latencies) * 1000:>12.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+"""Database setup shared by the benchmarks."""
+
+from PySide6.QtSql import QSqlDatabase
+
+from infinitecopy.ClipboardItemModel import ClipboardItemModel
+
+
+def withModel(path, fn):
+    """
+    Calls the function with a model for a new database connection and
+    returns its result.
+
+    The connection is closed afterwards, so the function must not keep
+    references to the model.
+    """
+    db = QSqlDatabase.addDatabase("QSQLITE", path)
+    db.setDatabaseName(path)
+    if not db.open():
+        raise SystemExit(db.lastError().text())
+
+    try:
+        model = ClipboardItemModel(db)
+        result = fn(model)
+        model.finishQueries()
+        del model
+        return result
+    finally:
+        db.close()
+        del db
+        QSqlDatabase.removeDatabase(path)
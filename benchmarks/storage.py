@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# SPDX-License-Identifier: LGPL-2.0-or-later
+"""
+Compares database size and insert/read latency of a synthetic item history
+with and without compression of item data.
+
+Usage:
+
+    uv run python benchmarks/storage.py [--items 2000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from database import withModel
+from PySide6.QtCore import QByteArray, QCoreApplication
+
+import infinitecopy.MimeFormats as formats
+
+WORDS = (
+    "clipboard history item text html image copy paste selection format"
+    " window database storage compression benchmark latency size"
+).split()
+
+
+def randomText(rnd, size):
+    words = []
+    length = 0
+    while length < size:
+        word = rnd.choice(WORDS)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)
+
+
+def syntheticItem(rnd, i):
+    kind = i % 4
+    text = randomText(rnd, rnd.randint(100, 50000))
+    if kind == 0:
+        return {formats.mimeText: text}
+    if kind == 1:
+        html = "".join(
+            f"<p class='c{n}'>{randomText(rnd, 200)}</p>\n"
+            for n in range(rnd.randint(20, 500))
+        )
+        return {formats.mimeText: text, formats.mimeHtml: html}
+    if kind == 2:
+        svg = "".join(
+            f"<rect x='{n}' y='{n}' width='10' height='10'/>\n"
+            for n in range(rnd.randint(100, 1000))
+        )
+        return {formats.mimeSvg: f"<svg>{svg}</svg>"}
+    # Image data does not compress.
+    return {formats.mimePng: os.urandom(rnd.randint(50000, 500000))}
+
+
+def measure(model, items, compress):
+    if not compress:
+        model.codecConfig.minSize = None
+    model.create()
+
+    start = time.perf_counter()
+    for data in items:
+        model.addItemNoEmpty(
+            {
+                format_: QByteArray(value.encode("utf-8"))
+                if isinstance(value, str)
+                else QByteArray(value)
+                for format_, value in data.items()
+            }
+        )
+    insertTime = time.perf_counter() - start
+
+    while model.canFetchMore(model.index(-1)):
+        model.fetchMore(model.index(-1))
+
+    start = time.perf_counter()
+    for row in range(model.rowCount()):
+        model.rowData(row)
+    readTime = time.perf_counter() - start
+
+    return model.databaseSize(), insertTime, readTime
+
+
+def run(items, path, compress):
+    return withModel(path, lambda model: measure(model, items, compress))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    _app = QCoreApplication(sys.argv)
+    rnd = random.Random(args.seed)
+    items = [syntheticItem(rnd, i) for i in range(args.items)]
+
+    print(f"{'compression':<12} {'size MiB':>10} {'insert ms':>10} {'read ms':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for compress in (False, True):
+            path = str(Path(tmp, f"items-{compress}.sql"))
+            size, insertTime, readTime = run(items, path, compress)
+            print(
+                f"{'on' if compress else 'off':<12}"
+                f" {size / 2**20:>10.1f}"
+                f" {insertTime * 1000 / len(items):>10.3f}"
+                f" {readTime * 1000 / len(items):>10.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -12,8 +12,10 @@ from infinitecopy.ClipboardItemModelImageProvider import (
     ClipboardItemModelImageProvider,
 )
 from infinitecopy.CommandHandler import CommandHandler
+from infinitecopy.ItemWriter import ItemWriter
 from infinitecopy.PluginManager import PluginManager
 from infinitecopy.Server import Server
+from infinitecopy.Storage import StorageMaintenance
 
 logger = logging.getLogger(__name__)
 
@@ -35,7 +37,7 @@ def pasterIfAvailable():
 
 class Application:
     def __init__(self, *, dbPath, serverName, enable_pasting, args):
-        self.app = QGuiApplication(args)
+        self.app = QGuiApplication.instance() or QGuiApplication(args)
         self.app.quitOnLastWindowClosed = False
 
         self.server = Server()
@@ -53,12 +55,26 @@ class Application:
         self.clipboardItemModel = ClipboardItemModel(self.db)
         self.clipboardItemModel.create()
 
+        self.itemWriter = ItemWriter(dbPath)
+        self.itemWriter.itemsWritten.connect(self.clipboardItemModel.insertItems)
+        self.itemWriter.itemsRemoved.connect(self.clipboardItemModel.forgetItems)
+        self.app.aboutToQuit.connect(self.itemWriter.stop)
+        self.itemWriter.start()
+
+        self.storageMaintenance = StorageMaintenance(
+            self.itemWriter.requestMaintenance, self.clipboardItemModel.storageConfig
+        )
+        self.view.visibleChanged.connect(
+            lambda visible: self.storageMaintenance.setIdle(not visible)
+        )
+
         self.clipboard = createClipboard()
 
         self.engine = self.view.engine()
 
         self.imageProvider = ClipboardItemModelImageProvider(self.clipboardItemModel)
         self.engine.addImageProvider("items", self.imageProvider)
+        self.app.aboutToQuit.connect(self.imageProvider.waitForDone)
 
         self.context = self.view.rootContext()
         self.context.setContextProperty("clipboardItemModel", self.clipboardItemModel)
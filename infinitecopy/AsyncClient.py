@@ -0,0 +1,332 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+"""
+Client for Python services using asyncio instead of Qt.
+
+Example:
+
+    async with AsyncClient() as client:
+        await client.request("add", "text")
+        async for chunk in client.stream("export"):
+            ...
+"""
+
+import asyncio
+import logging
+import os
+from collections import deque
+
+from infinitecopy.protocol import (
+    MESSAGE_HEADER,
+    PROTOCOL_VERSION,
+    MessageId,
+    encodeMessageHeader,
+    serverName,
+    socketPath,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONNECTIONS = 4
+
+# Received output chunks per request waiting to be consumed. Receiving more
+# output waits for the consumer, unless other requests wait for a response on
+# the same connection, in which case the slow request fails instead.
+MAX_QUEUED_CHUNKS = 16
+
+
+# Server closes the connection after responding to these commands.
+CLOSING_COMMANDS = ("quit",)
+
+
+def defaultServerName():
+    return serverName(os.getenv("INFINITECOPY_SESSION"))
+
+
+class ClientError(RuntimeError):
+    def __init__(self, message, exit_code=None):
+        super().__init__(message)
+        self.exit_code = exit_code
+
+
+class Response:
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.output = bytearray()
+        self.error = None
+        self.exit_code = 0
+
+
+class AsyncConnection:
+    """
+    Single connection to the application.
+
+    Requests can be sent concurrently; they are pipelined and the responses
+    are received in the same order.
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.last_request_id = 0
+        # Output queues of requests waiting for response.
+        self.pending = deque()
+        # Output queues no longer consumed.
+        self.abandoned = set()
+        self.requestSent = asyncio.Event()
+        self.error = None
+        self.task = None
+
+    @classmethod
+    async def open(cls, serverName=None):
+        reader, writer = await asyncio.open_unix_connection(
+            socketPath(serverName or defaultServerName())
+        )
+        connection = cls(reader, writer)
+        try:
+            await connection.hello()
+        except BaseException:
+            await connection.close()
+            raise
+        connection.task = asyncio.create_task(connection.receiveResponses())
+        return connection
+
+    @property
+    def closed(self):
+        return self.error is not None or self.writer.is_closing()
+
+    async def hello(self):
+        self._send(MessageId.HELLO, str(PROTOCOL_VERSION))
+        await self.writer.drain()
+        msg_id, arg = await self._receive()
+        if msg_id == MessageId.ERROR:
+            raise ClientError(arg.decode("utf-8"))
+        if msg_id != MessageId.HELLO:
+            raise ClientError(f"Unexpected message ID {msg_id} (expected HELLO)")
+        version = int(arg)
+        if version < PROTOCOL_VERSION:
+            raise ClientError(f"Unsupported protocol version {version}")
+
+    async def close(self):
+        if self.task is not None:
+            self.task.cancel()
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except OSError:
+            pass
+        self._fail("Connection closed")
+
+    async def stream(self, name, *args):
+        """Sends a command and yields its output as it arrives."""
+        _request_id, queue = self._sendRequest(name, args)
+        async for chunk in self._output(queue):
+            yield chunk
+
+    async def request(self, name, *args):
+        """Sends a command and returns its complete response."""
+        request_id, queue = self._sendRequest(name, args)
+        response = Response(request_id)
+        try:
+            async for chunk in self._output(queue):
+                response.output += chunk
+        except ClientError as e:
+            response.error = str(e)
+            if e.exit_code is not None:
+                response.exit_code = e.exit_code
+        return response
+
+    def _sendRequest(self, name, args):
+        """
+        Sends a request and returns its ID and queue for the response.
+
+        Does not await, so the ID and the queue position cannot be taken by
+        another concurrent request.
+        """
+        if self.closed:
+            raise ClientError(self.error or "Connection closed")
+
+        queue = asyncio.Queue(MAX_QUEUED_CHUNKS)
+        self.pending.append(queue)
+        self.last_request_id += 1
+        self._send(MessageId.REQUEST_ID, str(self.last_request_id))
+        self._send(MessageId.COMMAND_NAME, name)
+        for arg in args:
+            self._send(MessageId.COMMAND_ARG, arg)
+        self._send(MessageId.COMMAND_END, b"")
+        self.requestSent.set()
+        return self.last_request_id, queue
+
+    async def _output(self, queue):
+        await self.writer.drain()
+
+        finished = False
+        error = None
+        try:
+            while True:
+                msg_id, arg = await queue.get()
+                if msg_id == MessageId.PRINT:
+                    yield arg
+                elif msg_id == MessageId.ERROR:
+                    error = arg
+                else:
+                    break
+
+            finished = True
+            if msg_id is None:
+                raise ClientError(arg)
+            if error is not None:
+                raise ClientError(error, arg)
+            if arg:
+                raise ClientError(f"Command failed with exit code {arg}", arg)
+        finally:
+            if not finished:
+                self.abandoned.add(queue)
+
+    async def receiveResponses(self):
+        queue = None
+        try:
+            while True:
+                msg_id, arg = await self._receive()
+                if queue is None:
+                    # Error not related to a request.
+                    if msg_id == MessageId.ERROR:
+                        raise ClientError(arg.decode("utf-8"))
+                    if msg_id != MessageId.REQUEST_ID or not self.pending:
+                        raise ClientError(f"Unexpected message ID {msg_id}")
+                    queue = self.pending.popleft()
+                elif msg_id == MessageId.PRINT:
+                    await self._put(queue, msg_id, arg)
+                elif msg_id == MessageId.ERROR:
+                    await self._put(queue, msg_id, arg.decode("utf-8"))
+                elif msg_id == MessageId.EXIT:
+                    await self._put(queue, msg_id, int(arg))
+                    queue = None
+                else:
+                    raise ClientError(f"Unexpected message ID {msg_id}")
+        except (OSError, EOFError, ClientError) as e:
+            if queue is not None:
+                self.pending.appendleft(queue)
+            self._fail(str(e) or "Connection closed")
+
+    async def _put(self, queue, msg_id, arg):
+        if queue in self.abandoned:
+            if msg_id == MessageId.EXIT:
+                self.abandoned.discard(queue)
+            return
+
+        if queue.full() and not self.pending:
+            await self._waitForConsumer(queue, (msg_id, arg))
+            return
+
+        if queue.full():
+            self._abort(queue, msg_id, "Output was not consumed in time")
+        else:
+            queue.put_nowait((msg_id, arg))
+
+    async def _waitForConsumer(self, queue, message):
+        """Waits for the consumer until another request is sent."""
+        self.requestSent.clear()
+        put = asyncio.ensure_future(queue.put(message))
+        sent = asyncio.ensure_future(self.requestSent.wait())
+        try:
+            await asyncio.wait((put, sent), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            sent.cancel()
+            if not put.done():
+                put.cancel()
+                self._abort(queue, message[0], "Output was not consumed in time")
+
+    def _abort(self, queue, msg_id, error):
+        # Skip the rest of the response.
+        if msg_id != MessageId.EXIT:
+            self.abandoned.add(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait((None, error))
+
+    def _fail(self, error):
+        if self.error is None:
+            self.error = error
+        while self.pending:
+            queue = self.pending.popleft()
+            # Unconsumed output is dropped on failure.
+            while queue.full():
+                queue.get_nowait()
+            queue.put_nowait((None, self.error))
+
+    def _send(self, msg_id, arg):
+        if isinstance(arg, str):
+            arg = arg.encode("utf-8")
+        self.writer.write(encodeMessageHeader(msg_id, len(arg)))
+        self.writer.write(arg)
+
+    async def _receive(self):
+        header = await self.reader.readexactly(MESSAGE_HEADER.size)
+        msg_id, size = MESSAGE_HEADER.unpack(header)
+        return msg_id, await self.reader.readexactly(size)
+
+
+class AsyncClient:
+    """
+    Pool of connections to the application.
+
+    Each request uses a connection exclusively, so a slowly consumed output
+    stream does not delay other requests.
+    """
+
+    def __init__(self, serverName=None, maxConnections=DEFAULT_MAX_CONNECTIONS):
+        self.serverName = serverName or defaultServerName()
+        self.idle = []
+        self.semaphore = asyncio.Semaphore(maxConnections)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_args):
+        await self.close()
+
+    async def close(self):
+        idle, self.idle = self.idle, []
+        for connection in idle:
+            await connection.close()
+
+    async def stream(self, name, *args):
+        """Sends a command and yields its output as it arrives."""
+        async with self.semaphore:
+            connection = await self._acquire()
+            try:
+                async for chunk in connection.stream(name, *args):
+                    yield chunk
+            finally:
+                await self._release(connection, name)
+
+    async def request(self, name, *args):
+        """Sends a command and returns its complete response."""
+        async with self.semaphore:
+            connection = await self._acquire()
+            try:
+                return await connection.request(name, *args)
+            finally:
+                await self._release(connection, name)
+
+    async def _acquire(self):
+        while self.idle:
+            connection = self.idle.pop()
+            if not connection.closed:
+                return connection
+        try:
+            return await AsyncConnection.open(self.serverName)
+        except (OSError, EOFError) as e:
+            raise ClientError(f"Failed to connect to the application: {e}") from e
+
+    async def _release(self, connection, name):
+        # Avoid waiting for the rest of an abandoned response.
+        if (
+            name in CLOSING_COMMANDS
+            or connection.closed
+            or connection.pending
+            or connection.abandoned
+        ):
+            await connection.close()
+        else:
+            self.idle.append(connection)
@@ -1,23 +1,30 @@
 # SPDX-License-Identifier: LGPL-2.0-or-later
 import logging
-import sys
-from enum import IntEnum
+from collections import deque
 
 from PySide6.QtCore import QByteArray, QDataStream
 from PySide6.QtNetwork import QLocalSocket
 
+from infinitecopy.protocol import (
+    CONNECTION_TIMEOUT_MS,
+    PROTOCOL_VERSION,
+    STREAM_CHUNK_SIZE,
+    MessageId,
+    handleResponseMessage,
+)
+
 logger = logging.getLogger(__name__)
 
-CONNECTION_TIMEOUT_MS = 4000
+# Pending output is written only if less data are waiting in the socket.
+MAX_BUFFERED_OUTPUT_BYTES = 4 * STREAM_CHUNK_SIZE
 
 
-class MessageId(IntEnum):
-    PRINT = 1
-    ERROR = 2
-    EXIT = 3
-    COMMAND_NAME = 4
-    COMMAND_ARG = 5
-    COMMAND_END = 6
+class Response:
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.output = QByteArray()
+        self.error = None
+        self.exit_code = 0
 
 
 class Client:
@@ -35,11 +42,25 @@ class Client:
         self.error = None
         self.exit_code = None
         self.log_states = log_states
+        self.version = 1
+        # Arguments of a command received by the server.
+        self.arguments = deque()
+        self.max_message_bytes = None
+        # Messages waiting for the socket to write buffered data, each with
+        # an iterator of data chunks.
+        self.pending = deque()
+        self.disconnect_pending = False
+        self.socket.bytesWritten.connect(self._write_pending)
+        self.socket.disconnected.connect(self.pending.clear)
         self.socket.stateChanged.connect(self._on_state_changed)
         self.socket.errorOccurred.connect(self._on_error_occurred)
 
     def disconnect(self):
-        self.socket.disconnectFromServer()
+        if self.pending:
+            # Disconnect after the pending output is written.
+            self.disconnect_pending = True
+        else:
+            self.socket.disconnectFromServer()
 
     def connect(self, serverName):
         self.socket.connectToServer(serverName)
@@ -48,31 +69,47 @@ class Client:
     def waitForDisconnected(self):
         self.socket.waitForDisconnected(-1)
 
+    def flush(self):
+        """Waits until all pending data are written."""
+        while self.socket.bytesToWrite() > 0:
+            if not self.socket.waitForBytesWritten(-1):
+                break
+
     def waitForBytesAvailable(self):
         return self.socket.bytesAvailable() > 0 or self.socket.waitForReadyRead(-1)
 
     def receiveCommandArguments(self):
-        while True:
-            msg_id, arg = self._receive(MessageId.COMMAND_ARG, MessageId.COMMAND_END)
+        """Yields arguments of the received command."""
+        while self.arguments:
+            yield self.arguments.popleft()
 
-            if msg_id == MessageId.COMMAND_END:
-                break
-
-            if msg_id != MessageId.COMMAND_ARG:
-                self.error = f"Expected argument but got message ID {msg_id}"
-                logger.error(self.error)
-                self.disconnect()
-                break
+    def receiveAvailable(self):
+        """Yields messages which can be received without blocking."""
+        while self.socket.bytesAvailable() > 0:
+            msg_id, arg = self._tryReceive()
+            if msg_id is None:
+                return
+            yield msg_id, arg
 
-            yield arg
+    def sendHello(self, version):
+        self.version = version
+        self._send(MessageId.HELLO, str(version))
 
-    def receiveCommandName(self):
-        _msg_id, name = self._receive(MessageId.COMMAND_NAME)
-        return bytes(name).decode("utf-8")
+    def sendRequestId(self, request_id):
+        self._send(MessageId.REQUEST_ID, request_id)
 
     def sendCommandArgument(self, arg):
         self._send(MessageId.COMMAND_ARG, arg)
 
+    def sendCommandArgumentFile(self, file):
+        """Sends content of a file as a single argument without reading it whole."""
+        chunk = file.read(STREAM_CHUNK_SIZE)
+        while next_chunk := file.read(STREAM_CHUNK_SIZE):
+            self._send(MessageId.COMMAND_ARG_CHUNK, chunk)
+            self.flush()
+            chunk = next_chunk
+        self._send(MessageId.COMMAND_ARG, chunk)
+
     def sendCommandName(self, arg):
         self._send(MessageId.COMMAND_NAME, arg)
 
@@ -81,16 +118,40 @@ class Client:
 
     def _send(self, msg_id, arg):
         if isinstance(arg, str):
-            arg = QByteArray(arg.encode("utf-8"))
-        elif isinstance(arg, bytes):
-            arg = QByteArray(arg)
-        elif not isinstance(arg, QByteArray):
+            arg = arg.encode("utf-8")
+        elif not isinstance(arg, (bytes, bytearray, memoryview, QByteArray)):
             raise RuntimeError(f"Can send only bytes, not an object: {arg!r}")
 
+        if self.pending:
+            self.pending.append((msg_id, iter((arg,))))
+        else:
+            self._write(msg_id, arg)
+
+    def _write(self, msg_id, arg):
         self.stream.writeUInt8(msg_id)
         self.stream.writeBytes(arg)
         self.validate()
 
+    def _write_pending(self, _bytes=None):
+        while self.pending and self.socket.bytesToWrite() < MAX_BUFFERED_OUTPUT_BYTES:
+            msg_id, chunks = self.pending[0]
+            try:
+                chunk = next(chunks, None)
+            except Exception as e:
+                logger.warning("Failed to produce output: %s", e)
+                self.pending.popleft()
+                self._write(MessageId.ERROR, str(e).encode("utf-8"))
+                continue
+
+            if chunk is None:
+                self.pending.popleft()
+            else:
+                self._write(msg_id, chunk)
+
+        if self.disconnect_pending and not self.pending:
+            self.disconnect_pending = False
+            self.socket.disconnectFromServer()
+
     def _receive(self, *expected_msg_ids):
         while self.waitForBytesAvailable():
             msg_id, arg = self._tryReceive()
@@ -117,9 +178,15 @@ class Client:
             self.msg_id = self.stream.readUInt8()
 
         if self.length is None:
-            if not self.socket.bytesAvailable():
+            if self.socket.bytesAvailable() < 4:
                 return None, None
             self.length = self.stream.readUInt32()
+            if self.max_message_bytes is not None and (
+                self.length > self.max_message_bytes
+            ):
+                raise ValueError(
+                    f"Message exceeds maximum size of {self.max_message_bytes} bytes"
+                )
             self.arg = QByteArray()
             self.arg.reserve(self.length)
 
@@ -139,7 +206,29 @@ class Client:
         return msg_id, arg
 
     def sendPrint(self, arg):
-        self._send(MessageId.PRINT, arg)
+        if isinstance(arg, str):
+            arg = arg.encode("utf-8")
+
+        data = memoryview(arg)
+        if len(data) <= STREAM_CHUNK_SIZE:
+            self._send(MessageId.PRINT, arg)
+            return
+
+        self.sendPrintStream(
+            data[start : start + STREAM_CHUNK_SIZE]
+            for start in range(0, len(data), STREAM_CHUNK_SIZE)
+        )
+
+    def sendPrintStream(self, chunks):
+        """
+        Sends output chunks as the client reads them.
+
+        Chunks are taken from the iterable only when the socket has written
+        most of the buffered data, so a slow client does not block the event
+        loop and large output is not buffered whole.
+        """
+        self.pending.append((MessageId.PRINT, iter(chunks)))
+        self._write_pending()
 
     def sendError(self, arg):
         self._send(MessageId.ERROR, arg)
@@ -166,22 +255,71 @@ class Client:
         self.disconnect()
 
     def _on_ready_read(self):
-        while self.socket.bytesAvailable() > 0:
-            msg_id, arg = self._tryReceive()
-            if msg_id is None:
-                return
+        for msg_id, arg in self.receiveAvailable():
+            if handleResponseMessage(self, msg_id, arg):
+                self.disconnect()
+
 
+class SessionClient(Client):
+    """
+    Client sending multiple requests over a single connection.
+
+    Requests can be pipelined: responses are received in the same order as
+    the requests were sent.
+    """
+
+    def __init__(self, log_states=True):
+        super().__init__(log_states=log_states)
+        self.socket.readyRead.disconnect(self._on_ready_read)
+        self.last_request_id = 0
+
+    def hello(self):
+        """
+        Negotiates protocol version with the server and returns it.
+
+        Version 1 means that the server supports only a single command per
+        connection.
+        """
+        self._send(MessageId.HELLO, str(PROTOCOL_VERSION))
+        msg_id, arg = self._receive(MessageId.HELLO, MessageId.ERROR)
+        if msg_id == MessageId.HELLO:
+            self.version = int(arg)
+        return self.version
+
+    def sendRequest(self, name, *args):
+        """Sends command without waiting for response; returns request ID."""
+        self.last_request_id += 1
+        self._send(MessageId.REQUEST_ID, str(self.last_request_id))
+        self.sendCommandName(name)
+        for arg in args:
+            self.sendCommandArgument(arg)
+        self.sendCommandEnd()
+        return self.last_request_id
+
+    def receiveResponse(self):
+        """Returns response for the oldest request without response."""
+        msg_id, arg = self._receive(MessageId.REQUEST_ID, MessageId.ERROR)
+        if msg_id is None:
+            raise RuntimeError(self.error)
+        if msg_id == MessageId.ERROR:
+            raise RuntimeError(bytes(arg).decode("utf-8"))
+
+        response = Response(int(arg))
+        while True:
+            msg_id, arg = self._receive(
+                MessageId.PRINT, MessageId.ERROR, MessageId.EXIT
+            )
+            if msg_id is None:
+                raise RuntimeError(self.error)
             if msg_id == MessageId.PRINT:
-                logger.debug("Client print: %d bytes", len(arg))
-                sys.stdout.buffer.write(bytes(arg))
-                sys.stdout.buffer.flush()
+                response.output.append(arg)
             elif msg_id == MessageId.ERROR:
-                text = bytes(arg).decode("utf-8")
-                self.error = f"Error: {text}"
-                self.disconnect()
-            elif msg_id == MessageId.EXIT:
-                self.exit_code = max(self.exit_code or 0, int(arg))
-                self.disconnect()
+                response.error = bytes(arg).decode("utf-8")
             else:
-                self.error = f"Unknown message ID {msg_id}: {type(arg)}"
-                self.disconnect()
+                response.exit_code = int(arg)
+                return response
+
+    def request(self, name, *args):
+        """Sends command and waits for its response."""
+        self.sendRequest(name, *args)
+        return self.receiveResponse()
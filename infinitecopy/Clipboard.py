@@ -1,9 +1,10 @@
 # SPDX-License-Identifier: LGPL-2.0-or-later
-from PySide6.QtCore import Property, QMimeData, QObject, QTimer, Signal, Slot
+from PySide6.QtCore import Property, QMimeData, QObject, Signal, Slot
 from PySide6.QtGui import QClipboard, QGuiApplication
 from PySide6.QtQml import QJSValue
 
 import infinitecopy.MimeFormats as formats
+from infinitecopy.Debouncer import debounceChanges
 
 
 class Clipboard(QObject):
@@ -14,37 +15,44 @@ class Clipboard(QObject):
         clipboard = QGuiApplication.clipboard()
         clipboard.changed.connect(self.onClipboardChanged)
 
-        self.clipboardTimer = QTimer()
-        self.clipboardTimer.setInterval(config.clipboardChangedDelayMs)
-        self.clipboardTimer.setSingleShot(True)
-        self.clipboardTimer.timeout.connect(self.onClipboardChangedAfterDelay)
-
-        self.selectionTimer = QTimer()
-        self.selectionTimer.setInterval(config.selectionChangedDelayMs)
-        self.selectionTimer.setSingleShot(True)
-        self.selectionTimer.timeout.connect(self.onSelectionChangedAfterDelay)
+        debounceChanges(self, config)
 
         self.formats = config.formats
 
     def onClipboardChanged(self, mode):
         if mode == QClipboard.Clipboard:
-            self.clipboardTimer.start()
+            self.clipboardDebouncer.onChanged()
         elif mode == QClipboard.Selection:
-            self.selectionTimer.start()
+            self.selectionDebouncer.onChanged()
 
     def onClipboardChangedAfterDelay(self):
-        self.emitChanged(QClipboard.Clipboard, formats.valueSourceClipboard)
+        self.emitChanged(
+            QClipboard.Clipboard,
+            formats.valueSourceClipboard,
+            self.clipboardDebouncer,
+        )
 
     def onSelectionChangedAfterDelay(self):
-        self.emitChanged(QClipboard.Selection, formats.valueSourceSelection)
+        self.emitChanged(
+            QClipboard.Selection,
+            formats.valueSourceSelection,
+            self.selectionDebouncer,
+        )
 
-    def emitChanged(self, mode, source):
+    def emitChanged(self, mode, source, debouncer):
         clipboard = QGuiApplication.clipboard()
         mimeData = clipboard.mimeData(mode)
+        offered = mimeData.formats()
+        # Data set by this application are identified by the owner marker.
+        offerKey = None
+        if formats.mimeOwner in offered:
+            offerKey = (tuple(offered), bytes(mimeData.data(formats.mimeOwner)))
+        if not debouncer.shouldRead(offered, offerKey):
+            return
+
         data = {
             format: mimeData.data(format)
-            for format in self.formats
-            if mimeData.hasFormat(format)
+            for format in formats.formatsToRead(self.formats, offered)
         }
         data[formats.mimeSource] = source
         self.changed.emit(data)
@@ -62,8 +70,11 @@ class Clipboard(QObject):
     def setData(self, value):
         data = value.toVariant()
         mimeData = QMimeData()
-        mimeData.setData(formats.mimeOwner, b"1")
         for format_, bytes_ in data.items():
+            if isinstance(bytes_, str):
+                bytes_ = bytes_.encode("utf-8")
             mimeData.setData(format_, bytes_)
         clipboard = QGuiApplication.clipboard()
         clipboard.setMimeData(mimeData)
+        # Copying the same item again moves it back to the top.
+        self.clipboardDebouncer.lastOfferKey = None
@@ -10,8 +10,16 @@ logger = logging.getLogger(__name__)
 
 
 class ClipboardConfig:
-    clipboardChangedDelayMs = 500
-    selectionChangedDelayMs = 1000
+    # Delays before reading changed clipboard and selection. Delay grows up to
+    # the maximum while changes keep coming quickly, e.g. when selecting text.
+    clipboardChangedDelayMs = 100
+    clipboardChangedMaxDelayMs = 1000
+    selectionChangedDelayMs = 250
+    selectionChangedMaxDelayMs = 2000
+    # Maximum time to read all formats after a change.
+    readTimeoutMs = 5000
+    # Data of a format over this size is ignored.
+    maxFormatBytes = 64 * 2**20
     formats = [
         formats.mimeText,
         formats.mimeHtml,
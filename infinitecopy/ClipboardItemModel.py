@@ -1,13 +1,37 @@
 # SPDX-License-Identifier: LGPL-2.0-or-later
-import hashlib
+import json
+import logging
+from collections import OrderedDict
 from enum import IntEnum
-from itertools import repeat
 
-from PySide6.QtCore import Property, QByteArray, QDateTime, QEnum, Qt, Slot
+from PySide6.QtCore import (
+    Property,
+    QAbstractListModel,
+    QByteArray,
+    QDateTime,
+    QEnum,
+    QModelIndex,
+    Qt,
+    Signal,
+    Slot,
+)
 from PySide6.QtQml import QmlElement
-from PySide6.QtSql import QSqlField, QSqlQuery, QSqlTableModel
+from PySide6.QtSql import QSqlField, QSqlQuery
 
 import infinitecopy.MimeFormats as formats
+from infinitecopy.Codec import CODEC_NONE, CodecConfig, decode, encode
+from infinitecopy.DatabaseSchema import (
+    COLUMN_HASH,
+    COLUMN_TEXT,
+    SQL_CREATE_DB,
+    SQL_ENABLE_FOREIGN_KEYS,
+    SQL_MIGRATIONS,
+)
+from infinitecopy.ItemData import createBlobHash, createHash, isSameData
+from infinitecopy.Stats import Stats
+from infinitecopy.Storage import StorageConfig, connectionPragmas
+
+logger = logging.getLogger(__name__)
 
 QML_IMPORT_NAME = "InfiniteCopy"
 QML_IMPORT_MAJOR_VERSION = 1
@@ -18,39 +42,23 @@ FORMAT_TO_ITEM_COLUMN_MAP = {
     formats.mimeSource: ":source",
 }
 
-COLUMN_HASH = "hash"
-COLUMN_TEXT = "text"
-SQL_CREATE_TABLE_ITEM = f"""
-CREATE TABLE IF NOT EXISTS item (
-    id INTEGER PRIMARY KEY,
-    createdTime TIMESTAMP NOT NULL,
-    {COLUMN_HASH} TEXT,
-    {COLUMN_TEXT} TEXT,
-    source TEXT
-);
-"""
-
-SQL_CREATE_TABLE_DATA = """
-CREATE TABLE IF NOT EXISTS data (
-    itemId INTEGER NOT NULL,
-    format TEXT NOT NULL,
-    bytes BLOB NOT NULL,
-    FOREIGN KEY(itemId) REFERENCES item(id)
-        ON DELETE CASCADE
-);
-"""
-
-SQL_CREATE_DB = [
-    "PRAGMA foreign_keys = ON;",
-    SQL_CREATE_TABLE_ITEM,
-    SQL_CREATE_TABLE_DATA,
-    "CREATE INDEX IF NOT EXISTS index_item_hash ON item (hash);",
-    "CREATE INDEX IF NOT EXISTS index_data_item_id ON data (itemId);",
-]
+SQL_SELECT_FORMAT_AND_DATA = (
+    "SELECT format, codec, bytes FROM data JOIN blob ON hash = blobHash"
+    " WHERE itemId = :id;"
+)
 
-SQL_SELECT_DATA = "SELECT bytes FROM data WHERE itemId = :id AND format = :format;"
+# Formats of given items and bytes only for HTML (avoids reading large images).
+SQL_SELECT_ROLE_DATA = (
+    "SELECT itemId, format, codec, blobHash,"
+    " CASE WHEN format = :htmlFormat THEN bytes END AS bytes"
+    " FROM data JOIN blob ON hash = blobHash"
+    " WHERE itemId IN (SELECT value FROM json_each(:ids));"
+)
 
-SQL_SELECT_FORMAT_AND_DATA = "SELECT format, bytes FROM data WHERE itemId = :id;"
+SQL_SELECT_ITEMS_DATA = (
+    "SELECT itemId, format, codec, bytes FROM data JOIN blob ON hash = blobHash"
+    " WHERE itemId IN (SELECT value FROM json_each(:ids));"
+)
 
 SQL_HAS_FORMAT = "SELECT 1 FROM data WHERE itemId = :id AND format = :format;"
 
@@ -59,26 +67,133 @@ SQL_INSERT_ITEM = (
     " VALUES (:createdTime, :hash, :text, :source);"
 )
 
+SQL_SELECT_ITEM_ID_BY_HASH = (
+    "SELECT id FROM item WHERE hash = :hash ORDER BY id DESC LIMIT 1;"
+)
+
+SQL_SELECT_NEWEST_ITEM_BY_HASH = (
+    "SELECT id, id = (SELECT max(id) FROM item) AS newest"
+    " FROM item WHERE hash = :hash ORDER BY id DESC LIMIT 1;"
+)
+
+# Item data follow the new item ID (ON UPDATE CASCADE).
+SQL_MOVE_ITEM_TO_TOP = (
+    "UPDATE item SET id = (SELECT max(id) + 1 FROM item),"
+    " createdTime = :createdTime, source = :source"
+    " WHERE id = :id RETURNING id;"
+)
+
+SQL_INSERT_BLOB = (
+    "INSERT INTO blob (hash, codec, bytes) VALUES (:hash, :codec, :bytes)"
+    " ON CONFLICT (hash) DO NOTHING;"
+)
+
+SQL_SELECT_BLOB_EXISTS = "SELECT 1 FROM blob WHERE hash = :hash;"
+
+# Blob table before compression was supported.
+SQL_INSERT_BLOB_V2 = (
+    "INSERT INTO blob (hash, bytes) VALUES (:hash, :bytes)"
+    " ON CONFLICT (hash) DO NOTHING;"
+)
+
 SQL_INSERT_DATA = (
-    "INSERT INTO data (itemId, format, bytes) VALUES (:itemId, :format, :bytes);"
+    "INSERT INTO data (itemId, format, blobHash) VALUES (:itemId, :format, :blobHash);"
+)
+
+SQL_SELECT_OLD_DATA = "SELECT itemId, format, bytes FROM {table};"
+
+# Reference counts are recomputed in case these were changed externally.
+SQL_UPDATE_BLOB_REFS = (
+    "UPDATE blob SET refs = (SELECT count() FROM data WHERE blobHash = blob.hash);"
+)
+SQL_DELETE_UNUSED_BLOBS = "DELETE FROM blob WHERE refs <= 0;"
+SQL_SELECT_UNCOMPRESSED_BLOBS = (
+    "SELECT hash, min(format) AS format, bytes FROM blob JOIN data ON hash = blobHash"
+    " WHERE codec = :codec AND length(bytes) >= :minSize GROUP BY hash;"
+)
+SQL_UPDATE_BLOB = "UPDATE blob SET codec = :codec, bytes = :bytes WHERE hash = :hash;"
+SQL_GET_DATABASE_SIZE = (
+    "SELECT page_count * page_size FROM pragma_page_count(), pragma_page_size();"
 )
 
-SQL_GET_ITEM = "SELECT text FROM item LIMIT 1 OFFSET :row;"
+# Item text by row numbers in the unfiltered history, newest first.
+SQL_GET_ITEMS = """
+WITH rows AS (
+    SELECT id, row_number() OVER (ORDER BY id DESC) - 1 AS row
+    FROM item ORDER BY id DESC LIMIT :limit
+)
+SELECT row, text FROM rows JOIN item USING (id)
+WHERE row IN (SELECT value FROM json_each(:rows));
+"""
 SQL_GET_ITEM_COUNT = "SELECT count() AS count FROM item;"
 
+ITEM_COLUMNS = ("id", "createdTime", COLUMN_HASH, COLUMN_TEXT, "source", "pinned")
+
+# Items are loaded in pages, newest first, continuing from the oldest loaded
+# item (keyset pagination).
+SQL_SELECT_ITEMS = (
+    "SELECT id, createdTime, hash, text, source, pinned FROM item"
+    " WHERE {condition} ORDER BY id DESC LIMIT :limit;"
+)
+# Candidates for a LIKE pattern looked up in the trigram index.
+SQL_FILTER_INDEXED = "id IN (SELECT rowid FROM item_fts WHERE text LIKE {pattern})"
+# Items are exported oldest first, continuing from the last exported item.
+SQL_EXPORT_ITEMS = (
+    "SELECT id, createdTime, text, source FROM item"
+    " WHERE id > :after ORDER BY id LIMIT :limit;"
+)
+SQL_DELETE_ITEMS = "DELETE FROM item WHERE id IN (SELECT value FROM json_each(:ids));"
+SQL_SET_PINNED = "UPDATE item SET pinned = :pinned WHERE id = :id;"
+
+SQL_GET_SCHEMA_VERSION = "PRAGMA user_version;"
+SQL_SET_SCHEMA_VERSION = "PRAGMA user_version = {version};"
+
+# The trigram tokenizer can only look up terms with at least three characters.
+FTS_MIN_TERM_LENGTH = 3
+
+FETCH_PAGE_SIZE = 256
+
+# Number of items with cached role values and how many items around the
+# requested one to load at once.
+ROW_CACHE_SIZE = 1024
+ROW_CACHE_BATCH_SIZE = 64
+
+PREPARED_QUERY_CACHE_SIZE = 32
+
+# Number of items read from the database at once on export.
+EXPORT_BATCH_SIZE = 256
+
+
+class DeduplicationConfig:
+    # Items from these sources replace an existing item with the same content,
+    # which is moved to the top instead of adding a new item. None is the source
+    # of items added from command line.
+    sources = [formats.valueSourceClipboard, formats.valueSourceSelection]
 
-def createHash(data):
-    hash_ = hashlib.sha256()
 
-    for format_ in data:
-        if format_.startswith(formats.mimePrefixInternal):
-            continue
+def isOwnedItem(data):
+    """
+    Returns True for data read back after being copied from this application.
 
-        hash_.update(format_.encode("utf-8"))
-        hash_.update(b";;")
-        hash_.update(data[format_])
+    Such data contain only the item hash in the owner format.
+    """
+    return formats.mimeOwner in data and isEmptyItem(data)
 
-    return hash_.hexdigest()
+
+def isEmptyItem(data):
+    return all(
+        f.startswith(formats.mimePrefixInternal) or d.trimmed().length() == 0
+        for f, d in data.items()
+    )
+
+
+def likeEscape(text):
+    return text.replace("\\", "\\\\").replace("_", "\\_")
+
+
+def hasIndexableRun(pattern):
+    runs = pattern.replace("_", "%").split("%")
+    return any(len(run) >= FTS_MIN_TERM_LENGTH for run in runs)
 
 
 def prepareQuery(query, queryText):
@@ -97,19 +212,35 @@ def executeQuery(query):
 
 
 @QmlElement
-class ClipboardItemModel(QSqlTableModel):
+class ClipboardItemModel(QAbstractListModel):  # pylint: disable=too-many-public-methods
+    # Emitted with IDs of items added to the database.
+    itemsAdded = Signal(list)
+
     @QEnum
     class CaseSensitivity(IntEnum):
         Smart, Sensitive, Ignore = range(3)
 
     def __init__(self, db):
-        QSqlTableModel.__init__(self, db=db)
+        QAbstractListModel.__init__(self)
+        self.db = db
         self.roles = {}
-        self.setEditStrategy(QSqlTableModel.OnManualSubmit)
         self.lastAddedHash = ""
+        self.lastAddedData = None
         self.generateRoleNames()
         self.case_sensitivity = self.CaseSensitivity.Smart
         self.needle = ""
+        # Conditions for groups of matching items, listed in this order.
+        self.filters = [""]
+        self.items = []
+        self.atEnd = True
+        self.addedItemIds = []
+        self.replacedItemIds = []
+        self.rowCache = OrderedDict()
+        self.queries = OrderedDict()
+        self.stats = Stats("model")
+        self.codecConfig = CodecConfig()
+        self.storageConfig = StorageConfig()
+        self.deduplicationConfig = DeduplicationConfig()
 
     @Property(int)
     def caseSensitivity(self):
@@ -124,25 +255,10 @@ class ClipboardItemModel(QSqlTableModel):
         self.needle = needle
 
         if not needle:
-            self.setFilter("")
+            self.filters = [""]
+            self.select()
             return
 
-        f = QSqlField("", str)
-        if "%" not in needle:
-            needle = "".join(
-                sum(
-                    zip(needle, repeat("%")),
-                    start=tuple(
-                        "%",
-                    ),
-                )
-            )
-
-        f.setValue(needle)
-
-        formatted = self.database().driver().formatValue(f)
-        condition = f"{COLUMN_TEXT} LIKE {formatted}"
-
         if self.case_sensitivity == self.CaseSensitivity.Smart:
             if needle.islower():
                 case_sensitive = "OFF"
@@ -157,14 +273,59 @@ class ClipboardItemModel(QSqlTableModel):
                 f"Invalid case-sensitivity value: {self.case_sensitivity}"
             )
 
+        # Changing LIKE behavior fails while any statement is active.
+        self.finishQueries()
         self.database().exec(f"PRAGMA case_sensitive_like={case_sensitive};")
 
-        self.setFilter(condition)
+        self.filters = self.filterConditions(needle)
         self.select()
 
     textFilter = Property(str, None, setTextFilter)
 
+    def filterConditions(self, needle):
+        if "%" in needle:
+            # LIKE verifies index candidates and applies case-sensitivity.
+            condition = f"{COLUMN_TEXT} LIKE {self.formatValue(needle)}"
+            return [self.indexedCondition(needle, condition)]
+
+        # Items containing the characters in the same order match. Items
+        # containing the whole text are listed first and are looked up in the
+        # trigram index, so the first page usually needs no full scan.
+        subsequence = self.likeCondition(
+            "%" + "".join(f"{likeEscape(c)}%" for c in needle)
+        )
+        if not hasIndexableRun(needle):
+            return [subsequence]
+
+        substring = self.likeCondition(f"%{likeEscape(needle)}%")
+        return [
+            self.indexedCondition(f"%{needle}%", substring),
+            f"{subsequence} AND NOT {substring}",
+        ]
+
+    def likeCondition(self, pattern):
+        return f"{COLUMN_TEXT} LIKE {self.formatValue(pattern)} ESCAPE '\\'"
+
+    def indexedCondition(self, pattern, condition):
+        if not hasIndexableRun(pattern):
+            return condition
+        prefilter = SQL_FILTER_INDEXED.format(pattern=self.formatValue(pattern))
+        return f"{prefilter} AND {condition}"
+
+    def formatValue(self, value):
+        f = QSqlField("", str)
+        f.setValue(value)
+        return self.database().driver().formatValue(f)
+
+    def setUpConnection(self):
+        # These have no effect inside a transaction.
+        self.executeQuery(SQL_ENABLE_FOREIGN_KEYS)
+        for statement in connectionPragmas(self.storageConfig):
+            self.queryValue(statement)
+
     def create(self):
+        self.setUpConnection()
+
         self.beginTransaction()
 
         query = QSqlQuery(self.database())
@@ -172,89 +333,513 @@ class ClipboardItemModel(QSqlTableModel):
             prepareQuery(query, statement)
             executeQuery(query)
 
+        self.migrate()
+
         self.endTransaction()
 
-        self.setTable("item")
-        self.setSort(0, Qt.DescendingOrder)
         self.select()
 
+    def database(self):
+        return self.db
+
+    def select(self):
+        """Reloads items from the database."""
+        self.beginResetModel()
+        self.items = self.selectPage()
+        self.atEnd = len(self.items) < FETCH_PAGE_SIZE
+        self.addedItemIds = []
+        self.replacedItemIds = []
+        self.endResetModel()
+
+    def selectPage(self, last=None):
+        """Returns the page of items following the last loaded item."""
+        tier = last["tier"] if last else 0
+        before = last["id"] if last else None
+        items = []
+        while tier < len(self.filters) and len(items) < FETCH_PAGE_SIZE:
+            items.extend(
+                self.selectItems(
+                    tier=tier, before=before, limit=FETCH_PAGE_SIZE - len(items)
+                )
+            )
+            tier += 1
+            before = None
+        return items
+
+    def selectItems(self, *, tier=0, before=None, ids=None, limit=-1):
+        conditions = [self.filters[tier]] if self.filters[tier] else []
+        if before is not None:
+            conditions.append(f"id < {int(before)}")
+        if ids is not None:
+            conditions.append("id IN (SELECT value FROM json_each(:ids))")
+            kwargs = {"ids": json.dumps(ids)}
+        else:
+            kwargs = {}
+        condition = " AND ".join(conditions) or "1"
+
+        query = self.executeQuery(
+            SQL_SELECT_ITEMS.format(condition=condition), limit=limit, **kwargs
+        )
+        items = []
+        while query.next():
+            item = {column: query.value(column) for column in ITEM_COLUMNS}
+            item["tier"] = tier
+            items.append(item)
+        query.finish()
+        return items
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.items)
+
+    def canFetchMore(self, parent):
+        return not parent.isValid() and not self.atEnd
+
+    def fetchMore(self, parent):
+        if not self.canFetchMore(parent):
+            return
+
+        items = self.selectPage(self.items[-1] if self.items else None)
+        self.atEnd = len(items) < FETCH_PAGE_SIZE
+        if not items:
+            return
+
+        first = len(self.items)
+        self.beginInsertRows(QModelIndex(), first, first + len(items) - 1)
+        self.items.extend(items)
+        self.endInsertRows()
+
+    @Slot(list)
+    def insertItems(self, ids):
+        """Shows items added to the database (possibly from other connection)."""
+        if not ids:
+            return
+
+        # IDs of removed items can be reused.
+        for itemId in ids:
+            self.rowCache.pop(itemId, None)
+
+        # Reloading is cheaper than checking many new items separately.
+        if len(ids) > FETCH_PAGE_SIZE:
+            self.select()
+        else:
+            for tier in range(len(self.filters)):
+                items = self.selectItems(tier=tier, ids=ids)
+                if items:
+                    self.insertTierItems(tier, items)
+
+        self.itemsAdded.emit(ids)
+
+    def insertTierItems(self, tier, items):
+        # New items have the highest IDs so these always go to the top of the
+        # group of items matching the same filter condition.
+        row = next(
+            (row for row, item in enumerate(self.items) if item["tier"] >= tier),
+            len(self.items) if self.atEnd else None,
+        )
+        # Items not loaded yet are fetched later.
+        if row is None:
+            return
+
+        self.beginInsertRows(QModelIndex(), row, row + len(items) - 1)
+        self.items[row:row] = items
+        self.endInsertRows()
+
+    def migrate(self):
+        version = self.queryValue(SQL_GET_SCHEMA_VERSION, default=0)
+
+        for statements in SQL_MIGRATIONS[version:]:
+            version += 1
+            logger.info("Migrating item database to version %d", version)
+            query = QSqlQuery(self.database())
+            for statement in statements:
+                if callable(statement):
+                    statement(self)
+                    continue
+                prepareQuery(query, statement)
+                executeQuery(query)
+            self.executeQuery(SQL_SET_SCHEMA_VERSION.format(version=version))
+
     def addItemNoEmpty(self, data):
-        # Ignore empty data.
-        if all(
-            f.startswith(formats.mimePrefixInternal) or d.trimmed().length() == 0
-            for f, d in data.items()
-        ):
+        if isEmptyItem(data):
             return
 
         self.beginTransaction()
         self.addItemNoCommit(data)
         self.endTransaction()
-        self.submitChanges()
 
-    def addItemNoCommit(self, data):
+    def addItemNoCommit(self, data, createdTime=None):
+        createdTime = createdTime or QDateTime.currentDateTime()
+        if isOwnedItem(data):
+            ownerHash = bytes(data[formats.mimeOwner]).decode("utf-8", "replace")
+            return self.touchOwnedItem(
+                ownerHash, createdTime, data.get(formats.mimeSource)
+            )
+
+        # Avoids hashing the same data again.
+        if isSameData(data, self.lastAddedData):
+            return False
+
         itemHash = createHash(data)
         if self.lastAddedHash == itemHash:
             return False
 
         self.lastAddedHash = itemHash
+        self.lastAddedData = data
 
-        query = QSqlQuery(self.database())
-        prepareQuery(query, SQL_INSERT_ITEM)
+        if data.get(formats.mimeSource) in self.deduplicationConfig.sources:
+            itemId = self.queryValue(SQL_SELECT_ITEM_ID_BY_HASH, hash=itemHash)
+            if itemId is not None:
+                self.moveItemToTop(itemId, createdTime, data.get(formats.mimeSource))
+                return True
+
+        query = self.preparedQuery(SQL_INSERT_ITEM)
         query.bindValue(":hash", itemHash)
-        query.bindValue(":createdTime", QDateTime.currentDateTime())
+        query.bindValue(":createdTime", createdTime)
         for format_, column in FORMAT_TO_ITEM_COLUMN_MAP.items():
             value = data.get(format_, QByteArray())
             query.bindValue(column, value)
         executeQuery(query)
+        self.stats.add("queries")
         itemId = query.lastInsertId()
 
         for format_, bytes_ in data.items():
             if format_ in FORMAT_TO_ITEM_COLUMN_MAP:
                 continue
 
-            query = QSqlQuery(self.database())
-            prepareQuery(query, SQL_INSERT_DATA)
-            query.bindValue(":itemId", itemId)
-            query.bindValue(":format", format_)
-            query.bindValue(":bytes", bytes_)
-            executeQuery(query)
+            self.insertData(itemId, format_, bytes_)
 
+        self.addedItemIds.append(itemId)
         return True
 
-    def getItemCount(self):
-        query = self.executeQuery(SQL_GET_ITEM_COUNT)
-        if not query.next():
-            return 0
+    def touchOwnedItem(self, itemHash, createdTime, source):
+        """
+        Moves item copied from this application back to the top.
 
-        return query.value("count")
+        Does nothing if the item is already at the top or no longer exists.
+        """
+        self.lastAddedHash = itemHash
+        self.lastAddedData = None
+        if source not in self.deduplicationConfig.sources:
+            return False
 
-    def getItem(self, row):
-        count = self.getItemCount()
-        if count < row + 1:
-            return None
+        query = self.executeQuery(SQL_SELECT_NEWEST_ITEM_BY_HASH, hash=itemHash)
+        found = query.next()
+        itemId = query.value("id") if found else None
+        newest = found and query.value("newest")
+        query.finish()
+        if itemId is None or newest:
+            self.stats.add("ownedSkipped")
+            return False
 
-        query = self.executeQuery(SQL_GET_ITEM, row=count - row - 1)
-        if not query.next():
-            return None
+        self.moveItemToTop(itemId, createdTime, source)
+        return True
+
+    def moveItemToTop(self, itemId, createdTime, source):
+        newItemId = self.queryValue(
+            SQL_MOVE_ITEM_TO_TOP, id=itemId, createdTime=createdTime, source=source
+        )
+        self.replacedItemIds.append(itemId)
+        self.addedItemIds.append(newItemId)
+        self.stats.add("deduplicated")
+
+    def insertData(self, itemId, format_, bytes_):
+        blobHash = createBlobHash(format_, bytes_)
+
+        # The blob is encoded only if it is not stored yet.
+        query = self.preparedQuery(SQL_SELECT_BLOB_EXISTS)
+        query.bindValue(":hash", blobHash)
+        executeQuery(query)
+        exists = query.next()
+        query.finish()
+
+        if not exists:
+            codec, encoded = encode(format_, bytes_, self.codecConfig)
+            query = self.preparedQuery(SQL_INSERT_BLOB)
+            query.bindValue(":hash", blobHash)
+            query.bindValue(":codec", codec)
+            if codec != CODEC_NONE:
+                encoded = QByteArray(encoded)
+            query.bindValue(":bytes", encoded)
+            executeQuery(query)
+
+        query = self.preparedQuery(SQL_INSERT_DATA)
+        query.bindValue(":itemId", itemId)
+        query.bindValue(":format", format_)
+        query.bindValue(":blobHash", blobHash)
+        executeQuery(query)
+
+        self.stats.add("queries", 3 - exists)
+        return not exists
+
+    def moveDataToBlobs(self, table):
+        """Moves data from a table with the original schema to blob storage."""
+        saved = 0
+        query = QSqlQuery(self.database())
+        query.setForwardOnly(True)
+        prepareQuery(query, SQL_SELECT_OLD_DATA.format(table=table))
+        executeQuery(query)
+        while query.next():
+            format_ = query.value("format")
+            bytes_ = query.value("bytes")
+            blobHash = createBlobHash(format_, bytes_)
+            insert = self.executeQuery(SQL_INSERT_BLOB_V2, hash=blobHash, bytes=bytes_)
+            if insert.numRowsAffected() == 0:
+                saved += len(bytes_)
+            self.executeQuery(
+                SQL_INSERT_DATA,
+                itemId=query.value("itemId"),
+                format=format_,
+                blobHash=blobHash,
+            )
+        query.finish()
+
+        logger.info("Deduplicated item data: saved %d bytes", saved)
+        return saved
+
+    def exportItems(self):
+        """
+        Yields lists of items with all formats, oldest first.
 
-        return query.value("text")
+        Each item is a tuple with created time and a dict with data.
+        """
+        after = 0
+        while True:
+            query = self.executeQuery(
+                SQL_EXPORT_ITEMS, after=after, limit=EXPORT_BATCH_SIZE
+            )
+            items = {}
+            while query.next():
+                data = {}
+                for format_, column in FORMAT_TO_ITEM_COLUMN_MAP.items():
+                    value = query.value(column[1:])
+                    if value:
+                        data[format_] = value
+                items[query.value("id")] = (query.value("createdTime"), data)
+            query.finish()
+
+            if not items:
+                return
+
+            query = self.executeQuery(
+                SQL_SELECT_ITEMS_DATA, ids=json.dumps(list(items))
+            )
+            while query.next():
+                _createdTime, data = items[query.value("itemId")]
+                data[query.value("format")] = decode(
+                    query.value("codec"), query.value("bytes")
+                )
+            query.finish()
 
-    def submitChanges(self):
-        if not self.submitAll():
-            self.revertAll()
-            raise ValueError(f"Failed submit queries: {self.lastError().text()}")
+            yield list(items.values())
+            after = max(items)
+
+    def databaseSize(self):
+        return self.queryValue(SQL_GET_DATABASE_SIZE, default=0)
+
+    def compact(self):
+        """
+        Removes unused data and reclaims free space in the database file.
+
+        Returns database size in bytes before and after.
+        """
+        before = self.databaseSize()
+
+        self.beginTransaction()
+        self.executeQuery(SQL_UPDATE_BLOB_REFS)
+        self.executeQuery(SQL_DELETE_UNUSED_BLOBS)
+        self.compressBlobs()
+        self.endTransaction()
+
+        self.finishQueries()
+        self.executeQuery("VACUUM;")
+
+        after = self.databaseSize()
+        logger.info("Compacted database: saved %d bytes", before - after)
+        return before, after
+
+    def compressBlobs(self):
+        """Compresses blobs stored before compression was enabled."""
+        if self.codecConfig.minSize is None:
+            return
+
+        query = QSqlQuery(self.database())
+        query.setForwardOnly(True)
+        prepareQuery(query, SQL_SELECT_UNCOMPRESSED_BLOBS)
+        query.bindValue(":codec", CODEC_NONE)
+        query.bindValue(":minSize", self.codecConfig.minSize)
+        executeQuery(query)
+        while query.next():
+            codec, encoded = encode(
+                query.value("format"), query.value("bytes"), self.codecConfig
+            )
+            if codec != CODEC_NONE:
+                self.executeQuery(
+                    SQL_UPDATE_BLOB,
+                    hash=query.value("hash"),
+                    codec=codec,
+                    bytes=encoded,
+                )
+        query.finish()
+
+    def getItemCount(self):
+        return self.queryValue(SQL_GET_ITEM_COUNT, default=0)
+
+    def getItem(self, row):
+        return self.getItems([row]).get(row)
+
+    def getItems(self, rows):
+        """Returns dict with text of items at given rows (newest first)."""
+        rows = sorted({row for row in rows if row >= 0})
+        if not rows:
+            return {}
+
+        query = self.executeQuery(
+            SQL_GET_ITEMS, limit=rows[-1] + 1, rows=json.dumps(rows)
+        )
+        items = {}
+        while query.next():
+            items[query.value("row")] = query.value("text")
+        query.finish()
+        return items
 
     def beginTransaction(self):
         self.database().transaction()
 
-    def endTransaction(self):
+    def commitTransaction(self):
+        """
+        Commits the transaction.
+
+        Returns IDs of added items and previous IDs of items moved to the top.
+        """
+        ids = self.addedItemIds
+        replacedIds = self.replacedItemIds
+        self.addedItemIds = []
+        self.replacedItemIds = []
         if not self.database().commit():
-            raise ValueError(f"Failed submit queries: {self.lastError().text()}")
+            error = self.database().lastError().text()
+            self.database().rollback()
+            raise ValueError(f"Failed submit queries: {error}")
+
+        return ids, replacedIds
+
+    def rollbackTransaction(self):
+        self.addedItemIds = []
+        self.replacedItemIds = []
+        self.lastAddedHash = ""
+        self.lastAddedData = None
+        self.database().rollback()
+
+    def endTransaction(self):
+        ids, replacedIds = self.commitTransaction()
+        self.forgetItems(replacedIds)
+        self.insertItems(ids)
 
     @Slot(int, int)
     def removeItems(self, row, count):
-        if self.removeRows(row, count):
-            self.submitChanges()
+        row = max(0, row)
+        count = min(count, len(self.items) - row)
+        if count <= 0:
+            return
+
+        ids = [item["id"] for item in self.items[row : row + count]]
+        self.executeQuery(SQL_DELETE_ITEMS, ids=json.dumps(ids))
+        for itemId in ids:
+            self.rowCache.pop(itemId, None)
+
+        self.beginRemoveRows(QModelIndex(), row, row + count - 1)
+        del self.items[row : row + count]
+        self.endRemoveRows()
+
+    def removeItemIds(self, ids):
+        if not ids:
+            return
+
+        self.executeQuery(SQL_DELETE_ITEMS, ids=json.dumps(list(set(ids))))
+        self.forgetItems(ids)
+
+    @Slot(list)
+    def forgetItems(self, ids):
+        """Removes rows of items already deleted from the database."""
+        ids = set(ids)
+        for itemId in ids:
+            self.rowCache.pop(itemId, None)
+
+        # Remove loaded rows in ranges, starting from the bottom so the
+        # remaining row numbers stay valid.
+        row = len(self.items) - 1
+        while row >= 0:
+            if self.items[row]["id"] not in ids:
+                row -= 1
+                continue
+
+            last = row
+            while row > 0 and self.items[row - 1]["id"] in ids:
+                row -= 1
+
+            self.beginRemoveRows(QModelIndex(), row, last)
+            del self.items[row : last + 1]
+            self.endRemoveRows()
+            row -= 1
+
+    @Slot(int)
+    def togglePinned(self, row):
+        record = self.itemRecord(row)
+        if record is None:
+            return
+
+        pinned = 0 if record["pinned"] else 1
+        self.executeQuery(SQL_SET_PINNED, id=record["id"], pinned=pinned)
+        record["pinned"] = pinned
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [self.itemPinnedRole])
+
+    def itemRecord(self, row):
+        if 0 <= row < len(self.items):
+            return self.items[row]
+        return None
+
+    def cachedRoleData(self, row):
+        itemId = self.items[row]["id"]
+        cached = self.rowCache.get(itemId)
+        if cached is not None:
+            self.stats.add("cacheHits")
+            self.rowCache.move_to_end(itemId)
+            return cached
+
+        self.stats.add("cacheMisses")
+
+        # Load values for the surrounding items which are likely to be
+        # requested next by the view.
+        first = max(0, row - ROW_CACHE_BATCH_SIZE // 2)
+        last = min(len(self.items), first + ROW_CACHE_BATCH_SIZE)
+        entries = {
+            item["id"]: {"formats": set(), "html": "", "imageHash": ""}
+            for item in self.items[first:last]
+            if item["id"] not in self.rowCache
+        }
+
+        query = self.executeQuery(
+            SQL_SELECT_ROLE_DATA,
+            htmlFormat=formats.mimeHtml,
+            ids=json.dumps(list(entries)),
+        )
+        while query.next():
+            entry = entries[query.value("itemId")]
+            format_ = query.value("format")
+            entry["formats"].add(format_)
+            if format_ == formats.mimeHtml:
+                entry["html"] = decode(query.value("codec"), query.value("bytes"))
+            elif format_ == formats.mimePng:
+                entry["imageHash"] = query.value("blobHash")
+        query.finish()
+
+        self.rowCache.update(entries)
+        while len(self.rowCache) > ROW_CACHE_SIZE:
+            self.rowCache.popitem(last=False)
+
+        return entries[itemId]
 
     def generateRoleNames(self):
         self.roles = super().roleNames()
@@ -280,6 +865,11 @@ class ClipboardItemModel(QSqlTableModel):
         self.roles[role] = b"hasImage"
         role += 1
 
+        # Identifies image data, used for stable image URLs.
+        self.itemImageHashRole = role
+        self.roles[role] = b"imageHash"
+        role += 1
+
         self.itemDataRole = role
         self.roles[role] = b"itemData"
         role += 1
@@ -292,80 +882,103 @@ class ClipboardItemModel(QSqlTableModel):
         self.roles[role] = b"itemHash"
         role += 1
 
+        self.itemPinnedRole = role
+        self.roles[role] = b"itemPinned"
+        role += 1
+
     def roleNames(self):
         return self.roles
 
-    def data(self, index, role):
-        if role < Qt.UserRole:
-            return QSqlTableModel.data(self, index, role)
+    def data(self, index, role=Qt.DisplayRole):
+        record = self.itemRecord(index.row())
+        if record is None:
+            return None
 
-        record = self.record(index.row())
+        if role in (Qt.DisplayRole, self.itemTextRole):
+            return record["text"]
 
         if role == self.itemIdRole:
-            return record.value("id")
+            return record["id"]
 
         if role == self.createdTimeRole:
-            return record.value("createdTime")
-
-        if role == self.itemTextRole:
-            return record.value("text")
+            return record["createdTime"]
 
         if role == self.itemHashRole:
-            return record.value("hash")
+            return record["hash"]
 
         if role == self.itemSourceRole:
-            return record.value("source")
+            return record["source"]
+
+        if role == self.itemPinnedRole:
+            return bool(record["pinned"])
 
         if role == self.itemHtmlRole:
-            query = self.executeQuery(
-                SQL_SELECT_DATA,
-                id=record.value("id"),
-                format=formats.mimeHtml,
-            )
-            if query.next():
-                return query.value("bytes")
-            return ""
+            return self.cachedRoleData(index.row())["html"]
 
         if role == self.itemHasImageRole:
-            query = self.executeQuery(
-                SQL_SELECT_DATA,
-                id=record.value("id"),
-                format=formats.mimePng,
-            )
-            return query.next()
+            return formats.mimePng in self.cachedRoleData(index.row())["formats"]
+
+        if role == self.itemImageHashRole:
+            return self.cachedRoleData(index.row())["imageHash"]
 
         if role == self.itemDataRole:
-            query = self.executeQuery(SQL_SELECT_FORMAT_AND_DATA, id=record.value("id"))
+            return self.rowData(index.row())
 
-            data = {}
-            while query.next():
-                data[query.value("format")] = query.value("bytes")
+        return None
 
-            text = record.value("text")
-            if text:
-                data[formats.mimeText] = text
+    @Slot(int, result="QVariantMap")
+    def rowData(self, row):
+        """Returns all formats of an item (loaded only on request)."""
+        record = self.itemRecord(row)
+        if record is None:
+            return {}
 
-            return data
+        query = self.executeQuery(SQL_SELECT_FORMAT_AND_DATA, id=record["id"])
 
-        return None
+        data = {}
+        while query.next():
+            data[query.value("format")] = decode(
+                query.value("codec"), query.value("bytes")
+            )
+        query.finish()
 
-    def columnCount(self, _index):
-        # Show only single column in item views
-        return 1
+        text = record["text"]
+        if text:
+            data[formats.mimeText] = text
 
-    def imageData(self, row):
-        record = self.record(row)
-        query = self.executeQuery(
-            SQL_SELECT_DATA, id=record.value("id"), format=formats.mimePng
-        )
-        if query.next():
-            return query.value(0)
-        return None
+        data[formats.mimeOwner] = QByteArray(record[COLUMN_HASH].encode("utf-8"))
+        return data
+
+    def preparedQuery(self, queryText: str):
+        """Returns query prepared once and reused for the same text."""
+        query = self.queries.get(queryText)
+        if query is None:
+            query = QSqlQuery(self.database())
+            prepareQuery(query, queryText)
+            self.queries[queryText] = query
+            while len(self.queries) > PREPARED_QUERY_CACHE_SIZE:
+                self.queries.popitem(last=False)
+        else:
+            query.finish()
+            self.queries.move_to_end(queryText)
+
+        return query
+
+    def queryValue(self, queryText: str, default=None, **kwargs):
+        """Returns the first column of the first row of a query result."""
+        query = self.executeQuery(queryText, **kwargs)
+        value = query.value(0) if query.next() else default
+        query.finish()
+        return value
+
+    def finishQueries(self):
+        for query in self.queries.values():
+            query.finish()
 
     def executeQuery(self, queryText: str, **kwargs):
-        query = QSqlQuery(self.database())
-        prepareQuery(query, queryText)
+        query = self.preparedQuery(queryText)
         for name, value in kwargs.items():
             query.bindValue(f":{name}", value)
         executeQuery(query)
+        self.stats.add("queries")
         return query
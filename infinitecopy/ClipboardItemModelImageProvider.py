@@ -1,25 +1,125 @@
 # SPDX-License-Identifier: LGPL-2.0-or-later
-from PySide6.QtGui import QPixmap
-from PySide6.QtQuick import QQuickImageProvider
+import itertools
+import logging
+import threading
 
+from PySide6.QtCore import QRunnable, QThreadPool
+from PySide6.QtGui import QImage
+from PySide6.QtQuick import (
+    QQuickAsyncImageProvider,
+    QQuickImageResponse,
+    QQuickTextureFactory,
+)
+from PySide6.QtSql import QSqlDatabase
 
-class ClipboardItemModelImageProvider(QQuickImageProvider):
-    def __init__(self, model):
-        QQuickImageProvider.__init__(self, QQuickImageProvider.Pixmap)
-        self.model = model
+from infinitecopy.ClipboardItemModel import ClipboardItemModel
+from infinitecopy.Thumbnails import Thumbnails
+
+# Number of threads decoding images.
+IMAGE_THREAD_COUNT = 2
+
+logger = logging.getLogger(__name__)
+
+_connectionIds = itertools.count()
+
+
+def openModel(dbPath):
+    name = f"images-{next(_connectionIds)}"
+    db = QSqlDatabase.addDatabase("QSQLITE", name)
+    db.setDatabaseName(dbPath)
+    if not db.open():
+        error = db.lastError().text()
+        del db
+        QSqlDatabase.removeDatabase(name)
+        raise ValueError(f"Failed to open database: {error}")
+
+    model = ClipboardItemModel(db)
+    model.setUpConnection()
+    return model
+
+
+class ImageResponse(QQuickImageResponse):
+    def __init__(self):
+        super().__init__()
+        self.image = QImage()
 
-    def requestPixmap(self, id_, _size, _requestedSize):
-        row = int(id_)
+    def textureFactory(self):
+        return QQuickTextureFactory.textureFactoryForImage(self.image)
+
+
+class ImageTask(QRunnable):
+    def __init__(self, provider, response, imageHash, requestedSize):
+        super().__init__()
+        self.provider = provider
+        self.response = response
+        self.imageHash = imageHash
+        self.requestedSize = requestedSize
+
+    def run(self):
+        try:
+            model = self.provider.threadModel()
+            try:
+                self.response.image = self.provider.thumbnails.thumbnail(
+                    model, self.imageHash, self.requestedSize
+                )
+            finally:
+                model.finishQueries()
+        except ValueError as e:
+            logger.warning("Failed to load image: %s", e)
+        finally:
+            self.response.finished.emit()
+
+
+class ClipboardItemModelImageProvider(QQuickAsyncImageProvider):
+    """
+    Provides thumbnails of item images by image data hash.
+
+    Images not cached in memory are loaded in a thread pool, each thread using
+    its own database connection. The connections are closed in waitForDone().
+    """
+
+    def __init__(self, model):
+        QQuickAsyncImageProvider.__init__(self)
+        self.dbPath = model.database().databaseName()
+        self.thumbnails = Thumbnails()
+        # Models by thread ID; threading.local() does not persist in pool
+        # threads between tasks.
+        self.models = {}
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(IMAGE_THREAD_COUNT)
+        # Keep threads, and their database connections, for later requests,
+        # instead of opening new connections as threads expire.
+        self.pool.setExpiryTimeout(-1)
 
-        if row < 0 or row >= self.model.rowCount():
-            return QPixmap()
+    def threadModel(self):
+        """Returns model for the database connection of the current thread."""
+        threadId = threading.get_ident()
+        model = self.models.get(threadId)
+        if model is None:
+            model = openModel(self.dbPath)
+            self.models[threadId] = model
+        return model
 
-        data = self.model.imageData(row)
-        if data is None:
-            return QPixmap()
+    def requestImageResponse(self, id_, requestedSize):
+        response = ImageResponse()
+        image = self.thumbnails.cached(id_, requestedSize)
+        if image is not None:
+            response.image = image
+            response.finished.emit()
+        else:
+            self.pool.start(ImageTask(self, response, id_, requestedSize))
+        return response
 
-        pixmap = QPixmap()
-        if not pixmap.loadFromData(data):
-            return QPixmap()
+    def waitForDone(self):
+        self.pool.waitForDone()
+        self.closeConnections()
 
-        return pixmap
+    def closeConnections(self):
+        while self.models:
+            _threadId, model = self.models.popitem()
+            db = model.database()
+            name = db.connectionName()
+            del model
+            db.close()
+            del db
+            QSqlDatabase.removeDatabase(name)
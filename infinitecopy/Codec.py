@@ -0,0 +1,86 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+import logging
+import zlib
+from fnmatch import fnmatchcase
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+CODEC_NONE = ""
+CODEC_ZLIB = "zlib"
+CODEC_ZSTD = "zstd"
+
+
+class CodecConfig:
+    # Smallest data size to compress, None to disable compression.
+    minSize = 4096
+    # Keep compressed data only if it saves at least this fraction of size.
+    minSavedRatio = 0.1
+    # Codec for new data. Data stored with zstd can be read back only if the
+    # optional zstandard module is installed.
+    codec = CODEC_ZLIB
+    zlibLevel = 6
+    zstdLevel = 3
+    # Formats which are already compressed.
+    skippedFormats = [
+        "image/png",
+        "image/jpeg",
+        "image/gif",
+        "image/webp",
+        "application/gzip",
+        "application/zip",
+        "application/zstd",
+    ]
+
+
+def selectedCodec(config):
+    if config.codec == CODEC_ZSTD and zstandard is None:
+        return CODEC_ZLIB
+    return config.codec
+
+
+def compress(codec, bytes_, config):
+    if codec == CODEC_ZSTD:
+        return zstandard.ZstdCompressor(level=config.zstdLevel).compress(bytes_)
+    return zlib.compress(bytes_, config.zlibLevel)
+
+
+def decode(codec, bytes_):
+    if codec == CODEC_NONE:
+        return bytes_
+
+    if codec == CODEC_ZLIB:
+        return zlib.decompress(bytes_)
+
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError("Python module zstandard is needed to read item data")
+        return zstandard.ZstdDecompressor().decompress(bytes_)
+
+    raise ValueError(f"Unknown codec for item data: {codec!r}")
+
+
+def shouldCompress(format_, size, config):
+    return (
+        config.minSize is not None
+        and size >= config.minSize
+        and not any(fnmatchcase(format_, p) for p in config.skippedFormats)
+    )
+
+
+def encode(format_, bytes_, config):
+    """Returns codec name and data to store."""
+    size = len(bytes_)
+    if not shouldCompress(format_, size, config):
+        return CODEC_NONE, bytes_
+
+    codec = selectedCodec(config)
+    compressed = compress(codec, bytes_, config)
+    if len(compressed) > size * (1 - config.minSavedRatio):
+        return CODEC_NONE, bytes_
+
+    return codec, compressed
@@ -1,8 +1,10 @@
 # SPDX-License-Identifier: LGPL-2.0-or-later
+import inspect
 import logging
 
 import infinitecopy.commands
 from infinitecopy.Client import Client
+from infinitecopy.RequestReader import RequestReader
 
 logger = logging.getLogger(__name__)
 
@@ -11,6 +13,8 @@ class CommandHandler:
     def __init__(self, app):
         self.app = app
         self.commands = {}
+        # Readers of connected clients.
+        self.readers = set()
 
         for name, fn in infinitecopy.commands.__dict__.items():
             if name.startswith("command_") and callable(fn):
@@ -18,10 +22,84 @@ class CommandHandler:
                 command_name = name[prefix:]
                 self.commands[command_name] = fn
 
+        # Generator commands receive arguments as they arrive.
+        self.streamingCommands = {
+            name
+            for name, fn in self.commands.items()
+            if inspect.isgeneratorfunction(fn)
+        }
+
     def receive(self, socket):
         client = Client(socket)
+        reader = RequestReader(client, streamingCommands=self.streamingCommands)
+        self.readers.add(reader)
+        reader.requestStarted.connect(lambda request: self._start(client, request))
+        reader.argumentReceived.connect(
+            lambda request, arg: self._resume(
+                client, request, lambda stream: stream.send(arg)
+            )
+        )
+        reader.requestReceived.connect(lambda request: self._run(client, request))
+        reader.failed.connect(lambda error: self._fail(client, reader, error))
+        socket.disconnected.connect(lambda: self._disconnected(reader))
+        reader.start()
+
+    def _disconnected(self, reader):
+        self.readers.discard(reader)
+        self._stop_stream(reader)
+
+    def _fail(self, client, reader, error):
+        self._stop_stream(reader)
+        # Drop output of previous requests so the error is sent right away.
+        client.pending.clear()
+        client.sendError(error)
+        client.disconnect()
+
+    def _stop_stream(self, reader):
+        request = reader.request
+        if request is not None and request.stream is not None:
+            request.stream.close()
+            request.stream = None
+
+    def _start(self, client, request):
+        client.exit_code = None
+        if request.request_id is not None:
+            client.sendRequestId(request.request_id)
+        logger.debug("Received streaming command: %s", request.name)
+        request.stream = self.commands[request.name](self.app, client)
+        self._resume(client, request, next)
+
+    def _resume(self, client, request, resume):
+        """Runs streaming command until it waits for the next argument."""
+        if request.stream is None:
+            return
+
+        try:
+            resume(request.stream)
+        except StopIteration:
+            request.stream = None
+        except Exception as e:
+            logger.info("Client failure: %s", e)
+            client.sendError(str(e))
+            request.stream = None
+
+    def _run(self, client, request):
+        if request.streaming:
+            # None marks the end of the request.
+            self._resume(client, request, lambda stream: stream.send(None))
+            if request.stream is not None:
+                request.stream.close()
+                request.stream = None
+            if client.exit_code is None:
+                client.sendExit(0)
+            return
+
+        client.exit_code = None
+        client.arguments = request.arguments
+        if request.request_id is not None:
+            client.sendRequestId(request.request_id)
         try:
-            self._on_message_helper(client)
+            self._on_message_helper(client, request.name)
         except Exception as e:
             logger.info("Client failure: %s", e)
             client.sendError(str(e))
@@ -29,8 +107,7 @@ class CommandHandler:
             if client.exit_code is None:
                 client.sendExit(0)
 
-    def _on_message_helper(self, client):
-        command = client.receiveCommandName()
+    def _on_message_helper(self, client, command):
         logger.debug("Received command: %s", command)
         fn = self.commands.get(command)
         if fn:
@@ -0,0 +1,157 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+from infinitecopy.Codec import CODEC_NONE
+
+COLUMN_HASH = "hash"
+COLUMN_TEXT = "text"
+SQL_CREATE_TABLE_ITEM = f"""
+CREATE TABLE IF NOT EXISTS item (
+    id INTEGER PRIMARY KEY,
+    createdTime TIMESTAMP NOT NULL,
+    {COLUMN_HASH} TEXT,
+    {COLUMN_TEXT} TEXT,
+    source TEXT
+);
+"""
+
+SQL_CREATE_TABLE_DATA = """
+CREATE TABLE IF NOT EXISTS data (
+    itemId INTEGER NOT NULL,
+    format TEXT NOT NULL,
+    bytes BLOB NOT NULL,
+    FOREIGN KEY(itemId) REFERENCES item(id)
+        ON DELETE CASCADE
+);
+"""
+
+# Trigram index of item text used to find filter candidates quickly.
+SQL_CREATE_TABLE_ITEM_FTS = f"""
+CREATE VIRTUAL TABLE IF NOT EXISTS item_fts USING fts5(
+    {COLUMN_TEXT},
+    content = 'item',
+    content_rowid = 'id',
+    tokenize = 'trigram'
+);
+"""
+
+SQL_CREATE_TRIGGERS_ITEM_FTS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS item_fts_insert AFTER INSERT ON item BEGIN
+        INSERT INTO item_fts (rowid, text)
+        VALUES (new.id, new.text);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS item_fts_delete AFTER DELETE ON item BEGIN
+        INSERT INTO item_fts (item_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS item_fts_update AFTER UPDATE ON item BEGIN
+        INSERT INTO item_fts (item_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO item_fts (rowid, text)
+        VALUES (new.id, new.text);
+    END;
+    """,
+]
+
+# Content-addressed storage for item data. Blobs are shared by items with the
+# same data and removed once no item references them.
+SQL_CREATE_TABLE_BLOB = """
+CREATE TABLE IF NOT EXISTS blob (
+    hash TEXT PRIMARY KEY,
+    bytes BLOB NOT NULL,
+    refs INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+SQL_CREATE_TABLE_BLOB_DATA = """
+CREATE TABLE IF NOT EXISTS data (
+    itemId INTEGER NOT NULL,
+    format TEXT NOT NULL,
+    blobHash TEXT NOT NULL,
+    FOREIGN KEY(itemId) REFERENCES item(id)
+        ON DELETE CASCADE
+        ON UPDATE CASCADE,
+    FOREIGN KEY(blobHash) REFERENCES blob(hash)
+);
+"""
+
+SQL_CREATE_TRIGGERS_BLOB_REFS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS blob_ref AFTER INSERT ON data BEGIN
+        UPDATE blob SET refs = refs + 1 WHERE hash = new.blobHash;
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS blob_unref AFTER DELETE ON data BEGIN
+        UPDATE blob SET refs = refs - 1 WHERE hash = old.blobHash;
+        DELETE FROM blob WHERE hash = old.blobHash AND refs <= 0;
+    END;
+    """,
+]
+
+# Downscaled images by hash of the original image blob and maximum size.
+SQL_CREATE_TABLE_THUMBNAIL = """
+CREATE TABLE IF NOT EXISTS thumbnail (
+    hash TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    bytes BLOB NOT NULL,
+    PRIMARY KEY (hash, size)
+) WITHOUT ROWID;
+"""
+
+SQL_CREATE_TRIGGER_BLOB_THUMBNAILS = """
+CREATE TRIGGER IF NOT EXISTS blob_thumbnails AFTER DELETE ON blob BEGIN
+    DELETE FROM thumbnail WHERE hash = old.hash;
+END;
+"""
+
+SQL_ENABLE_FOREIGN_KEYS = "PRAGMA foreign_keys = ON;"
+
+# Initial schema, changed later by SQL_MIGRATIONS.
+SQL_CREATE_DB = [
+    SQL_CREATE_TABLE_ITEM,
+    SQL_CREATE_TABLE_DATA,
+    "CREATE INDEX IF NOT EXISTS index_item_hash ON item (hash);",
+    "CREATE INDEX IF NOT EXISTS index_data_item_id ON data (itemId);",
+]
+
+# Schema changes for existing databases. The number of applied migrations is
+# stored in "PRAGMA user_version".
+SQL_MIGRATIONS = [
+    # 1: Full-text index for filtering items, backfilled from existing items.
+    [
+        SQL_CREATE_TABLE_ITEM_FTS,
+        *SQL_CREATE_TRIGGERS_ITEM_FTS,
+        "INSERT INTO item_fts (item_fts) VALUES ('rebuild');",
+    ],
+    # 2: Deduplicated item data, referenced by content hash.
+    [
+        # Foreign keys were not enforced before, so drop data of removed items.
+        "DELETE FROM data WHERE itemId NOT IN (SELECT id FROM item);",
+        "DROP INDEX IF EXISTS index_data_item_id;",
+        "ALTER TABLE data RENAME TO data_old;",
+        SQL_CREATE_TABLE_BLOB,
+        SQL_CREATE_TABLE_BLOB_DATA,
+        "CREATE INDEX IF NOT EXISTS index_data_item_id ON data (itemId);",
+        "CREATE INDEX IF NOT EXISTS index_data_blob_hash ON data (blobHash);",
+        *SQL_CREATE_TRIGGERS_BLOB_REFS,
+        lambda model: model.moveDataToBlobs("data_old"),
+        "DROP TABLE data_old;",
+    ],
+    # 3: Optionally compressed blobs.
+    [
+        f"ALTER TABLE blob ADD COLUMN codec TEXT NOT NULL DEFAULT '{CODEC_NONE}';",
+    ],
+    # 4: Pinned items are never removed automatically.
+    [
+        "ALTER TABLE item ADD COLUMN pinned INTEGER NOT NULL DEFAULT 0;",
+    ],
+    # 5: Cached image thumbnails.
+    [
+        SQL_CREATE_TABLE_THUMBNAIL,
+        SQL_CREATE_TRIGGER_BLOB_THUMBNAILS,
+    ],
+]
@@ -0,0 +1,88 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+from PySide6.QtCore import QElapsedTimer, QObject, QTimer, Signal
+
+from infinitecopy.Stats import Stats
+
+
+class Debouncer(QObject):
+    """
+    Delays handling of clipboard change events of a single source.
+
+    The delay doubles, up to the maximum, while events keep coming before the
+    current delay expires (for example, when selecting text with the mouse)
+    and drops back to the minimum after an isolated change.
+
+    Counts received events, and performed and skipped reads.
+    """
+
+    triggered = Signal()
+
+    def __init__(self, name, minDelayMs, maxDelayMs, stats):
+        super().__init__()
+        self.name = name
+        self.minDelayMs = minDelayMs
+        self.maxDelayMs = maxDelayMs
+        self.delayMs = minDelayMs
+        self.stats = stats
+        self.lastOfferKey = None
+        self.elapsed = QElapsedTimer()
+
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.triggered)
+
+    def onChanged(self):
+        self.stats.add(f"{self.name}Events")
+        if self.elapsed.isValid():
+            elapsedMs = self.elapsed.restart()
+            if elapsedMs < self.delayMs:
+                self.delayMs = min(2 * self.delayMs, self.maxDelayMs)
+            elif elapsedMs > self.maxDelayMs:
+                self.delayMs = self.minDelayMs
+        else:
+            self.elapsed.start()
+        self.timer.start(self.delayMs)
+
+    def shouldRead(self, offered, offerKey=None):
+        """
+        Returns False if reading offered formats can be skipped.
+
+        Reading is skipped if nothing is offered or if the offer key matches the
+        previous offer. The key identifies the offered content (for example,
+        the owner marker of data copied from this application), or is None if
+        unknown.
+        """
+        unchanged = not offered or (
+            offerKey is not None and offerKey == self.lastOfferKey
+        )
+        self.lastOfferKey = offerKey
+        self.stats.add(f"{self.name}Skipped" if unchanged else f"{self.name}Reads")
+        return not unchanged
+
+
+def debounceChanges(clipboard, config):
+    """
+    Sets up stats and debouncers of clipboard and selection changes.
+
+    The clipboard object handles the delayed changes in
+    onClipboardChangedAfterDelay() and onSelectionChangedAfterDelay().
+    """
+    clipboard.stats = Stats("clipboard")
+    clipboard.clipboardDebouncer = Debouncer(
+        "clipboard",
+        config.clipboardChangedDelayMs,
+        config.clipboardChangedMaxDelayMs,
+        clipboard.stats,
+    )
+    clipboard.clipboardDebouncer.triggered.connect(
+        clipboard.onClipboardChangedAfterDelay
+    )
+    clipboard.selectionDebouncer = Debouncer(
+        "selection",
+        config.selectionChangedDelayMs,
+        config.selectionChangedMaxDelayMs,
+        clipboard.stats,
+    )
+    clipboard.selectionDebouncer.triggered.connect(
+        clipboard.onSelectionChangedAfterDelay
+    )
@@ -0,0 +1,42 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+import hashlib
+
+import infinitecopy.MimeFormats as formats
+
+
+def updateHash(hash_, format_, bytes_):
+    hash_.update(format_.encode("utf-8"))
+    hash_.update(b";;")
+    hash_.update(bytes_)
+
+
+def createHash(data):
+    hash_ = hashlib.sha256()
+
+    for format_ in data:
+        if format_.startswith(formats.mimePrefixInternal):
+            continue
+
+        updateHash(hash_, format_, data[format_])
+
+    return hash_.hexdigest()
+
+
+def isSameData(data, other):
+    """
+    Returns True if both items contain the same formats and bytes.
+
+    Sizes are compared first, so most changes are detected without comparing
+    or hashing the bytes.
+    """
+    if other is None or data.keys() != other.keys():
+        return False
+    if any(len(bytes_) != len(other[format_]) for format_, bytes_ in data.items()):
+        return False
+    return all(bytes_ == other[format_] for format_, bytes_ in data.items())
+
+
+def createBlobHash(format_, bytes_):
+    hash_ = hashlib.sha256()
+    updateHash(hash_, format_, bytes_)
+    return hash_.hexdigest()
@@ -0,0 +1,197 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+import logging
+import threading
+from collections import deque
+
+from PySide6.QtCore import QElapsedTimer, QThread, Signal
+from PySide6.QtSql import QSqlDatabase
+
+import infinitecopy.MimeFormats as formats
+from infinitecopy.ClipboardItemModel import (
+    ClipboardItemModel,
+    isEmptyItem,
+    isOwnedItem,
+)
+from infinitecopy.Retention import RetentionConfig, pruneItems
+from infinitecopy.Stats import Stats
+from infinitecopy.Storage import runMaintenance
+
+DB_CONNECTION_NAME = "writer"
+
+logger = logging.getLogger(__name__)
+
+
+class ItemWriterConfig:
+    # Maximum number of items waiting to be written. Adding more items blocks
+    # until the writer catches up, but at most for maxWaitMs, after which the
+    # new item is dropped so the GUI thread is never blocked for long.
+    maxQueueSize = 8
+    maxWaitMs = 2000
+    # Items from these sources replace a previous item from the same source
+    # which is still waiting to be written (for example, while extending
+    # a text selection).
+    coalescedSources = [formats.valueSourceSelection]
+
+
+class ItemWriter(QThread):
+    """
+    Writes new items to the database from a separate thread.
+
+    Items are written using a separate database connection and the IDs of
+    the written items are passed to the itemsWritten signal.
+
+    Previous IDs of items moved to the top and old items exceeding the
+    retention limits are passed to the itemsRemoved signal.
+
+    Database maintenance also runs in this thread, when requested.
+    """
+
+    itemsWritten = Signal(list)
+    itemsRemoved = Signal(list)
+
+    def __init__(
+        self, dbPath, config=ItemWriterConfig, retentionConfig=RetentionConfig
+    ):
+        super().__init__()
+        self.dbPath = dbPath
+        self.config = config
+        self.retentionConfig = retentionConfig
+        self.lastPruned = QElapsedTimer()
+        self.pending = deque()
+        self.condition = threading.Condition()
+        self.stopping = False
+        # Set when the thread exits, possibly after a failure.
+        self.exited = False
+        self.maintenanceRequested = False
+        self.stats = Stats("writer")
+
+    def add(self, data):
+        if isEmptyItem(data) and not isOwnedItem(data):
+            return
+
+        source = data.get(formats.mimeSource)
+        with self.condition:
+            self.stats.add("items")
+            if (
+                self.pending
+                and source in self.config.coalescedSources
+                and self.pending[-1].get(formats.mimeSource) == source
+            ):
+                self.pending[-1] = data
+                self.stats.add("coalesced")
+                return
+
+            if len(self.pending) >= self.config.maxQueueSize:
+                self.stats.add("waits")
+                self.condition.wait_for(
+                    lambda: len(self.pending) < self.config.maxQueueSize or self.exited,
+                    timeout=self.config.maxWaitMs / 1000,
+                )
+
+            if self.exited or len(self.pending) >= self.config.maxQueueSize:
+                logger.error("Dropping new item, database writer is not running")
+                self.stats.add("dropped")
+                return
+
+            self.pending.append(data)
+            self.condition.notify_all()
+
+    def stop(self):
+        """Writes remaining items and stops the thread."""
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+        self.wait()
+
+    def requestMaintenance(self):
+        """Runs database maintenance after writing pending items."""
+        with self.condition:
+            self.maintenanceRequested = True
+            self.condition.notify_all()
+
+    def takePending(self):
+        """Returns pending items and whether maintenance was requested."""
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self.pending or self.stopping or self.maintenanceRequested
+            )
+            items = list(self.pending)
+            self.pending.clear()
+            # Avoid delaying quit.
+            maintenance = self.maintenanceRequested and not self.stopping
+            self.maintenanceRequested = False
+            self.condition.notify_all()
+            return items, maintenance
+
+    def run(self):
+        try:
+            self.writeUntilStopped()
+        except Exception as e:
+            logger.exception("Database writer failed: %s", e)
+        finally:
+            with self.condition:
+                self.exited = True
+                self.condition.notify_all()
+
+    def writeUntilStopped(self):
+        db = QSqlDatabase.addDatabase("QSQLITE", DB_CONNECTION_NAME)
+        db.setDatabaseName(self.dbPath)
+        if not db.open():
+            logger.error("Failed to open database: %s", db.lastError().text())
+            return
+
+        try:
+            model = ClipboardItemModel(db)
+            model.stats = self.stats
+            model.setUpConnection()
+            self.prune(model)
+            while True:
+                items, maintenance = self.takePending()
+                if not items and not maintenance:
+                    break
+                if items:
+                    self.write(model, items)
+                if self.lastPruned.elapsed() >= self.retentionConfig.intervalMs:
+                    self.prune(model)
+                if maintenance:
+                    self.maintain(model)
+            model.finishQueries()
+            del model
+        finally:
+            db.close()
+            del db
+            QSqlDatabase.removeDatabase(DB_CONNECTION_NAME)
+
+    def write(self, model, items):
+        model.beginTransaction()
+        try:
+            for data in items:
+                model.addItemNoCommit(data)
+            ids, replacedIds = model.commitTransaction()
+        except Exception as e:
+            model.rollbackTransaction()
+            logger.error("Failed to write items: %s", e)
+            return
+
+        self.stats.add("batches")
+        if replacedIds:
+            self.itemsRemoved.emit(replacedIds)
+        if ids:
+            self.itemsWritten.emit(ids)
+
+    def maintain(self, model):
+        try:
+            runMaintenance(model, model.storageConfig)
+        except ValueError as e:
+            logger.warning("Database maintenance failed: %s", e)
+
+    def prune(self, model):
+        self.lastPruned.start()
+        try:
+            ids = pruneItems(model, self.retentionConfig)
+        except ValueError as e:
+            logger.error("Failed to find old items: %s", e)
+            return
+
+        if ids:
+            self.itemsRemoved.emit(ids)
@@ -1,4 +1,6 @@
 # SPDX-License-Identifier: LGPL-2.0-or-later
+from fnmatch import fnmatchcase
+
 from PySide6.QtCore import QByteArray
 
 mimeText = "text/plain"
@@ -14,3 +16,28 @@ mimeOwner = f"{mimePrefixInternal}owner"
 mimeSource = f"{mimePrefixInternal}source"
 valueSourceClipboard = QByteArray(b"clipboard")
 valueSourceSelection = QByteArray(b"selection")
+
+
+def matchFormats(patterns, offered):
+    """
+    Returns offered formats matching any of the patterns.
+
+    Patterns can contain wildcards, for example "image/*".
+    """
+    return [
+        format_
+        for format_ in offered
+        if any(fnmatchcase(format_, pattern) for pattern in patterns)
+    ]
+
+
+def formatsToRead(patterns, offered):
+    """
+    Returns offered formats to read after a change.
+
+    Only the owner format, containing the item hash, is read for data copied
+    from this application, because the item is already stored.
+    """
+    if mimeOwner in offered:
+        return [mimeOwner]
+    return matchFormats(patterns, offered)
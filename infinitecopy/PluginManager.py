@@ -74,7 +74,7 @@ class PluginManager:
             if plugin.onClipboardChanged(data) is False:
                 return
 
-        self.app.clipboardItemModel.addItemNoEmpty(data)
+        self.app.itemWriter.add(data)
 
     def onKeyEvent(self, event):
         for plugin in self.plugins:
@@ -0,0 +1,172 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+import logging
+from collections import deque
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+from infinitecopy.protocol import PROTOCOL_VERSION, MessageId
+
+logger = logging.getLogger(__name__)
+
+# Maximum time to wait for the rest of an incomplete request.
+REQUEST_TIMEOUT_MS = 30000
+MAX_MESSAGE_BYTES = 256 * 1024 * 1024
+# Maximum size of arguments buffered for a request (arguments of streaming
+# commands are passed on as they arrive).
+MAX_REQUEST_BYTES = 1024 * 1024 * 1024
+
+
+class Request:
+    def __init__(self, request_id=None):
+        self.request_id = request_id
+        self.name = None
+        self.arguments = deque()
+        # Bytes of arguments buffered for the request.
+        self.size = 0
+        # Streaming commands receive arguments as they arrive.
+        self.streaming = False
+        # Generator of running streaming command.
+        self.stream = None
+        # Argument received in chunks.
+        self.chunks = None
+
+
+class RequestReader(QObject):
+    """
+    Parses requests from a client connection as data arrives.
+
+    Emits requestReceived(Request) once a request is complete, so the event
+    loop is never blocked waiting for a slow client.
+
+    Arguments of streaming commands are not buffered: requestStarted(Request)
+    is emitted after the command name is received and argumentReceived(Request,
+    argument) for each argument. Emits failed(str) if the
+    client sends an unexpected or too large message, or if a started request
+    is not completed in time.
+    """
+
+    requestStarted = Signal(object)
+    argumentReceived = Signal(object, object)
+    requestReceived = Signal(object)
+    failed = Signal(str)
+
+    def __init__(
+        self,
+        client,
+        timeoutMs=REQUEST_TIMEOUT_MS,
+        maxMessageBytes=MAX_MESSAGE_BYTES,
+        maxRequestBytes=MAX_REQUEST_BYTES,
+        streamingCommands=(),
+    ):
+        super().__init__()
+        self.client = client
+        self.client.max_message_bytes = maxMessageBytes
+        self.maxRequestBytes = maxRequestBytes
+        self.streamingCommands = streamingCommands
+        # Protocol version is unknown until the first message.
+        self.version = None
+        self.request = None
+        self.done = False
+
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(timeoutMs)
+        self.timer.timeout.connect(self._onTimeout)
+
+    def start(self):
+        self.client.socket.readyRead.connect(self.read)
+        self.client.socket.disconnected.connect(self.stop)
+        self.timer.start()
+        self.read()
+
+    def stop(self):
+        self.done = True
+        self.timer.stop()
+
+    def read(self):
+        try:
+            for msg_id, arg in self.client.receiveAvailable():
+                if self.done:
+                    break
+                self._onMessage(msg_id, arg)
+        except ValueError as e:
+            self._fail(str(e))
+            return
+
+        if self.done or (self.request is None and self.client.msg_id is None):
+            self.timer.stop()
+        else:
+            self.timer.start()
+
+    def _onMessage(self, msg_id, arg):
+        if self.version is None:
+            if msg_id == MessageId.HELLO:
+                self.version = min(int(arg), PROTOCOL_VERSION)
+                self.client.sendHello(self.version)
+                return
+            self.version = 1
+
+        if self.request is None:
+            if self.version == 1:
+                self.request = Request()
+                self._setName(msg_id, arg)
+            else:
+                self._expect(msg_id, MessageId.REQUEST_ID)
+                self.request = Request(bytes(arg).decode("utf-8"))
+        elif self.request.name is None:
+            self._setName(msg_id, arg)
+        elif msg_id in (MessageId.COMMAND_ARG, MessageId.COMMAND_ARG_CHUNK):
+            self._addArgument(msg_id, arg)
+        else:
+            self._expect(msg_id, MessageId.COMMAND_END)
+            if self.request.chunks is not None:
+                raise ValueError("Incomplete argument at the end of request")
+            request = self.request
+            self.request = None
+            # Single command per connection in version 1.
+            self.done = self.version == 1
+            self.requestReceived.emit(request)
+
+    def _setName(self, msg_id, arg):
+        self._expect(msg_id, MessageId.COMMAND_NAME)
+        request = self.request
+        request.name = bytes(arg).decode("utf-8")
+        request.streaming = request.name in self.streamingCommands
+        if request.streaming:
+            self.requestStarted.emit(request)
+
+    def _addArgument(self, msg_id, arg):
+        request = self.request
+        request.size += len(arg)
+        if request.size > self.maxRequestBytes:
+            raise ValueError(
+                f"Request exceeds maximum size of {self.maxRequestBytes} bytes"
+            )
+
+        if request.chunks is not None:
+            request.chunks.append(arg)
+            arg = request.chunks
+
+        if msg_id == MessageId.COMMAND_ARG_CHUNK:
+            request.chunks = arg
+        elif request.streaming:
+            request.chunks = None
+            request.size = 0
+            self.argumentReceived.emit(request, arg)
+        else:
+            request.chunks = None
+            request.arguments.append(arg)
+
+    def _expect(self, msg_id, expected_msg_id):
+        if msg_id != expected_msg_id:
+            raise ValueError(
+                f"Unexpected message ID {msg_id} (expected {expected_msg_id})"
+            )
+
+    def _fail(self, error):
+        logger.warning("Client request failed: %s", error)
+        self.stop()
+        self.failed.emit(error)
+
+    def _onTimeout(self):
+        self._fail("Timed out waiting for request")
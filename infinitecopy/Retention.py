@@ -0,0 +1,127 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+import json
+import logging
+
+from PySide6.QtCore import QDateTime
+
+import infinitecopy.MimeFormats as formats
+from infinitecopy.ClipboardItemModel import SQL_DELETE_ITEMS
+
+logger = logging.getLogger(__name__)
+
+SQL_SELECT_ITEMS_OVER_COUNT = (
+    "SELECT id FROM item WHERE NOT pinned ORDER BY id DESC LIMIT -1 OFFSET :count;"
+)
+SQL_SELECT_ITEMS_OLDER_THAN = (
+    "SELECT id FROM item WHERE NOT pinned AND createdTime < :createdTime;"
+)
+# Plain text is stored in the item table instead of the data table.
+SQL_SELECT_ITEMS_OVER_FORMAT_COUNT = (
+    "SELECT id FROM item WHERE NOT pinned AND ("
+    " (:matchesText AND length(text) > 0)"
+    " OR id IN (SELECT itemId FROM data WHERE format GLOB :format)"
+    ") ORDER BY id DESC LIMIT -1 OFFSET :count;"
+)
+# Data shared by multiple items is counted for each item.
+SQL_SELECT_ITEMS_OVER_SIZE = """
+WITH sizes AS (
+    SELECT id, coalesce(length(text), 0) + coalesce((
+        SELECT sum(length(bytes)) FROM data JOIN blob ON hash = blobHash
+        WHERE itemId = item.id
+    ), 0) AS size
+    FROM item WHERE NOT pinned
+), totals AS (
+    SELECT id, sum(size) OVER (ORDER BY id DESC) AS total FROM sizes
+)
+SELECT id FROM totals WHERE total > :size;
+"""
+
+
+class RetentionConfig:
+    """Limits for unpinned items, None to disable a limit (default)."""
+
+    maxItems = None
+    # Total size of item data.
+    maxBytes = None
+    maxAgeDays = None
+    # Maximum number of items with a format matching a glob pattern, for
+    # example: {"image/*": 100}. Patterns matching "text/plain" also count
+    # items with plain text.
+    formatLimits = {}
+    # Number of items to remove in a single transaction.
+    batchSize = 500
+    # Minimum time between checking the limits.
+    intervalMs = 10 * 60 * 1000
+
+
+def selectIds(model, queryText, **kwargs):
+    query = model.executeQuery(queryText, **kwargs)
+    ids = []
+    while query.next():
+        ids.append(query.value(0))
+    query.finish()
+    return ids
+
+
+def findExpiredItems(model, config):
+    """Returns dict with IDs of items to remove for each exceeded limit."""
+    expired = {}
+
+    if config.maxItems is not None:
+        expired["count"] = selectIds(
+            model, SQL_SELECT_ITEMS_OVER_COUNT, count=config.maxItems
+        )
+
+    # The database file size is cheap to get and it is never smaller than
+    # the item data.
+    if config.maxBytes is not None and model.databaseSize() > config.maxBytes:
+        expired["size"] = selectIds(
+            model, SQL_SELECT_ITEMS_OVER_SIZE, size=config.maxBytes
+        )
+
+    if config.maxAgeDays is not None:
+        createdTime = QDateTime.currentDateTime().addDays(-config.maxAgeDays)
+        expired["age"] = selectIds(
+            model, SQL_SELECT_ITEMS_OLDER_THAN, createdTime=createdTime
+        )
+
+    for format_, count in config.formatLimits.items():
+        matchesText = bool(formats.matchFormats([format_], [formats.mimeText]))
+        expired[format_] = selectIds(
+            model,
+            SQL_SELECT_ITEMS_OVER_FORMAT_COUNT,
+            format=format_,
+            count=count,
+            matchesText=int(matchesText),
+        )
+
+    return expired
+
+
+def pruneItems(model, config):
+    """Removes items exceeding the limits in batches and returns their IDs."""
+    expired = findExpiredItems(model, config)
+    ids = sorted(set().union(*expired.values()))
+    if not ids:
+        return []
+
+    removed = []
+    for i in range(0, len(ids), config.batchSize):
+        batch = ids[i : i + config.batchSize]
+        model.beginTransaction()
+        try:
+            model.executeQuery(SQL_DELETE_ITEMS, ids=json.dumps(batch))
+            model.commitTransaction()
+        except ValueError as e:
+            model.rollbackTransaction()
+            logger.error("Failed to remove old items: %s", e)
+            break
+        removed.extend(batch)
+
+    model.stats.add("pruned", len(removed))
+    logger.info(
+        "Removed %d old items (%s)",
+        len(removed),
+        ", ".join(f"{limit}: {len(ids)}" for limit, ids in expired.items() if ids),
+    )
+    return removed
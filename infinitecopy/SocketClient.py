@@ -0,0 +1,112 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+import logging
+import os
+import socket
+
+from infinitecopy.protocol import (
+    CONNECTION_TIMEOUT_MS,
+    STREAM_CHUNK_SIZE,
+    MessageId,
+    encodeMessageHeader,
+    handleResponseMessage,
+    socketPath,
+    splitMessages,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def isSupported():
+    return os.name == "posix" and hasattr(socket, "AF_UNIX")
+
+
+class SocketClient:
+    """
+    Command line client using Unix socket directly.
+
+    Avoids importing Qt to start quickly. Supports the same interface as
+    Client for sending a single command.
+    """
+
+    def __init__(self, log_states=True):
+        self.socket = None
+        self.error = None
+        self.exit_code = None
+        self.log_states = log_states
+        self.send_failed = False
+
+    def connect(self, serverName):
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.settimeout(CONNECTION_TIMEOUT_MS / 1000)
+        try:
+            self.socket.connect(socketPath(serverName))
+        except OSError:
+            self.disconnect()
+            return False
+        self.socket.settimeout(None)
+        return True
+
+    def disconnect(self):
+        if self.socket is not None:
+            self.socket.close()
+            self.socket = None
+
+    def flush(self):
+        """Data are written without buffering."""
+
+    def sendCommandName(self, arg):
+        self._send(MessageId.COMMAND_NAME, arg)
+
+    def sendCommandArgument(self, arg):
+        self._send(MessageId.COMMAND_ARG, arg)
+
+    def sendCommandArgumentFile(self, file):
+        """Sends content of a file as a single argument without reading it whole."""
+        chunk = file.read(STREAM_CHUNK_SIZE)
+        while next_chunk := file.read(STREAM_CHUNK_SIZE):
+            self._send(MessageId.COMMAND_ARG_CHUNK, chunk)
+            chunk = next_chunk
+        self._send(MessageId.COMMAND_ARG, chunk)
+
+    def sendCommandEnd(self):
+        self._send(MessageId.COMMAND_END, b"")
+
+    def waitForDisconnected(self):
+        """Receives output until the command exits."""
+        buffer = b""
+        while self.socket is not None:
+            try:
+                data = self.socket.recv(STREAM_CHUNK_SIZE)
+            except OSError as e:
+                self._on_error(e)
+                return
+            if not data:
+                self._on_error("Connection closed")
+                return
+
+            messages, buffer = splitMessages(buffer + data)
+            for msg_id, arg in messages:
+                if handleResponseMessage(self, msg_id, arg):
+                    self.disconnect()
+                    break
+
+    def _send(self, msg_id, arg):
+        if isinstance(arg, str):
+            arg = arg.encode("utf-8")
+
+        if self.socket is None or self.send_failed:
+            return
+
+        try:
+            self.socket.sendall(encodeMessageHeader(msg_id, len(arg)))
+            self.socket.sendall(arg)
+        except OSError as e:
+            # Keep the connection to receive an error sent by the application.
+            logger.debug("Failed to send message: %s", e)
+            self.send_failed = True
+
+    def _on_error(self, error):
+        self.error = f"Error: {error}"
+        if self.log_states:
+            logger.warning("Client socket error: %s", self.error)
+        self.disconnect()
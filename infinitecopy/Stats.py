@@ -0,0 +1,28 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+import time
+from collections import Counter
+
+
+class Stats:
+    """Named counters reported with rates since the previous report."""
+
+    def __init__(self, name):
+        self.name = name
+        self.counters = Counter()
+        self.reported = Counter()
+        self.reportedTime = time.monotonic()
+
+    def add(self, counter, value=1):
+        self.counters[counter] += value
+
+    def report(self):
+        now = time.monotonic()
+        elapsed = max(now - self.reportedTime, 1e-6)
+        lines = []
+        for counter, value in sorted(self.counters.items()):
+            rate = (value - self.reported[counter]) / elapsed
+            lines.append(f"{self.name}.{counter}: {value} ({rate:.1f}/s)")
+
+        self.reported = self.counters.copy()
+        self.reportedTime = now
+        return lines
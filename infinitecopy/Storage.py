@@ -0,0 +1,116 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+import logging
+
+from PySide6.QtCore import QElapsedTimer, QObject, QTimer, Slot
+
+logger = logging.getLogger(__name__)
+
+SQL_CHECKPOINT = "PRAGMA wal_checkpoint(TRUNCATE);"
+SQL_OPTIMIZE = "PRAGMA optimize;"
+SQL_INCREMENTAL_VACUUM = "PRAGMA incremental_vacuum;"
+SQL_GET_FREE_PAGES = "PRAGMA freelist_count;"
+
+
+class StorageConfig:
+    """Database connection options, None keeps the SQLite default."""
+
+    # Allows reading while items are written from another connection.
+    journalMode = "WAL"
+    # Commits in WAL mode are still atomic, only the last ones can be lost on
+    # power failure.
+    synchronous = "NORMAL"
+    cacheSizeKiB = 16384
+    mmapSize = 64 * 2**20
+    tempStore = "MEMORY"
+    # Free pages are reclaimed by maintenance. Existing databases need to be
+    # compacted (--compact) to apply this.
+    autoVacuum = "INCREMENTAL"
+    # How long to wait for another connection to finish writing.
+    busyTimeoutMs = 5000
+
+    # Maintenance runs when the window is hidden for a while, at most once in
+    # the interval.
+    maintenanceIdleMs = 60 * 1000
+    maintenanceIntervalMs = 60 * 60 * 1000
+    # Maximum number of free pages to release at once.
+    incrementalVacuumPages = 10000
+
+
+def connectionPragmas(config):
+    """Returns statements to set up a database connection."""
+    pragmas = {
+        # This must be set before creating the first table.
+        "auto_vacuum": config.autoVacuum,
+        "journal_mode": config.journalMode,
+        "synchronous": config.synchronous,
+        # Negative value is size in KiB instead of pages.
+        "cache_size": config.cacheSizeKiB and -config.cacheSizeKiB,
+        "mmap_size": config.mmapSize,
+        "temp_store": config.tempStore,
+        "busy_timeout": config.busyTimeoutMs,
+    }
+    return [
+        f"PRAGMA {name} = {value};"
+        for name, value in pragmas.items()
+        if value is not None
+    ]
+
+
+def runMaintenance(model, config):
+    """Checkpoints WAL, updates query planner statistics and frees pages."""
+    model.finishQueries()
+
+    query = model.executeQuery(SQL_CHECKPOINT)
+    busy = query.next() and query.value(0)
+    query.finish()
+    if busy:
+        logger.info("WAL checkpoint did not finish, database is busy")
+
+    model.queryValue(SQL_OPTIMIZE)
+
+    freeBefore = model.queryValue(SQL_GET_FREE_PAGES, default=0)
+    # The database driver executes a single step of the statement which frees
+    # a single page.
+    for _ in range(min(freeBefore, config.incrementalVacuumPages)):
+        model.executeQuery(SQL_INCREMENTAL_VACUUM).finish()
+    freeAfter = model.queryValue(SQL_GET_FREE_PAGES, default=0)
+
+    logger.info("Database maintenance: freed %d pages", freeBefore - freeAfter)
+    model.stats.add("maintenance")
+
+
+class StorageMaintenance(QObject):
+    """
+    Requests database maintenance while the app is idle.
+
+    The maintenance is started by calling the given function, which should
+    run it outside the GUI thread.
+    """
+
+    def __init__(self, start, config):
+        super().__init__()
+        self.start = start
+        self.config = config
+        self.lastRun = QElapsedTimer()
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(config.maintenanceIdleMs)
+        self.timer.timeout.connect(self.run)
+
+    @Slot(bool)
+    def setIdle(self, idle):
+        if not idle:
+            self.timer.stop()
+        elif not self.timer.isActive():
+            self.timer.start()
+
+    @Slot()
+    def run(self):
+        if (
+            self.lastRun.isValid()
+            and self.lastRun.elapsed() < self.config.maintenanceIntervalMs
+        ):
+            return
+
+        self.lastRun.start()
+        self.start()
@@ -0,0 +1,137 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+import logging
+import threading
+from collections import OrderedDict
+
+from PySide6.QtCore import QBuffer, QByteArray, QIODevice, QSize, Qt
+from PySide6.QtGui import QImage, QImageReader
+
+from infinitecopy.Codec import decode
+from infinitecopy.Stats import Stats
+
+logger = logging.getLogger(__name__)
+
+SQL_SELECT_BLOB = "SELECT codec, bytes FROM blob WHERE hash = :hash;"
+SQL_SELECT_THUMBNAIL = (
+    "SELECT bytes FROM thumbnail WHERE hash = :hash AND size = :size;"
+)
+SQL_INSERT_THUMBNAIL = (
+    "INSERT INTO thumbnail (hash, size, bytes) VALUES (:hash, :size, :bytes)"
+    " ON CONFLICT (hash, size) DO NOTHING;"
+)
+
+
+class ThumbnailConfig:
+    # Maximum thumbnail width and height; requested sizes are rounded up to
+    # the nearest one so thumbnails can be reused for similar sizes.
+    sizes = [64, 128, 256, 512, 1024]
+    # Size used if no size is requested.
+    defaultSize = 512
+    # Number of decoded thumbnails kept in memory.
+    cacheSize = 64
+
+
+def thumbnailSize(requestedSize, config):
+    size = max(requestedSize.width(), requestedSize.height())
+    if size <= 0:
+        size = config.defaultSize
+    return next((s for s in config.sizes if s >= size), config.sizes[-1])
+
+
+def scaleImage(bytes_, size):
+    """
+    Decodes image scaled down to fit the size.
+
+    Returns the image and whether it was scaled.
+    """
+    buffer = QBuffer()
+    buffer.setData(QByteArray(bytes_))
+    reader = QImageReader(buffer)
+    imageSize = reader.size()
+    scaled = imageSize.isValid() and (
+        imageSize.width() > size or imageSize.height() > size
+    )
+    if scaled:
+        reader.setScaledSize(imageSize.scaled(QSize(size, size), Qt.KeepAspectRatio))
+    image = reader.read()
+    if image.isNull():
+        logger.warning("Failed to decode image: %s", reader.errorString())
+    return image, scaled
+
+
+def encodeImage(image):
+    buffer = QBuffer()
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, "PNG")
+    return buffer.data()
+
+
+class Thumbnails:
+    """
+    Downscaled previews of item images.
+
+    Thumbnails are created on first request, stored in the database by image
+    data hash and size, and the recently used ones are kept in memory.
+    The memory cache can be shared by multiple threads, each using a separate
+    database connection.
+    """
+
+    def __init__(self, config=ThumbnailConfig):
+        self.config = config
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = Stats("thumbnails")
+
+    def cached(self, imageHash, requestedSize):
+        """Returns thumbnail from memory or None."""
+        key = (imageHash, thumbnailSize(requestedSize, self.config))
+        with self.lock:
+            image = self.cache.get(key)
+            if image is None:
+                self.stats.add("cacheMisses")
+            else:
+                self.cache.move_to_end(key)
+                self.stats.add("cacheHits")
+            return image
+
+    def thumbnail(self, model, imageHash, requestedSize):
+        """Returns thumbnail from memory or loads it using the model."""
+        image = self.cached(imageHash, requestedSize)
+        if image is None:
+            image = self.create(model, imageHash, requestedSize)
+        return image
+
+    def create(self, model, imageHash, requestedSize):
+        """Loads thumbnail using the model and caches it in memory."""
+        key = (imageHash, thumbnailSize(requestedSize, self.config))
+        image = self.load(model, *key)
+        with self.lock:
+            self.cache[key] = image
+            while len(self.cache) > self.config.cacheSize:
+                self.cache.popitem(last=False)
+        return image
+
+    def load(self, model, imageHash, size):
+        stored = model.queryValue(SQL_SELECT_THUMBNAIL, hash=imageHash, size=size)
+        if stored is not None:
+            return QImage.fromData(stored)
+
+        query = model.executeQuery(SQL_SELECT_BLOB, hash=imageHash)
+        bytes_ = None
+        if query.next():
+            bytes_ = decode(query.value("codec"), query.value("bytes"))
+        query.finish()
+        if bytes_ is None:
+            return QImage()
+
+        image, scaled = scaleImage(bytes_, size)
+        # Small images are cheap to decode again.
+        if scaled and not image.isNull():
+            model.executeQuery(
+                SQL_INSERT_THUMBNAIL,
+                hash=imageHash,
+                size=size,
+                bytes=encodeImage(image),
+            )
+            self.stats.add("created")
+        return image
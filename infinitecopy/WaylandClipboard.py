@@ -5,7 +5,6 @@ from PySide6.QtCore import (
     Property,
     QByteArray,
     QCoreApplication,
-    QElapsedTimer,
     QIODevice,
     QObject,
     QProcess,
@@ -16,9 +15,22 @@ from PySide6.QtCore import (
 from PySide6.QtQml import QJSValue
 
 import infinitecopy.MimeFormats as formats
+from infinitecopy.Debouncer import debounceChanges
+from infinitecopy.WaylandDataControl import (
+    PipeReader,
+    WaylandDataControl,
+    WaylandError,
+)
 
 PROCESS_START_TIMEOUT_MS = 5000
 PROCESS_FINISH_TIMEOUT_MS = 5000
+PROCESS_KILL_TIMEOUT_MS = 1000
+
+# Connection to the compositor is restored only a few times after errors,
+# then clipboard is accessed using wl-paste and wl-copy.
+MAX_DATA_CONTROL_RECONNECTS = 3
+
+LIST_TYPES = "--list-types"
 
 IGNORED_WL_PASTE_ERRORS = [
     "No suitable type of content copied",
@@ -39,13 +51,8 @@ def isFinished(process, timeout):
 
 
 def waitForFinished(process):
-    elapsed = QElapsedTimer()
-    elapsed.start()
-
-    while not isFinished(process, 50) and elapsed.elapsed() < PROCESS_FINISH_TIMEOUT_MS:
-        QCoreApplication.processEvents()
-
-    if isFinished(process, 0):
+    """Blocks until the process finishes, without processing other events."""
+    if isFinished(process, PROCESS_FINISH_TIMEOUT_MS):
         return True
 
     logger.warning(
@@ -55,9 +62,7 @@ def waitForFinished(process):
     )
 
     process.terminate()
-    while not isFinished(process, 50) and elapsed.elapsed() < PROCESS_FINISH_TIMEOUT_MS:
-        QCoreApplication.processEvents()
-
+    isFinished(process, PROCESS_FINISH_TIMEOUT_MS)
     return False
 
 
@@ -81,7 +86,7 @@ def startWlPasteProcess(args, slot, name):
         slot()
 
     process.readyReadStandardOutput.connect(changed)
-    process.readyReadStandardError.connect(logPasteErrorOutput)
+    process.readyReadStandardError.connect(lambda: logPasteErrorOutput(process))
     process.start("wl-paste", ["--watch", "echo"] + args, QIODevice.ReadOnly)
     if not process.waitForStarted(PROCESS_START_TIMEOUT_MS):
         logger.critical(
@@ -103,11 +108,6 @@ def setClipboardData(format_, bytes_):
     return process.waitForFinished()
 
 
-def clearClipboardData():
-    process = ClipboardSetterProcess(["--clear"], None)
-    return process.waitForFinished()
-
-
 class ClipboardDataProcess:
     def __init__(self, format_, args):
         self.process = QProcess()
@@ -163,23 +163,175 @@ class ClipboardSetterProcess:
         return waitForFinished(self.process)
 
 
+def markOwnedData(data, owned):
+    """
+    Returns only the owner marker if data were set by this application.
+
+    Used with wl-copy, which cannot offer the marker with the data.
+    """
+    if owned is None:
+        return data
+    format_, bytes_, owner = owned
+    if owner is None or bytes(data.get(format_, b"")) != bytes_:
+        return data
+    return {formats.mimeOwner: QByteArray(owner)}
+
+
+def connectDataControl():
+    dataControl = WaylandDataControl()
+    try:
+        dataControl.connectToDisplay()
+    except (OSError, WaylandError) as e:
+        logger.info("Falling back to wl-paste: %s", e)
+        dataControl.close()
+        return None
+    return dataControl
+
+
+class ProcessReader(QObject):
+    """Reads clipboard data of a format asynchronously using wl-paste."""
+
+    finished = Signal(QByteArray)
+
+    def __init__(self, args, maxBytes):
+        super().__init__()
+        self.args = args
+        self.maxBytes = maxBytes
+        self.out = QByteArray()
+        self.done = False
+
+        self.process = QProcess()
+        self.process.readyReadStandardOutput.connect(self.read)
+        self.process.readyReadStandardError.connect(
+            lambda: logPasteErrorOutput(self.process)
+        )
+        self.process.finished.connect(self.onProcessFinished)
+        self.process.errorOccurred.connect(self.onProcessError)
+
+    def start(self):
+        self.process.start("wl-paste", self.args, QIODevice.ReadOnly)
+
+    def read(self):
+        self.out.append(self.process.readAllStandardOutput())
+        if self.out.size() > self.maxBytes:
+            logger.warning(
+                "Ignoring clipboard data over %d bytes: wl-paste %s",
+                self.maxBytes,
+                " ".join(self.args),
+            )
+            self.abort()
+            self.finished.emit(QByteArray())
+
+    def abort(self):
+        if not self.done:
+            self.done = True
+            self.process.kill()
+            self.process.waitForFinished(PROCESS_KILL_TIMEOUT_MS)
+
+    def onProcessFinished(self):
+        if self.done:
+            return
+        self.read()
+        self.done = True
+        # Avoid extra new line from wl-paste output.
+        if self.out.endsWith(b"\n"):
+            self.out.chop(1)
+        self.finished.emit(self.out)
+
+    def onProcessError(self, error):
+        if error == QProcess.FailedToStart and not self.done:
+            logger.critical(
+                "Failed to get clipboard with wl-paste: %s",
+                self.process.errorString(),
+            )
+            self.done = True
+            self.finished.emit(QByteArray())
+
+
+class ClipboardDataReader(QObject):
+    """
+    Reads clipboard data of multiple formats in parallel.
+
+    Emits finished once, after all readers finish or the deadline is reached.
+    """
+
+    finished = Signal(dict)
+
+    def __init__(self, readers, timeoutMs):
+        super().__init__()
+        self.data = {}
+        self.readers = readers
+        for format_, reader in readers.items():
+            reader.finished.connect(
+                lambda bytes_, format_=format_: self.onReaderFinished(format_, bytes_)
+            )
+
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(timeoutMs)
+        self.timer.timeout.connect(self.onTimeout)
+
+    def start(self):
+        if not self.readers:
+            self.finished.emit(self.data)
+            return
+
+        self.timer.start()
+        for reader in list(self.readers.values()):
+            reader.start()
+
+    def onReaderFinished(self, format_, bytes_):
+        if self.readers.pop(format_, None) is None:
+            return
+        if not bytes_.isEmpty():
+            self.data[format_] = bytes_
+        if not self.readers:
+            self.timer.stop()
+            self.finished.emit(self.data)
+
+    def onTimeout(self):
+        logger.warning("Timed out reading clipboard data: %s", ", ".join(self.readers))
+        readers = self.readers
+        self.readers = {}
+        for reader in readers.values():
+            reader.abort()
+        self.finished.emit(self.data)
+
+
 class WaylandClipboard(QObject):
+    """
+    Wayland clipboard access.
+
+    Uses data-control protocol directly if the compositor supports it,
+    otherwise falls back to running wl-paste and wl-copy.
+    """
+
     changed = Signal(dict)
 
     def __init__(self, config):
         super().__init__()
 
-        self.clipboardTimer = QTimer()
-        self.clipboardTimer.setInterval(config.clipboardChangedDelayMs)
-        self.clipboardTimer.setSingleShot(True)
-        self.clipboardTimer.timeout.connect(self.onClipboardChangedAfterDelay)
-
-        self.selectionTimer = QTimer()
-        self.selectionTimer.setInterval(config.selectionChangedDelayMs)
-        self.selectionTimer.setSingleShot(True)
-        self.selectionTimer.timeout.connect(self.onSelectionChangedAfterDelay)
+        debounceChanges(self, config)
 
         self.formats = config.formats
+        self.readTimeoutMs = config.readTimeoutMs
+        self.maxFormatBytes = config.maxFormatBytes
+        self.dataReaders = set()
+        self.processes = []
+        self.reconnects = 0
+        # Format, data and owner marker last set using wl-copy.
+        self.owned = None
+
+        self.watch(connectDataControl())
+
+        QCoreApplication.instance().aboutToQuit.connect(self.onAboutToQuit)
+
+    def watch(self, dataControl):
+        self.dataControl = dataControl
+        if dataControl:
+            dataControl.selectionChanged.connect(self.onOfferChanged)
+            dataControl.closed.connect(self.onDataControlClosed)
+            return
 
         clipboardProcess = startWlPasteProcess([], self.onClipboardChanged, "clipboard")
         selectionProcess = startWlPasteProcess(
@@ -187,44 +339,110 @@ class WaylandClipboard(QObject):
         )
         self.processes = [p for p in (clipboardProcess, selectionProcess) if p]
 
-        QCoreApplication.instance().aboutToQuit.connect(self.onAboutToQuit)
+    def onDataControlClosed(self):
+        self.dataControl = None
+        if self.reconnects >= MAX_DATA_CONTROL_RECONNECTS:
+            logger.warning("Falling back to wl-paste after repeated Wayland errors")
+            self.watch(None)
+            return
+
+        self.reconnects += 1
+        logger.warning("Reconnecting to Wayland compositor")
+        self.watch(connectDataControl())
 
     def isOk(self):
+        if self.dataControl:
+            return self.dataControl.socket is not None
         return self.processes and all(
             p and p.state() == QProcess.Running for p in self.processes
         )
 
     def onAboutToQuit(self):
+        if self.dataControl:
+            self.dataControl.closed.disconnect(self.onDataControlClosed)
+            self.dataControl.close()
         for process in self.processes:
             process.terminate()
         for process in self.processes:
             waitForFinished(process)
 
     def onClipboardChanged(self):
-        self.clipboardTimer.start()
+        self.clipboardDebouncer.onChanged()
 
     def onSelectionChanged(self):
-        self.selectionTimer.start()
+        self.selectionDebouncer.onChanged()
+
+    def onOfferChanged(self, _offer, primary):
+        if primary:
+            self.onSelectionChanged()
+        else:
+            self.onClipboardChanged()
 
     def onClipboardChangedAfterDelay(self):
-        self.emitChanged([], formats.valueSourceClipboard)
+        debouncer = self.clipboardDebouncer
+        if self.dataControl:
+            self.readOffer(False, formats.valueSourceClipboard, debouncer)
+        else:
+            self.emitChanged([], formats.valueSourceClipboard, debouncer)
 
     def onSelectionChangedAfterDelay(self):
-        self.emitChanged(["--primary"], formats.valueSourceSelection)
-
-    def emitChanged(self, args, source):
-        data = {}
-        processes = [
-            (format_, ClipboardDataProcess(format_, args)) for format_ in self.formats
-        ]
-
-        for format_, process in processes:
-            bytes_ = process.output()
-            if not bytes_.isEmpty():
-                data[format_] = bytes_
-
-        data[formats.mimeSource] = source
-        self.changed.emit(data)
+        debouncer = self.selectionDebouncer
+        if self.dataControl:
+            self.readOffer(True, formats.valueSourceSelection, debouncer)
+        else:
+            self.emitChanged(["--primary"], formats.valueSourceSelection, debouncer)
+
+    def readOffer(self, primary, source, debouncer):
+        offer = self.dataControl.selections[primary]
+        offered = offer.mimeTypes if offer else []
+        # Each new selection gets a new offer.
+        if not debouncer.shouldRead(offered, offer):
+            return
+
+        readers = {}
+        for format_ in formats.formatsToRead(self.formats, offered):
+            try:
+                fd = self.dataControl.receive(offer, format_)
+            except (OSError, WaylandError) as e:
+                logger.warning("Failed to request clipboard data: %s", e)
+                continue
+            readers[format_] = PipeReader(fd, self.maxFormatBytes)
+        self.readData(readers, source)
+
+    def emitChanged(self, args, source, debouncer):
+        def readFormats(data):
+            types = bytes(data.get(LIST_TYPES, b"")).decode("utf-8", errors="replace")
+            offered = types.splitlines()
+            if not debouncer.shouldRead(offered):
+                return
+
+            readers = {
+                format_: ProcessReader(["--type", format_] + args, self.maxFormatBytes)
+                for format_ in formats.formatsToRead(self.formats, offered)
+            }
+            self.readData(readers, source)
+
+        reader = ProcessReader([LIST_TYPES] + args, self.maxFormatBytes)
+        self.startReader({LIST_TYPES: reader}, readFormats)
+
+    def readData(self, readers, source):
+        def emitData(data):
+            data = markOwnedData(data, self.owned)
+            data[formats.mimeSource] = source
+            self.changed.emit(data)
+
+        self.startReader(readers, emitData)
+
+    def startReader(self, readers, callback):
+        reader = ClipboardDataReader(readers, self.readTimeoutMs)
+        self.dataReaders.add(reader)
+
+        def onFinished(data):
+            self.dataReaders.discard(reader)
+            callback(data)
+
+        reader.finished.connect(onFinished)
+        reader.start()
 
     @Property(str)
     def text(self):
@@ -233,18 +451,30 @@ class WaylandClipboard(QObject):
 
     @text.setter
     def text(self, text):
-        return setClipboardData(formats.mimeOwner, b"1") and setClipboardData(
-            formats.mimeText, text.encode("utf-8")
-        )
+        self.setClipboard({formats.mimeText: text.encode("utf-8")})
 
     @Slot(QJSValue)
     def setData(self, value):
-        clearClipboardData()
-        data = value.toVariant()
-        setClipboardData(formats.mimeOwner, b"1")
-        processes = [
-            ClipboardSetterProcess(["--type", format_], toBytes(data))
-            for format_, data in data.items()
-        ]
-        for process in processes:
-            process.waitForFinished()
+        self.setClipboard(value.toVariant())
+
+    def setClipboard(self, data):
+        data = {format_: bytes(toBytes(bytes_)) for format_, bytes_ in data.items()}
+        if self.dataControl:
+            try:
+                self.dataControl.setSelection(data)
+                return
+            except (OSError, WaylandError) as e:
+                logger.warning("Failed to set clipboard: %s", e)
+                self.dataControl.close()
+
+        # Each wl-copy replaces the previous selection, so only a single format
+        # can be set. The owner marker is restored when the data is read back.
+        userFormats = [f for f in data if not f.startswith(formats.mimePrefixInternal)]
+        if formats.mimeText in data:
+            format_ = formats.mimeText
+        elif userFormats:
+            format_ = userFormats[0]
+        else:
+            return
+        self.owned = (format_, data[format_], data.get(formats.mimeOwner))
+        setClipboardData(format_, data[format_])
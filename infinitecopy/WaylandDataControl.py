@@ -0,0 +1,438 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+"""
+Minimal Wayland client for the data-control protocols.
+
+Implements only the parts of the wire protocol needed to watch clipboard and
+primary selection offers (ext-data-control-v1 or wlr-data-control-unstable-v1),
+to receive offered data through pipes and to serve own data.
+"""
+
+import logging
+import os
+import select
+import socket
+import struct
+
+from PySide6.QtCore import QByteArray, QObject, QSocketNotifier, Signal
+
+logger = logging.getLogger(__name__)
+
+# Both protocols have the same requests and events.
+DATA_CONTROL_MANAGERS = {
+    "ext_data_control_manager_v1": 1,
+    "zwlr_data_control_manager_v1": 2,
+}
+
+ROUNDTRIP_TIMEOUT_S = 2
+MAX_FDS_PER_READ = 28
+READ_SIZE = 4096
+PIPE_READ_SIZE = 65536
+PIPE_WRITE_SIZE = 65536
+
+DISPLAY_ID = 1
+
+# Requests
+DISPLAY_SYNC = 0
+DISPLAY_GET_REGISTRY = 1
+REGISTRY_BIND = 0
+MANAGER_CREATE_DATA_SOURCE = 0
+MANAGER_GET_DATA_DEVICE = 1
+DEVICE_SET_SELECTION = 0
+DEVICE_DESTROY = 1
+DEVICE_SET_PRIMARY_SELECTION = 2
+OFFER_RECEIVE = 0
+OFFER_DESTROY = 1
+SOURCE_OFFER = 0
+SOURCE_DESTROY = 1
+
+# Events
+DISPLAY_ERROR = 0
+DISPLAY_DELETE_ID = 1
+REGISTRY_GLOBAL = 0
+CALLBACK_DONE = 0
+DEVICE_DATA_OFFER = 0
+DEVICE_SELECTION = 1
+DEVICE_FINISHED = 2
+DEVICE_PRIMARY_SELECTION = 3
+OFFER_OFFER = 0
+SOURCE_SEND = 0
+SOURCE_CANCELLED = 1
+
+
+class WaylandError(RuntimeError):
+    pass
+
+
+def encodeUint(value):
+    return struct.pack("=I", value)
+
+
+def encodeString(text):
+    data = text.encode("utf-8") + b"\0"
+    padding = -len(data) % 4
+    return encodeUint(len(data)) + data + b"\0" * padding
+
+
+def encodeMessage(objectId, opcode, *args):
+    payload = b"".join(
+        encodeString(arg) if isinstance(arg, str) else encodeUint(arg) for arg in args
+    )
+    size = 8 + len(payload)
+    return struct.pack("=II", objectId, size << 16 | opcode) + payload
+
+
+class MessageReader:
+    """Reads arguments of a received message."""
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.offset = 0
+
+    def uint(self):
+        (value,) = struct.unpack_from("=I", self.payload, self.offset)
+        self.offset += 4
+        return value
+
+    def string(self):
+        size = self.uint()
+        if size == 0:
+            return None
+        data = self.payload[self.offset : self.offset + size - 1]
+        self.offset += size + (-size % 4)
+        return data.decode("utf-8", errors="replace")
+
+
+def splitMessages(buffer):
+    """Returns complete messages (object ID, opcode, payload) and the rest."""
+    messages = []
+    offset = 0
+    while len(buffer) - offset >= 8:
+        objectId, sizeAndOpcode = struct.unpack_from("=II", buffer, offset)
+        size = sizeAndOpcode >> 16
+        if size < 8:
+            raise WaylandError(f"Bad message size {size}")
+        if len(buffer) - offset < size:
+            break
+        payload = bytes(buffer[offset + 8 : offset + size])
+        messages.append((objectId, sizeAndOpcode & 0xFFFF, payload))
+        offset += size
+    return messages, buffer[offset:]
+
+
+def socketPath():
+    display = os.environ.get("WAYLAND_DISPLAY", "wayland-0")
+    if os.path.isabs(display):
+        return display
+    runtimeDir = os.environ.get("XDG_RUNTIME_DIR")
+    if not runtimeDir:
+        raise WaylandError("XDG_RUNTIME_DIR is not set")
+    return os.path.join(runtimeDir, display)
+
+
+class PipeReader(QObject):
+    """Reads all data from a pipe asynchronously until it is closed."""
+
+    finished = Signal(QByteArray)
+
+    def __init__(self, fd, maxBytes):
+        super().__init__()
+        self.fd = fd
+        self.maxBytes = maxBytes
+        self.data = QByteArray()
+        self.notifier = None
+
+    def start(self):
+        os.set_blocking(self.fd, False)
+        self.notifier = QSocketNotifier(self.fd, QSocketNotifier.Read)
+        self.notifier.activated.connect(self.read)
+
+    def read(self):
+        try:
+            while chunk := os.read(self.fd, PIPE_READ_SIZE):
+                self.data.append(chunk)
+                if self.data.size() > self.maxBytes:
+                    logger.warning(
+                        "Ignoring clipboard data over %d bytes", self.maxBytes
+                    )
+                    self.abort()
+                    self.finished.emit(QByteArray())
+                    return
+        except BlockingIOError:
+            return
+        except OSError as e:
+            logger.warning("Failed to read clipboard data: %s", e)
+            self.data.clear()
+        self.abort()
+        self.finished.emit(self.data)
+
+    def abort(self):
+        if self.fd is not None:
+            if self.notifier:
+                self.notifier.setEnabled(False)
+            os.close(self.fd)
+            self.fd = None
+
+
+class PipeWriter(QObject):
+    """Writes data to a pipe asynchronously and closes it."""
+
+    finished = Signal()
+
+    def __init__(self, fd, data):
+        super().__init__()
+        self.fd = fd
+        self.data = memoryview(data)
+        self.offset = 0
+        self.notifier = None
+
+    def start(self):
+        os.set_blocking(self.fd, False)
+        self.notifier = QSocketNotifier(self.fd, QSocketNotifier.Write)
+        self.notifier.activated.connect(self.write)
+        self.write()
+
+    def write(self):
+        if self.fd is None:
+            return
+        try:
+            while self.offset < len(self.data):
+                end = self.offset + PIPE_WRITE_SIZE
+                self.offset += os.write(self.fd, self.data[self.offset : end])
+        except BlockingIOError:
+            return
+        except OSError as e:
+            logger.debug("Failed to send clipboard data: %s", e)
+        self.notifier.setEnabled(False)
+        os.close(self.fd)
+        self.fd = None
+        self.finished.emit()
+
+
+class Offer:
+    def __init__(self, offerId):
+        self.id = offerId
+        self.mimeTypes = []
+
+
+class WaylandDataControl(QObject):
+    """
+    Watches and sets clipboard and primary selection using a data-control
+    protocol.
+
+    The selectionChanged signal passes the new offer (or None if the selection
+    was cleared) and whether it is the primary selection.
+
+    The closed signal is emitted when the connection is closed, for example,
+    after a protocol error.
+    """
+
+    selectionChanged = Signal(object, bool)
+    closed = Signal()
+
+    def __init__(self, sock=None):
+        super().__init__()
+        self.socket = sock
+        self.buffer = b""
+        self.fds = []
+        self.nextId = DISPLAY_ID + 1
+        self.globals = {}
+        self.handlers = {}
+        self.offers = {}
+        self.selections = {False: None, True: None}
+        self.sources = {}
+        self.writers = set()
+        self.managerId = None
+        self.deviceId = None
+        self.notifier = None
+        self.supportsPrimary = False
+
+    def newId(self, handler):
+        objectId = self.nextId
+        self.nextId += 1
+        self.handlers[objectId] = handler
+        return objectId
+
+    def connectToDisplay(self):
+        """Connects to the compositor; raises WaylandError on failure."""
+        if self.socket is None:
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                self.socket.connect(socketPath())
+            except OSError as e:
+                raise WaylandError(f"Failed to connect to Wayland display: {e}") from e
+
+        self.handlers[DISPLAY_ID] = self.onDisplayEvent
+        registryId = self.newId(self.onRegistryEvent)
+        self.send(DISPLAY_ID, DISPLAY_GET_REGISTRY, registryId)
+        self.roundtrip()
+
+        manager = next(
+            (name for name in DATA_CONTROL_MANAGERS if name in self.globals), None
+        )
+        if manager is None:
+            raise WaylandError("Compositor does not support data-control protocol")
+        if "wl_seat" not in self.globals:
+            raise WaylandError("Compositor does not provide any seat")
+
+        managerVersion = min(self.globals[manager][1], DATA_CONTROL_MANAGERS[manager])
+        # Primary selection needs version 2 of the wlr protocol.
+        self.supportsPrimary = manager.startswith("ext_") or managerVersion >= 2
+        self.managerId = self.bind(registryId, manager, managerVersion)
+        seatId = self.bind(registryId, "wl_seat", 1)
+        self.deviceId = self.newId(self.onDeviceEvent)
+        self.send(self.managerId, MANAGER_GET_DATA_DEVICE, self.deviceId, seatId)
+        self.roundtrip()
+
+        self.socket.setblocking(False)
+        self.notifier = QSocketNotifier(self.socket.fileno(), QSocketNotifier.Read)
+        self.notifier.activated.connect(self.dispatch)
+        logger.info("Using %s version %d", manager, managerVersion)
+
+    def bind(self, registryId, interface, version):
+        name, _version = self.globals[interface]
+        objectId = self.newId(lambda _opcode, _args: None)
+        self.send(registryId, REGISTRY_BIND, name, interface, version, objectId)
+        return objectId
+
+    def close(self):
+        if self.notifier:
+            self.notifier.setEnabled(False)
+        for fd in self.fds:
+            os.close(fd)
+        self.fds = []
+        if self.socket:
+            self.socket.close()
+            self.socket = None
+            self.closed.emit()
+
+    def send(self, objectId, opcode, *args, fds=()):
+        if self.socket is None:
+            raise WaylandError("Not connected to Wayland display")
+        message = encodeMessage(objectId, opcode, *args)
+        if fds:
+            socket.send_fds(self.socket, [message], list(fds))
+        else:
+            self.socket.sendall(message)
+
+    def receive(self, offer, mimeType):
+        """Requests offered data; returns file descriptor to read it from."""
+        readFd, writeFd = os.pipe()
+        try:
+            self.send(offer.id, OFFER_RECEIVE, mimeType, fds=[writeFd])
+        except OSError:
+            os.close(readFd)
+            raise
+        finally:
+            os.close(writeFd)
+        return readFd
+
+    def setSelection(self, data, primary=False):
+        """
+        Offers data (dict with bytes for each MIME type) as new selection.
+
+        The data is served from memory until another client sets the selection.
+        """
+        sourceId = self.newId(None)
+        self.handlers[sourceId] = lambda opcode, args: self.onSourceEvent(
+            sourceId, opcode, args
+        )
+        self.sources[sourceId] = data
+        self.send(self.managerId, MANAGER_CREATE_DATA_SOURCE, sourceId)
+        for mimeType in data:
+            self.send(sourceId, SOURCE_OFFER, mimeType)
+        request = DEVICE_SET_PRIMARY_SELECTION if primary else DEVICE_SET_SELECTION
+        self.send(self.deviceId, request, sourceId)
+
+    def roundtrip(self):
+        done = []
+        callbackId = self.newId(lambda _opcode, _args: done.append(True))
+        self.send(DISPLAY_ID, DISPLAY_SYNC, callbackId)
+        while not done:
+            ready, _, _ = select.select([self.socket], [], [], ROUNDTRIP_TIMEOUT_S)
+            if not ready:
+                raise WaylandError("Timed out waiting for Wayland compositor")
+            if not self.readEvents():
+                raise WaylandError("Wayland compositor closed the connection")
+
+    def dispatch(self):
+        try:
+            if not self.readEvents():
+                logger.warning("Wayland compositor closed the connection")
+                self.close()
+        except BlockingIOError:
+            pass
+        except (OSError, WaylandError) as e:
+            logger.warning("Wayland data-control error: %s", e)
+            self.close()
+
+    def readEvents(self):
+        data, fds, _flags, _address = socket.recv_fds(
+            self.socket, READ_SIZE, MAX_FDS_PER_READ
+        )
+        if not data:
+            return False
+
+        self.fds.extend(fds)
+        messages, self.buffer = splitMessages(self.buffer + data)
+        for objectId, opcode, payload in messages:
+            handler = self.handlers.get(objectId)
+            if handler is not None:
+                handler(opcode, MessageReader(payload))
+        return True
+
+    def onDisplayEvent(self, opcode, args):
+        if opcode == DISPLAY_ERROR:
+            objectId, code, message = args.uint(), args.uint(), args.string()
+            raise WaylandError(
+                f"Wayland protocol error {code} for object {objectId}: {message}"
+            )
+        if opcode == DISPLAY_DELETE_ID:
+            self.handlers.pop(args.uint(), None)
+
+    def onRegistryEvent(self, opcode, args):
+        if opcode == REGISTRY_GLOBAL:
+            name, interface, version = args.uint(), args.string(), args.uint()
+            self.globals.setdefault(interface, (name, version))
+
+    def onDeviceEvent(self, opcode, args):
+        if opcode == DEVICE_DATA_OFFER:
+            offer = Offer(args.uint())
+            self.handlers[offer.id] = lambda opcode, args: self.onOfferEvent(
+                offer, opcode, args
+            )
+            self.offers[offer.id] = offer
+        elif opcode in (DEVICE_SELECTION, DEVICE_PRIMARY_SELECTION):
+            primary = opcode == DEVICE_PRIMARY_SELECTION
+            offer = self.offers.get(args.uint())
+            previous = self.selections[primary]
+            self.selections[primary] = offer
+            if previous is not None and previous not in self.selections.values():
+                self.destroyOffer(previous)
+            self.selectionChanged.emit(offer, primary)
+        elif opcode == DEVICE_FINISHED:
+            logger.warning("Wayland data-control device is no longer valid")
+            self.close()
+
+    def onOfferEvent(self, offer, opcode, args):
+        if opcode == OFFER_OFFER:
+            offer.mimeTypes.append(args.string())
+
+    def destroyOffer(self, offer):
+        self.offers.pop(offer.id, None)
+        self.send(offer.id, OFFER_DESTROY)
+
+    def onSourceEvent(self, sourceId, opcode, args):
+        if opcode == SOURCE_SEND:
+            mimeType = args.string()
+            fd = self.fds.pop(0)
+            bytes_ = self.sources.get(sourceId, {}).get(mimeType)
+            if bytes_ is None:
+                os.close(fd)
+                return
+            writer = PipeWriter(fd, bytes_)
+            self.writers.add(writer)
+            writer.finished.connect(lambda: self.writers.discard(writer))
+            writer.start()
+        elif opcode == SOURCE_CANCELLED:
+            self.sources.pop(sourceId, None)
+            self.send(sourceId, SOURCE_DESTROY)
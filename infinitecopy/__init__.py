@@ -1,6 +1,12 @@
 __version__ = "0.1.0"
 
-from infinitecopy import MimeFormats  # noqa
+import importlib
+
 from infinitecopy.Plugin import Plugin  # noqa
 
-formats = MimeFormats
+
+def __getattr__(name):
+    # Avoid importing Qt in the command line client.
+    if name in ("formats", "MimeFormats"):
+        return importlib.import_module("infinitecopy.MimeFormats")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,39 +1,33 @@
 #!/usr/bin/env python
 # SPDX-License-Identifier: LGPL-2.0-or-later
 import argparse
-import getpass
 import logging
 import os
 import signal
 import sys
 from pathlib import Path
 
-from PySide6.QtCore import QCoreApplication, QDir, QStandardPaths
-from PySide6.QtGui import QGuiApplication
-
 from infinitecopy import __version__
-from infinitecopy.Application import Application, ApplicationError
-from infinitecopy.Client import Client
-
-APPLICATION_NAME = "InfiniteCopy"
-
-logger = logging.getLogger(__name__)
-
+from infinitecopy.protocol import (
+    APPLICATION_NAME,
+    STREAM_CHUNK_SIZE,
+    appName,
+    serverName,
+)
+from infinitecopy.SocketClient import SocketClient, isSupported
 
-def appName(session):
-    if session:
-        return f"{APPLICATION_NAME}-{session}"
-    return APPLICATION_NAME
+# Qt modules are imported only when needed so that the command line client
+# starts quickly.
+# pylint: disable=import-outside-toplevel
 
+# Commands which receive input files (or "-" for stdin) as a stream of chunks.
+STREAMING_COMMANDS = ("import",)
 
-def serverName(session):
-    return f"{appName(session)}_{getpass.getuser()}"
+logger = logging.getLogger(__name__)
 
 
 def parseArguments(args=None):
-    parser = argparse.ArgumentParser(
-        description=QCoreApplication.translate("main", "Simple clipboard manager")
-    )
+    parser = argparse.ArgumentParser(description="Simple clipboard manager")
     parser.add_argument(
         "--version",
         action="version",
@@ -57,20 +51,36 @@ def parseArguments(args=None):
         default=os.getenv("INFINITECOPY_NO_PASTE") == "1",
         help="Disable pasting clipboard from the app",
     )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Remove unused data from the item database and exit",
+    )
     parser.add_argument(
         "--verbose",
         action="store_true",
         help="Enable verbose logs",
     )
     parser.add_argument(
-        QCoreApplication.translate("main", "commands"),
+        "commands",
         nargs="*",
-        help=QCoreApplication.translate("main", "Commands to send to the application"),
+        help="Commands to send to the application",
     )
     return parser.parse_args(args)
 
 
+def createClient():
+    if isSupported():
+        return SocketClient(log_states=False)
+
+    from infinitecopy.Client import Client
+
+    return Client(log_states=False)
+
+
 def createDbPath():
+    from PySide6.QtCore import QDir, QStandardPaths
+
     dataPath = QStandardPaths.writableLocation(QStandardPaths.AppLocalDataLocation)
     if not QDir(dataPath).mkpath("."):
         raise SystemExit(f"Failed to create data directory {dataPath}")
@@ -94,8 +104,43 @@ def setUpPaths(app):
     app.setMainWindowQml(qml)
 
 
+def sendStream(client, file):
+    while chunk := file.read(STREAM_CHUNK_SIZE):
+        client.sendCommandArgument(chunk)
+        client.flush()
+
+
+def sendFiles(client, paths):
+    for path in paths or ["-"]:
+        if path == "-":
+            sendStream(client, sys.stdin.buffer)
+        else:
+            try:
+                with open(path, "rb") as file:
+                    sendStream(client, file)
+            except OSError as e:
+                raise SystemExit(f"Failed to read {path}: {e}") from e
+        # Files may not end with a new line.
+        client.sendCommandArgument(b"\n")
+
+
+def sendArguments(client, args):
+    # Avoid reading whole stdin into memory if it is used only once.
+    streamStdin = args.count("-") == 1
+    stdin = None
+    for arg in args:
+        if arg != "-":
+            client.sendCommandArgument(arg)
+        elif streamStdin:
+            client.sendCommandArgumentFile(sys.stdin.buffer)
+        else:
+            if stdin is None:
+                stdin = sys.stdin.buffer.read()
+            client.sendCommandArgument(stdin)
+
+
 def handleClient(server_name, args):
-    client = Client(log_states=False)
+    client = createClient()
 
     if not client.connect(server_name):
         if args.commands:
@@ -106,13 +151,10 @@ def handleClient(server_name, args):
 
     args = args.commands or ["show"]
     client.sendCommandName(args[0])
-    stdin = None
-    for arg in args[1:]:
-        if arg == "-":
-            if stdin is None:
-                stdin = sys.stdin.buffer.read()
-            arg = stdin
-        client.sendCommandArgument(arg)
+    if args[0] in STREAMING_COMMANDS:
+        sendFiles(client, args[1:])
+    else:
+        sendArguments(client, args[1:])
 
     client.sendCommandEnd()
     client.waitForDisconnected()
@@ -125,7 +167,33 @@ def handleClient(server_name, args):
     return True
 
 
+def compactDatabase(server_name, dbPath):
+    client = createClient()
+    if client.connect(server_name):
+        raise SystemExit("Quit the application before compacting the database")
+
+    from PySide6.QtCore import QCoreApplication
+    from PySide6.QtSql import QSqlDatabase
+
+    from infinitecopy.ClipboardItemModel import ClipboardItemModel
+
+    _app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    db = QSqlDatabase.addDatabase("QSQLITE")
+    db.setDatabaseName(dbPath)
+    if not db.open():
+        raise SystemExit(f"Failed to open database: {db.lastError().text()}")
+
+    model = ClipboardItemModel(db)
+    model.create()
+    before, after = model.compact()
+    print(f"Database size: {before} -> {after} bytes (saved {before - after} bytes)")
+    db.close()
+
+
 def initApp(session):
+    from PySide6.QtCore import QCoreApplication
+    from PySide6.QtGui import QGuiApplication
+
     name = appName(session)
     QCoreApplication.setApplicationName(name)
     QCoreApplication.setApplicationVersion(__version__)
@@ -142,12 +210,18 @@ def createApp(args=None):
     elif args.verbose:
         logging.basicConfig(level=logging.INFO)
 
+    server_name = serverName(args.session)
+    if not args.compact and handleClient(server_name, args):
+        return None
+
     initApp(args.session)
 
-    server_name = serverName(args.session)
-    if handleClient(server_name, args):
+    if args.compact:
+        compactDatabase(server_name, createDbPath())
         return None
 
+    from infinitecopy.Application import Application, ApplicationError
+
     try:
         app = Application(
             dbPath=createDbPath(),
@@ -1,10 +1,18 @@
 # SPDX-License-Identifier: LGPL-2.0-or-later
+import base64
+import json
 import logging
 
+from PySide6.QtCore import QByteArray, QTimer
+
 import infinitecopy.MimeFormats as formats
+from infinitecopy.protocol import CONNECTION_TIMEOUT_MS
 
 logger = logging.getLogger(__name__)
 
+# Number of imported items to commit at once.
+IMPORT_BATCH_SIZE = 1000
+
 
 def unescape(escaped):
     return bytes(escaped).decode("unicode_escape")
@@ -39,8 +47,11 @@ def command_active(app, client):
 
 def command_quit(app, client):
     client.sendExit(0)
-    client.waitForDisconnected()
-    app.app.quit()
+    # Quit after the response is delivered without blocking the event loop.
+    # Session clients can keep the connection open, so close it from here.
+    client.socket.disconnected.connect(app.app.quit)
+    QTimer.singleShot(CONNECTION_TIMEOUT_MS, app.app.quit)
+    client.disconnect()
 
 
 def command_count(app, client):
@@ -48,18 +59,123 @@ def command_count(app, client):
     client.sendPrint(str(count).encode("utf-8"))
 
 
+def command_stats(app, client):
+    lines = (
+        app.clipboardItemModel.stats.report()
+        + app.itemWriter.stats.report()
+        + app.clipboard.stats.report()
+    )
+    client.sendPrint("\n".join(lines))
+
+
 def command_add(app, client):
     app.clipboardItemModel.beginTransaction()
     for text in client.receiveCommandArguments():
         logger.debug("command_add: Adding text item: %d bytes", len(text))
         app.clipboardItemModel.addItemNoCommit({formats.mimeText: text})
     app.clipboardItemModel.endTransaction()
-    app.clipboardItemModel.select()
+
+
+def toBytes(value):
+    if isinstance(value, str):
+        return value.encode("utf-8")
+    return bytes(value)
+
+
+def exportItem(createdTime, data):
+    """Returns item as a line in JSON Lines format."""
+    item = {
+        "createdTime": str(createdTime),
+        "data": {
+            format_: base64.b64encode(toBytes(bytes_)).decode("ascii")
+            for format_, bytes_ in data.items()
+        },
+    }
+    return json.dumps(item).encode("utf-8") + b"\n"
+
+
+def importItem(line):
+    """Returns created time and data of an item from a line in JSON Lines format."""
+    item = json.loads(line)
+    data = {
+        format_: QByteArray(base64.b64decode(bytes_, validate=True))
+        for format_, bytes_ in item["data"].items()
+    }
+    return item.get("createdTime"), data
+
+
+def importLines(model, lines, firstLineNumber):
+    """
+    Adds items from lines in JSON Lines format starting at given line number.
+
+    Returns number of added items. On failure, items added since the last
+    committed batch are rolled back.
+    """
+    count = 0
+    model.beginTransaction()
+    try:
+        for lineNumber, line in enumerate(lines, start=firstLineNumber):
+            if not line.strip():
+                continue
+
+            try:
+                createdTime, data = importItem(line)
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                raise ValueError(
+                    f"Failed to import item on line {lineNumber}: {e}"
+                ) from e
+
+            if model.addItemNoCommit(data, createdTime):
+                count += 1
+                if count % IMPORT_BATCH_SIZE == 0:
+                    model.endTransaction()
+                    model.beginTransaction()
+    except Exception:
+        model.rollbackTransaction()
+        raise
+
+    model.endTransaction()
+    return count
+
+
+def command_export(app, client):
+    # Avoid reading the whole history into memory.
+    client.sendPrintStream(
+        b"".join(exportItem(*item) for item in items)
+        for items in app.clipboardItemModel.exportItems()
+    )
+
+
+def command_import(app, _client):
+    """
+    Imports items from chunks in JSON Lines format.
+
+    This is a streaming command: chunks are received with yield as they
+    arrive and None marks the end of the request.
+    """
+    model = app.clipboardItemModel
+    count = 0
+    lineNumber = 1
+    # Unterminated line, kept until the rest of it arrives.
+    tail = bytearray()
+    while (chunk := (yield)) is not None:
+        *lines, rest = bytes(chunk).split(b"\n")
+        if not lines:
+            tail += rest
+            continue
+
+        lines[0] = bytes(tail + lines[0])
+        tail = bytearray(rest)
+        count += importLines(model, lines, lineNumber)
+        lineNumber += len(lines)
+
+    count += importLines(model, [bytes(tail)], lineNumber)
+    logger.info("Imported %d items", count)
 
 
 def command_get(app, client):
     sep = "\n"
-    write_sep = False
+    requests = []
     for arg in client.receiveCommandArguments():
         try:
             row = int(arg)
@@ -67,11 +183,14 @@ def command_get(app, client):
             sep = unescape(arg)
             continue
 
-        if write_sep and sep:
+        requests.append((sep, row))
+
+    texts = app.clipboardItemModel.getItems([row for _sep, row in requests])
+    for i, (sep, row) in enumerate(requests):
+        if i > 0 and sep:
             client.sendPrint(sep)
-        write_sep = True
 
-        text = app.clipboardItemModel.getItem(row)
+        text = texts.get(row)
         if text:
             client.sendPrint(text)
 
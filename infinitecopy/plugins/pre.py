@@ -1,6 +1,7 @@
 import logging
 
 from infinitecopy import Plugin, formats
+from infinitecopy.ItemData import isSameData
 
 SECRET_FORMATS = [
     "x-kde-passwordManagerHint",
@@ -21,7 +22,7 @@ class AvoidSpuriousChangesPlugin(Plugin):
 
     def onClipboardChanged(self, data):
         source = data.get(formats.mimeSource)
-        if self.lastData.get(source) == data:
+        if isSameData(data, self.lastData.get(source)):
             return False
 
         self.lastData[source] = data
@@ -0,0 +1,114 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+"""
+Messages exchanged between the application and its clients.
+
+Each message consists of a message ID (uint8), data length (uint32) and the
+data, all in QDataStream format (big-endian).
+
+Uses only Python standard library, so the command line client can avoid
+importing Qt.
+"""
+
+import getpass
+import logging
+import os
+import struct
+import sys
+import tempfile
+from enum import IntEnum
+
+logger = logging.getLogger(__name__)
+
+APPLICATION_NAME = "InfiniteCopy"
+
+CONNECTION_TIMEOUT_MS = 4000
+
+# Large arguments and output are split into chunks of this size.
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Version 1: Single command per connection; the client disconnects after
+# receiving EXIT.
+# Version 2: Client starts with HELLO and can send multiple requests on the
+# same connection. Each request and its response start with REQUEST_ID,
+# response ends with EXIT.
+#
+# Large argument can be sent as COMMAND_ARG_CHUNK messages followed by
+# COMMAND_ARG with the last part. Large output is sent as multiple PRINT
+# messages.
+PROTOCOL_VERSION = 2
+
+MESSAGE_HEADER = struct.Struct(">BI")
+
+
+class MessageId(IntEnum):
+    PRINT = 1
+    ERROR = 2
+    EXIT = 3
+    COMMAND_NAME = 4
+    COMMAND_ARG = 5
+    COMMAND_END = 6
+    HELLO = 7
+    REQUEST_ID = 8
+    COMMAND_ARG_CHUNK = 9
+
+
+def encodeMessageHeader(msg_id, size):
+    return MESSAGE_HEADER.pack(msg_id, size)
+
+
+def splitMessages(buffer):
+    """
+    Returns complete messages as (message ID, data) and the remaining bytes.
+    """
+    messages = []
+    offset = 0
+    while len(buffer) - offset >= MESSAGE_HEADER.size:
+        msg_id, size = MESSAGE_HEADER.unpack_from(buffer, offset)
+        end = offset + MESSAGE_HEADER.size + size
+        if len(buffer) < end:
+            break
+        messages.append((msg_id, buffer[offset + MESSAGE_HEADER.size : end]))
+        offset = end
+    return messages, buffer[offset:]
+
+
+def handleResponseMessage(client, msg_id, arg):
+    """
+    Handles message received by a command line client.
+
+    Writes output to stdout and sets error or exit code of the client.
+    Returns True if the response is complete.
+    """
+    if msg_id == MessageId.PRINT:
+        logger.debug("Client print: %d bytes", len(arg))
+        sys.stdout.buffer.write(arg)
+        sys.stdout.buffer.flush()
+        return False
+
+    if msg_id == MessageId.ERROR:
+        text = bytes(arg).decode("utf-8")
+        client.error = f"Error: {text}"
+    elif msg_id == MessageId.EXIT:
+        client.exit_code = max(client.exit_code or 0, int(arg))
+    else:
+        client.error = f"Unknown message ID {msg_id}: {type(arg)}"
+    return True
+
+
+def appName(session):
+    if session:
+        return f"{APPLICATION_NAME}-{session}"
+    return APPLICATION_NAME
+
+
+def serverName(session):
+    return f"{appName(session)}_{getpass.getuser()}"
+
+
+def socketPath(serverName):
+    """Returns path to Unix socket for QLocalServer with given name."""
+    if serverName.startswith("/"):
+        return serverName
+    # Same as QDir.tempPath() on Unix, which falls back to /tmp.
+    tempPath = os.path.normpath(os.environ.get("TMPDIR") or tempfile.gettempdir())
+    return os.path.join(tempPath, serverName)
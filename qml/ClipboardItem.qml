@@ -17,7 +17,6 @@ Item {
     implicitHeight: row.implicitHeight
 
     clip: true
-    property var dataDict: itemData
     property string text: itemText
     property string html: itemHtml
 
@@ -43,7 +42,7 @@ Item {
 
     MouseArea {
         anchors.fill: parent
-        onDoubleClicked: clipboard.setData(dataDict)
+        onDoubleClicked: clipboard.setData(view.model.rowData(delegate.index))
         onClicked: {
             const index = view.model.index(delegate.index, 0)
             view.selectionModel.setCurrentIndex(
@@ -58,12 +57,17 @@ Item {
 
         ClipboardItemRow {
             id: rowNumberText
-            text: index + 1
+            text: itemPinned ? `${index + 1} ★` : index + 1
         }
 
         Image {
-            source: hasImage ? 'image://items/' + index : ''
-            width: hasImage ? Math.min(sourceSize.width, delegate.parent.width - rowNumberText.width - createdTimeText.width - 3 * spacing) : 0
+            readonly property real maxWidth: delegate.parent.width - rowNumberText.width - createdTimeText.width - 3 * spacing
+
+            // Image data hash keeps the URL (and cached image) valid when rows move.
+            source: imageHash ? 'image://items/' + imageHash : ''
+            asynchronous: true
+            sourceSize.width: maxWidth
+            width: hasImage ? Math.min(implicitWidth, maxWidth) : 0
             fillMode: Image.PreserveAspectFit
         }
 
@@ -27,9 +27,7 @@ TableView {
             }
             return {"text/plain": text}
         } else if (clipboardItemView.currentRow >= 0) {
-            const index = listView.index(clipboardItemView.currentRow, 0)
-            const item = itemAtIndex(index)
-            return item.dataDict
+            return model.rowData(clipboardItemView.currentRow)
         }
         return {}
     }
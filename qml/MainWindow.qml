@@ -55,8 +55,18 @@ ColumnLayout {
         Component.onCompleted: {
             model.modelAboutToBeReset.connect(storeSelection)
             model.modelReset.connect(restoreSelection)
+            model.rowsInserted.connect(onRowsInserted)
             restoreSelection()
         }
+        function onRowsInserted(parent, first, last) {
+            // Keep the top row current when new items are added.
+            const row = clipboardItemView.currentRow
+            if (first === 0 && (row < 0 || row === last + 1)) {
+                const index = clipboardItemView.model.index(0, 0)
+                clipboardItemView.selectionModel.setCurrentIndex(
+                    index, ItemSelectionModel.Clear)
+            }
+        }
         function rowHash(row) {
             const index = clipboardItemView.index(row, 0)
             return clipboardItemModel.data(index, clipboardItemModel.itemHashRole)
@@ -103,6 +113,13 @@ ColumnLayout {
                 onTriggered: clipboard.setData(clipboardItemView.currentData())
             }
 
+            // Pin item action
+            MenuItem {
+                text: qsTr("&Pin/Unpin")
+                enabled: clipboardItemView.currentRow >= 0
+                onTriggered: clipboardItemModel.togglePinned(clipboardItemView.currentRow)
+            }
+
             // Delete item action
             MenuItem {
                 text: qsTr("&Delete")
@@ -167,6 +184,11 @@ ColumnLayout {
             }
         }
 
+        Shortcut {
+            sequence: 'Ctrl+P'
+            onActivated: clipboardItemModel.togglePinned(clipboardItemView.currentRow)
+        }
+
         Shortcut {
             sequences: [StandardKey.Delete]
             onActivated: removeSelected()
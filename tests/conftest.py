@@ -5,14 +5,20 @@ import sys
 import time
 from subprocess import PIPE, Popen
 
-from PySide6.QtCore import QDir
+from PySide6.QtCore import QByteArray, QDir
+from PySide6.QtGui import QGuiApplication
+from PySide6.QtSql import QSqlDatabase
 from pytest import fixture
 
-from infinitecopy.__main__ import createApp, createDbPath, initApp, serverName
+import infinitecopy.MimeFormats as formats
+from infinitecopy.__main__ import createApp, createDbPath, initApp
 from infinitecopy.Client import Client
+from infinitecopy.ClipboardItemModel import ClipboardItemModel
 from infinitecopy.PluginManager import plugin_paths
+from infinitecopy.protocol import serverName
 
 SESSION = "__TEST{}__"
+TEST_DB_CONNECTION = "__TEST__"
 APP_SESSION = "__TESTAPP__"
 _last_session_id = 0
 
@@ -38,6 +44,30 @@ CPULIMIT_ARGS = [
 logger = logging.getLogger(__name__)
 
 
+def add_item(model, text, createdTime=None, **data):
+    """Adds text item; keyword arguments add other formats ("_" for "/")."""
+    item = {formats.mimeText: QByteArray(text.encode("utf-8"))}
+    for format_, bytes_ in data.items():
+        item[format_.replace("_", "/")] = QByteArray(bytes_)
+    model.beginTransaction()
+    model.addItemNoCommit(item, createdTime)
+    model.endTransaction()
+
+
+def add_items(model, *texts):
+    model.beginTransaction()
+    for text in texts:
+        model.addItemNoCommit({formats.mimeText: QByteArray(text.encode("utf-8"))})
+    model.endTransaction()
+
+
+def texts(model):
+    return [
+        model.data(model.index(row), model.itemTextRole)
+        for row in range(model.rowCount())
+    ]
+
+
 def wait_for_server(session):
     client = Client(log_states=False)
     retry = 50
@@ -124,6 +154,8 @@ def server():
             args = [*CPULIMIT_ARGS, CPULIMIT, *args]
         print(f"Client timeout is {timeout} seconds")
 
+    run_client.server_name = serverName(session)
+
     with Popen(args) as proc:
         try:
             wait_for_server(session)
@@ -142,3 +174,43 @@ def app():
         yield app
     finally:
         app.app.quit()
+
+
+@fixture
+def model():
+    _qapp = QGuiApplication.instance() or QGuiApplication([])
+    db = QSqlDatabase.addDatabase("QSQLITE", TEST_DB_CONNECTION)
+    db.setDatabaseName(":memory:")
+    assert db.open()
+    try:
+        model = ClipboardItemModel(db)
+        model.create()
+        yield model
+        del model
+    finally:
+        db.close()
+        del db
+        QSqlDatabase.removeDatabase(TEST_DB_CONNECTION)
+
+
+@fixture
+def db_path(tmp_path):
+    return str(tmp_path / "items.sql")
+
+
+@fixture
+def file_model(db_path):
+    _qapp = QGuiApplication.instance() or QGuiApplication([])
+    db = QSqlDatabase.addDatabase("QSQLITE", TEST_DB_CONNECTION)
+    db.setDatabaseName(db_path)
+    assert db.open()
+    try:
+        model = ClipboardItemModel(db)
+        model.create()
+        yield model
+        model.finishQueries()
+        del model
+    finally:
+        db.close()
+        del db
+        QSqlDatabase.removeDatabase(TEST_DB_CONNECTION)
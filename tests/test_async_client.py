@@ -0,0 +1,120 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+import asyncio
+
+from pytest import raises
+
+from infinitecopy.AsyncClient import AsyncClient, AsyncConnection, ClientError
+from infinitecopy.protocol import STREAM_CHUNK_SIZE
+
+
+def test_async_client_requests(server):
+    async def run():
+        async with AsyncClient(server.server_name) as client:
+            response = await client.request("add", "test1", "test2")
+            assert response.exit_code == 0
+            assert response.error is None
+
+            response = await client.request("count")
+            assert response.output == b"2"
+
+            response = await client.request("_bad_command_")
+            assert response.error == "Unknown message received: _bad_command_"
+
+    asyncio.run(run())
+    assert server("count") == b"2"
+
+
+def test_async_client_concurrent_requests(server):
+    async def run():
+        async with AsyncClient(server.server_name, maxConnections=2) as client:
+            await asyncio.gather(
+                *(client.request("add", f"test{i}") for i in range(10))
+            )
+            responses = await asyncio.gather(
+                *(client.request("get", str(i)) for i in range(10))
+            )
+            assert sorted(r.output for r in responses) == sorted(
+                f"test{i}".encode() for i in range(10)
+            )
+            assert len(client.idle) <= 2
+
+    asyncio.run(run())
+
+
+def test_async_connection_pipelined_requests(server):
+    async def run():
+        connection = await AsyncConnection.open(server.server_name)
+        try:
+            responses = await asyncio.gather(
+                connection.request("add", "test"),
+                connection.request("count"),
+                connection.request("get", "0"),
+            )
+            assert [r.output for r in responses] == [b"", b"1", b"test"]
+            assert [r.request_id for r in responses] == [1, 2, 3]
+        finally:
+            await connection.close()
+
+    asyncio.run(run())
+
+
+def test_async_client_stream(server):
+    expected = b"[TEST]" * STREAM_CHUNK_SIZE
+    assert server("add", "-", stdin=expected) == b""
+
+    async def run():
+        async with AsyncClient(server.server_name) as client:
+            chunks = [chunk async for chunk in client.stream("get", "0")]
+            assert len(chunks) > 1
+            assert b"".join(chunks) == expected
+
+            with raises(ClientError, match="Unknown message received"):
+                async for _chunk in client.stream("_bad_command_"):
+                    pass
+
+            # Connection is not reused after an abandoned stream.
+            async for _chunk in client.stream("get", "0"):
+                break
+            response = await client.request("count")
+            assert response.output == b"1"
+
+    asyncio.run(run())
+
+
+def test_async_client_not_running():
+    async def run():
+        async with AsyncClient("__TEST_NOT_RUNNING__") as client:
+            with raises(ClientError, match="Failed to connect"):
+                await client.request("count")
+
+    asyncio.run(run())
+
+
+def test_async_client_does_not_reuse_connection_after_quit(server):
+    async def run():
+        async with AsyncClient(server.server_name) as client:
+            response = await client.request("quit")
+            assert response.exit_code == 0
+            assert not client.idle
+
+    asyncio.run(run())
+
+
+def test_async_connection_slow_stream_does_not_block_requests(server, monkeypatch):
+    monkeypatch.setattr("infinitecopy.AsyncClient.MAX_QUEUED_CHUNKS", 1)
+    assert server("add", "-", stdin=b"[TEST]" * STREAM_CHUNK_SIZE) == b""
+
+    async def run():
+        connection = await AsyncConnection.open(server.server_name)
+        try:
+            stream = connection.stream("get", "0")
+            await anext(stream)
+            response = await asyncio.wait_for(connection.request("count"), 10)
+            assert response.output == b"1"
+            with raises(ClientError, match="not consumed"):
+                async for _chunk in stream:
+                    pass
+        finally:
+            await connection.close()
+
+    asyncio.run(run())
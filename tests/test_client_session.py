@@ -0,0 +1,78 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+import time
+
+from infinitecopy.Client import PROTOCOL_VERSION, Client, SessionClient
+
+
+def connect(server):
+    client = SessionClient(log_states=False)
+    assert client.connect(server.server_name)
+    assert client.hello() == PROTOCOL_VERSION
+    return client
+
+
+def test_session_multiple_requests(server):
+    client = connect(server)
+    try:
+        response = client.request("add", "test1", "test2")
+        assert response.exit_code == 0
+        assert response.error is None
+
+        response = client.request("count")
+        assert bytes(response.output) == b"2"
+
+        response = client.request("get", "0")
+        assert bytes(response.output) == b"test2"
+    finally:
+        client.disconnect()
+
+    assert server("count") == b"2"
+
+
+def test_session_pipelined_requests(server):
+    client = connect(server)
+    try:
+        ids = [client.sendRequest("add", f"test{i}") for i in range(10)]
+        ids.append(client.sendRequest("count"))
+        ids.append(client.sendRequest("_bad_command_"))
+        ids.append(client.sendRequest("get", "0"))
+
+        responses = [client.receiveResponse() for _ in ids]
+        assert [r.request_id for r in responses] == ids
+        assert bytes(responses[10].output) == b"10"
+        assert responses[11].error == "Unknown message received: _bad_command_"
+        assert bytes(responses[12].output) == b"test9"
+    finally:
+        client.disconnect()
+
+
+def test_stalled_client_does_not_block_server(server):
+    stalled = Client(log_states=False)
+    assert stalled.connect(server.server_name)
+    try:
+        stalled.sendCommandName("add")
+        stalled.flush()
+        assert server("add", "test") == b""
+        assert server("count") == b"1"
+    finally:
+        stalled.disconnect()
+
+
+def test_session_quit(server):
+    client = connect(server)
+    try:
+        response = client.request("quit")
+        assert response.exit_code == 0
+        # Server closes the connection and quits.
+        assert client.socket.waitForDisconnected(5000)
+    finally:
+        client.disconnect()
+
+    other = Client(log_states=False)
+    for _ in range(50):
+        if not other.connect(server.server_name):
+            break
+        other.disconnect()
+        time.sleep(0.1)
+    else:
+        assert False, "Server did not quit"
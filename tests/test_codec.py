@@ -0,0 +1,66 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+import os
+
+from pytest import mark, raises
+
+from infinitecopy import Codec
+from infinitecopy.Codec import (
+    CODEC_NONE,
+    CODEC_ZLIB,
+    CODEC_ZSTD,
+    CodecConfig,
+    decode,
+    encode,
+)
+
+TEXT = b"<p>Hello, world!</p>\n" * 1000
+
+
+def test_encode_small_data_uncompressed():
+    assert encode("text/html", b"<p>Hello</p>", CodecConfig()) == (
+        CODEC_NONE,
+        b"<p>Hello</p>",
+    )
+
+
+def test_encode_skipped_format_uncompressed():
+    assert encode("image/png", TEXT, CodecConfig()) == (CODEC_NONE, TEXT)
+
+
+def test_encode_incompressible_data_uncompressed():
+    data = os.urandom(10000)
+    assert encode("application/octet-stream", data, CodecConfig()) == (
+        CODEC_NONE,
+        data,
+    )
+
+
+def test_encode_zlib_by_default():
+    codec, encoded = encode("text/html", TEXT, CodecConfig())
+    assert codec == CODEC_ZLIB
+    assert decode(codec, encoded) == TEXT
+
+
+@mark.parametrize("zstandard", [False, True])
+def test_encode_decode_zstd(monkeypatch, zstandard):
+    if not zstandard:
+        monkeypatch.setattr(Codec, "zstandard", None)
+    elif Codec.zstandard is None:
+        return
+
+    config = CodecConfig()
+    config.codec = CODEC_ZSTD
+    codec, encoded = encode("text/html", TEXT, config)
+    assert codec == (CODEC_ZSTD if zstandard else CODEC_ZLIB)
+    assert len(encoded) < len(TEXT)
+    assert decode(codec, encoded) == TEXT
+
+
+def test_decode_unknown_codec():
+    with raises(ValueError, match="Unknown codec"):
+        decode("_unknown_", b"")
+
+
+def test_decode_zlib():
+    encoded = Codec.compress(CODEC_ZLIB, TEXT, CodecConfig())
+    assert decode(CODEC_ZLIB, encoded) == TEXT
@@ -1,4 +1,7 @@
 # SPDX-License-Identifier: LGPL-2.0-or-later
+from infinitecopy.Client import STREAM_CHUNK_SIZE
+
+
 def test_add_get_item_multiple(server):
     assert server("add", "test1", "test2", "test3") == b""
     assert server("count") == b"3"
@@ -16,3 +19,24 @@ def test_add_get_item_large(server):
     assert item[:20] == expected[:20]
     assert len(item) == len(expected)
     assert item == expected
+
+
+def test_add_get_item_chunked(server):
+    expected = bytes(range(256)) * (STREAM_CHUNK_SIZE * 7 // 2 // 256)
+    assert server("add", "test1", "-", "test2", stdin=expected) == b""
+    assert server("count") == b"3"
+    item = server("get", "1")
+    assert len(item) == len(expected)
+    assert item == expected
+
+
+def test_stats(server):
+    assert server("add", "test1") == b""
+    stats = server("stats").decode("utf-8").split("\n")
+    assert any(line.startswith("model.queries: ") for line in stats)
+
+
+def test_get_items_any_order(server):
+    assert server("add", "test1", "test2", "test3") == b""
+    assert server("get", "2", "0", "2", "5", "1") == b"test1\ntest3\ntest1\n\ntest2"
+    assert server("get", "-1") == b""
@@ -0,0 +1,77 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+import base64
+import json
+from types import SimpleNamespace
+
+from pytest import raises
+
+from infinitecopy.Client import Client
+from infinitecopy.commands import command_import
+from tests.conftest import texts
+
+
+def test_export_import(server):
+    assert server("add", "test1", "test2", "test3") == b""
+    exported = server("export")
+    lines = exported.splitlines()
+    assert len(lines) == 3
+
+    items = [json.loads(line) for line in lines]
+    texts = [base64.b64decode(item["data"]["text/plain"]) for item in items]
+    assert texts == [b"test1", b"test2", b"test3"]
+    assert all(item["createdTime"] for item in items)
+
+    assert server("import", stdin=exported) == b""
+    assert server("count") == b"6"
+    assert server("get", "0", "1", "2", "3") == b"test3\ntest2\ntest1\ntest3"
+    assert server("export") == exported + exported
+
+
+def test_import_files(server, tmp_path):
+    item = {"data": {"text/plain": base64.b64encode(b"test1").decode()}}
+    path = tmp_path / "items.jsonl"
+    # The last line does not need to end with a new line.
+    path.write_text(json.dumps(item))
+    item["data"]["text/plain"] = base64.b64encode(b"test2").decode()
+    assert server("import", str(path), "-", stdin=json.dumps(item).encode()) == b""
+    assert server("get", "0", "1") == b"test2\ntest1"
+
+
+def test_import_bad_item(server):
+    good = json.dumps({"data": {"text/plain": base64.b64encode(b"test1").decode()}})
+    with raises(RuntimeError, match="line 2"):
+        server("import", stdin=f"{good}\nbad\n".encode())
+    assert server("count") == b"0"
+
+
+def test_import_items_as_they_arrive(server):
+    item = {"data": {"text/plain": base64.b64encode(b"test1").decode()}}
+    client = Client(log_states=False)
+    assert client.connect(server.server_name)
+    try:
+        client.sendCommandName("import")
+        client.sendCommandArgument(json.dumps(item) + "\n")
+        client.flush()
+        for _ in range(50):
+            if server("count") == b"1":
+                break
+        assert server("get", "0") == b"test1"
+    finally:
+        client.sendCommandEnd()
+        client.waitForDisconnected()
+    assert client.error is None
+
+
+def test_import_lines_split_across_chunks(model):
+    lines = b"".join(
+        json.dumps({"data": {"text/plain": base64.b64encode(text).decode()}}).encode()
+        + b"\n"
+        for text in (b"test1", b"test2")
+    )
+    importer = command_import(SimpleNamespace(clipboardItemModel=model), None)
+    next(importer)
+    for i in range(0, len(lines), 7):
+        importer.send(lines[i : i + 7])
+    with raises(StopIteration):
+        importer.send(None)
+    assert texts(model) == [b"test2", b"test1"]
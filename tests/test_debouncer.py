@@ -0,0 +1,56 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+import time
+
+from PySide6.QtCore import QCoreApplication
+from PySide6.QtGui import QGuiApplication
+
+import infinitecopy.MimeFormats as formats
+from infinitecopy.Debouncer import Debouncer
+from infinitecopy.Stats import Stats
+
+
+def debouncer():
+    _qapp = QGuiApplication.instance() or QGuiApplication([])
+    return Debouncer("test", 10, 40, Stats("clipboard"))
+
+
+def test_debouncer_extends_delay_on_burst():
+    d = debouncer()
+    for _ in range(4):
+        d.onChanged()
+    assert d.delayMs == 40
+    assert d.stats.counters["testEvents"] == 4
+
+    time.sleep(0.05)
+    d.onChanged()
+    assert d.delayMs == 10
+
+
+def test_debouncer_triggers_once():
+    d = debouncer()
+    triggered = []
+    d.triggered.connect(lambda: triggered.append(True))
+    d.onChanged()
+    d.onChanged()
+
+    deadline = time.monotonic() + 5
+    while not triggered and time.monotonic() < deadline:
+        QCoreApplication.processEvents()
+    time.sleep(0.05)
+    QCoreApplication.processEvents()
+    assert triggered == [True]
+
+
+def test_debouncer_skips_unchanged_offer():
+    d = debouncer()
+    own = [formats.mimeText, formats.mimeOwner]
+    assert d.shouldRead(own, (tuple(own), b"hash1"))
+    assert not d.shouldRead(own, (tuple(own), b"hash1"))
+    # Different item copied from the app can have the same formats.
+    assert d.shouldRead(own, (tuple(own), b"hash2"))
+    assert d.shouldRead([formats.mimeText])
+    assert d.shouldRead([formats.mimeText])
+    assert not d.shouldRead([])
+    assert d.shouldRead(own, (tuple(own), b"hash2"))
+    assert d.stats.counters["testReads"] == 5
+    assert d.stats.counters["testSkipped"] == 2
@@ -0,0 +1,99 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+from infinitecopy.ClipboardItemModel import FETCH_PAGE_SIZE, SQL_SELECT_ITEMS
+from tests.conftest import add_items
+
+
+def rows(model):
+    return [
+        model.data(model.index(row), model.itemTextRole)
+        for row in range(model.rowCount())
+    ]
+
+
+def filtered(model, needle):
+    model.setTextFilter(needle)
+    return rows(model)
+
+
+def query_plan(model, condition):
+    query = model.executeQuery(
+        "EXPLAIN QUERY PLAN " + SQL_SELECT_ITEMS.format(condition=condition),
+        limit=-1,
+    )
+    details = []
+    while query.next():
+        details.append(query.value("detail"))
+    query.finish()
+    return details
+
+
+def test_filter_subsequence(model):
+    add_items(model, "hello world", "Hello there", "goodbye world", "a_b")
+    assert filtered(model, "") == [
+        b"a_b",
+        b"goodbye world",
+        b"Hello there",
+        b"hello world",
+    ]
+    assert filtered(model, "world") == [b"goodbye world", b"hello world"]
+    assert filtered(model, "hlwrd") == [b"hello world"]
+    assert filtered(model, "helo") == [b"Hello there", b"hello world"]
+    assert filtered(model, "world hel") == []
+    assert filtered(model, "lo") == [b"Hello there", b"hello world"]
+    assert filtered(model, "Hello") == [b"Hello there"]
+    assert filtered(model, "_") == [b"a_b"]
+    assert filtered(model, "missing") == []
+
+
+def test_filter_pattern(model):
+    add_items(model, "hello world", "help wanted", "shell")
+    assert filtered(model, "hel%w%") == [b"help wanted", b"hello world"]
+    assert filtered(model, "%ll") == [b"shell"]
+
+
+def test_filter_case_sensitivity(model):
+    add_items(model, "hello world", "Hello there")
+    model.caseSensitivity = model.CaseSensitivity.Ignore
+    assert filtered(model, "Hello") == [b"Hello there", b"hello world"]
+    model.caseSensitivity = model.CaseSensitivity.Sensitive
+    assert filtered(model, "hello") == [b"hello world"]
+
+
+def test_filter_lists_substring_matches_first(model):
+    add_items(model, "hello", "h_e_l_l_o", "say hello")
+    assert filtered(model, "hello") == [b"say hello", b"hello", b"h_e_l_l_o"]
+
+    add_items(model, "hxello")
+    add_items(model, "hello again")
+    assert rows(model) == [
+        b"hello again",
+        b"say hello",
+        b"hello",
+        b"hxello",
+        b"h_e_l_l_o",
+    ]
+
+
+def test_filter_fetches_pages_of_each_group(model):
+    count = FETCH_PAGE_SIZE + 1
+    add_items(model, *(f"h-e-l-l-o {i}" for i in range(count)))
+    add_items(model, *(f"hello {i}" for i in range(count)))
+    model.setTextFilter("hello")
+    while model.canFetchMore(model.index(-1)):
+        model.fetchMore(model.index(-1))
+    assert rows(model) == [f"hello {i}".encode() for i in reversed(range(count))] + [
+        f"h-e-l-l-o {i}".encode() for i in reversed(range(count))
+    ]
+
+
+def test_filter_index_follows_removed_items(model):
+    add_items(model, "hello world", "hello there")
+    model.removeItems(0, 1)
+    assert filtered(model, "hello") == [b"hello world"]
+    assert any(
+        "VIRTUAL TABLE INDEX" in detail
+        for detail in query_plan(model, model.filters[0])
+    )
+
+    add_items(model, "hello again")
+    assert filtered(model, "hello") == [b"hello again", b"hello world"]
@@ -0,0 +1,43 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+import subprocess
+import sys
+
+
+def import_times(*args):
+    """Returns cumulative import time in microseconds for imported modules."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True,
+        check=False,
+        text=True,
+    )
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _self, cumulative, name = line.removeprefix("import time:").split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_client_does_not_import_qt():
+    times = import_times("-m", "infinitecopy", "--session", "__TESTX__", "count")
+    assert "infinitecopy.SocketClient" in times
+    assert not [name for name in times if name.startswith("PySide6")]
+    assert "infinitecopy.Application" not in times
+
+
+def test_client_module_does_not_import_qt():
+    proc = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, infinitecopy.__main__;"
+            " print(any(m.startswith('PySide6') for m in sys.modules))",
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    assert proc.stdout.strip() == "False"
@@ -0,0 +1,73 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+from PySide6.QtCore import QByteArray, QCoreApplication
+
+import infinitecopy.MimeFormats as formats
+from infinitecopy.ItemWriter import ItemWriter, ItemWriterConfig
+from tests.conftest import texts
+
+
+def item(text, source=formats.valueSourceClipboard):
+    return {
+        formats.mimeText: QByteArray(text.encode("utf-8")),
+        formats.mimeSource: source,
+    }
+
+
+def write_items(db_path, model, *items):
+    written = []
+    writer = ItemWriter(db_path)
+    writer.itemsWritten.connect(model.insertItems)
+    writer.itemsWritten.connect(written.append)
+    for data in items:
+        writer.add(data)
+    writer.start()
+    writer.stop()
+    QCoreApplication.processEvents()
+    return writer, written
+
+
+def test_writer_adds_items(db_path, file_model):
+    _writer, written = write_items(
+        db_path, file_model, item("test1"), item("test2"), item("")
+    )
+    assert len(written) == 1
+    assert len(written[0]) == 2
+    assert texts(file_model) == ["test2", "test1"]
+
+
+def test_writer_coalesces_selection(db_path, file_model):
+    writer, _written = write_items(
+        db_path,
+        file_model,
+        item("t", formats.valueSourceSelection),
+        item("te", formats.valueSourceSelection),
+        item("test", formats.valueSourceSelection),
+        item("test1"),
+        item("test2"),
+    )
+    assert texts(file_model) == ["test2", "test1", "test"]
+    assert any(
+        line.startswith("writer.coalesced: 2 ") for line in writer.stats.report()
+    )
+
+
+def test_writer_moves_owned_item_to_top(db_path, file_model):
+    file_model.addItemNoEmpty(item("test1"))
+    file_model.addItemNoEmpty(item("test2"))
+    owned = {
+        formats.mimeOwner: file_model.rowData(1)[formats.mimeOwner],
+        formats.mimeSource: formats.valueSourceClipboard,
+    }
+    write_items(db_path, file_model, owned)
+    file_model.select()
+    assert texts(file_model) == ["test1", "test2"]
+
+
+def test_writer_drops_items_after_failure(tmp_path):
+    writer = ItemWriter(str(tmp_path / "missing" / "db.sqlite"))
+    writer.start()
+    writer.wait()
+    for i in range(ItemWriterConfig.maxQueueSize + 2):
+        writer.add(item(f"test{i}"))
+    assert not writer.pending
+    writer.stop()
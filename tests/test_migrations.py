@@ -0,0 +1,59 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+from PySide6.QtSql import QSqlQuery
+
+import infinitecopy.MimeFormats as formats
+from infinitecopy.ClipboardItemModel import ClipboardItemModel
+from infinitecopy.DatabaseSchema import SQL_CREATE_DB, SQL_MIGRATIONS
+
+
+def execute(db, *statements):
+    query = QSqlQuery(db)
+    for statement in statements:
+        assert query.exec(statement), query.lastError().text()
+
+
+def create_original_schema(model, *statements):
+    db = model.database()
+    model.finishQueries()
+    execute(
+        db,
+        "PRAGMA foreign_keys = OFF;",
+        "DROP TABLE data;",
+        "DROP TABLE blob;",
+        "DROP TABLE item;",
+        "DROP TABLE item_fts;",
+        *SQL_CREATE_DB,
+        "PRAGMA user_version = 0;",
+        *statements,
+    )
+    model = ClipboardItemModel(db)
+    model.create()
+    return model
+
+
+def test_migrate_backfills_filter_index(model):
+    model = create_original_schema(
+        model,
+        "INSERT INTO item (id, createdTime, hash, text) VALUES"
+        " (1, '', 'a', 'hello world'), (2, '', 'b', 'test');",
+    )
+    model.setTextFilter("world")
+    assert model.rowCount() == 1
+    assert model.data(model.index(0), model.itemTextRole) == "hello world"
+
+
+def test_migrate_data_to_blobs(model):
+    model = create_original_schema(
+        model,
+        "INSERT INTO item (id, createdTime, hash, text) VALUES"
+        " (1, '', 'a', 'test1'), (2, '', 'b', 'test2');",
+        "INSERT INTO data (itemId, format, bytes) VALUES"
+        " (1, 'image/png', x'01'), (2, 'image/png', x'01'),"
+        " (3, 'image/png', x'02');",
+    )
+    assert model.queryValue("PRAGMA user_version") == len(SQL_MIGRATIONS)
+    assert model.queryValue("SELECT count() FROM data") == 2
+    assert model.queryValue("SELECT count() FROM blob") == 1
+    assert model.queryValue("SELECT refs FROM blob") == 2
+    assert model.rowData(0)[formats.mimePng] == b"\x01"
+    assert model.rowData(1)[formats.mimePng] == b"\x01"
@@ -0,0 +1,212 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+from PySide6.QtCore import QByteArray
+
+import infinitecopy.MimeFormats as formats
+from infinitecopy.ClipboardItemModel import FETCH_PAGE_SIZE
+from tests.conftest import add_items, texts
+
+
+def test_model_fetches_pages(model):
+    count = FETCH_PAGE_SIZE * 2 + 1
+    add_items(model, *(str(i) for i in range(count)))
+    model.select()
+    assert model.rowCount() == FETCH_PAGE_SIZE
+    assert model.canFetchMore(model.index(-1))
+
+    model.fetchMore(model.index(-1))
+    model.fetchMore(model.index(-1))
+    assert model.rowCount() == count
+    assert not model.canFetchMore(model.index(-1))
+    assert texts(model) == [str(i).encode() for i in reversed(range(count))]
+
+
+def test_model_inserts_new_items_incrementally(model):
+    add_items(model, "test1")
+    resets = []
+    inserts = []
+    model.modelReset.connect(lambda: resets.append(True))
+    model.rowsInserted.connect(
+        lambda _parent, first, last: inserts.append((first, last))
+    )
+
+    add_items(model, "test2", "test3")
+    assert resets == []
+    assert inserts == [(0, 1)]
+    assert texts(model) == [b"test3", b"test2", b"test1"]
+
+
+def test_model_skips_new_items_not_matching_filter(model):
+    add_items(model, "hello")
+    model.setTextFilter("hello")
+    add_items(model, "world", "hello world")
+    assert texts(model) == [b"hello world", b"hello"]
+
+
+def test_model_removes_rows(model):
+    add_items(model, "test1", "test2", "test3", "test4")
+    model.removeItems(1, 2)
+    assert texts(model) == [b"test4", b"test1"]
+
+    ids = [model.data(model.index(row), model.itemIdRole) for row in range(2)]
+    model.removeItemIds(ids[:1])
+    assert texts(model) == [b"test1"]
+    assert model.getItemCount() == 1
+
+
+def test_model_caches_role_data(model):
+    add_items(model, *(str(i) for i in range(10)))
+    queries = model.stats.counters["queries"]
+    for row in range(model.rowCount()):
+        assert model.data(model.index(row), model.itemHtmlRole) == ""
+        assert model.data(model.index(row), model.itemHasImageRole) is False
+    assert model.stats.counters["queries"] == queries + 1
+    assert model.stats.counters["cacheMisses"] == 1
+    assert model.stats.counters["cacheHits"] == 19
+
+
+def add_image_item(model, text, image):
+    model.beginTransaction()
+    model.addItemNoCommit(
+        {
+            formats.mimeText: QByteArray(text.encode("utf-8")),
+            formats.mimePng: QByteArray(image),
+        }
+    )
+    model.endTransaction()
+
+
+def blob_count(model):
+    return model.queryValue("SELECT count() FROM blob")
+
+
+def test_model_deduplicates_data(model):
+    add_image_item(model, "test1", b"IMAGE")
+    add_image_item(model, "test2", b"IMAGE")
+    assert blob_count(model) == 1
+    assert model.rowData(0)[formats.mimePng] == b"IMAGE"
+    assert model.rowData(1)[formats.mimePng] == b"IMAGE"
+
+    model.removeItems(0, 1)
+    assert blob_count(model) == 1
+    assert model.rowData(0)[formats.mimePng] == b"IMAGE"
+
+    model.removeItems(0, 1)
+    assert blob_count(model) == 0
+    assert model.queryValue("SELECT count() FROM data") == 0
+
+
+def test_model_compact(model):
+    add_image_item(model, "test1", b"IMAGE" * 100000)
+    model.removeItems(0, 1)
+    before, after = model.compact()
+    assert after < before
+
+
+def test_model_compresses_large_data(model):
+    html = b"<p>Hello, world!</p>\n" * 1000
+    model.beginTransaction()
+    model.addItemNoCommit({formats.mimeHtml: QByteArray(html)})
+    model.endTransaction()
+    assert model.queryValue("SELECT codec FROM blob") != ""
+    assert model.queryValue("SELECT length(bytes) FROM blob") < len(html)
+    assert model.data(model.index(0), model.itemHtmlRole) == html
+    assert model.rowData(0)[formats.mimeHtml] == html
+
+
+def test_model_exports_items_in_batches(model, monkeypatch):
+    monkeypatch.setattr("infinitecopy.ClipboardItemModel.EXPORT_BATCH_SIZE", 2)
+    add_image_item(model, "test1", b"IMAGE1")
+    add_items(model, "test2", "test3")
+
+    batches = list(model.exportItems())
+    assert [len(items) for items in batches] == [2, 1]
+
+    createdTime, data = batches[0][0]
+    assert createdTime
+    assert data[formats.mimeText] == b"test1"
+    assert data[formats.mimePng] == b"IMAGE1"
+
+    model.beginTransaction()
+    model.addItemNoCommit(data, createdTime)
+    model.endTransaction()
+    assert texts(model)[0] == "test1"
+    assert model.rowData(0)[formats.mimePng] == b"IMAGE1"
+    assert model.data(model.index(0), model.createdTimeRole) == createdTime
+
+
+def add_source_items(model, source, *texts):
+    model.beginTransaction()
+    for text in texts:
+        model.addItemNoCommit(
+            {
+                formats.mimeText: QByteArray(text.encode("utf-8")),
+                formats.mimeSource: source,
+            }
+        )
+    model.endTransaction()
+
+
+def test_model_moves_duplicate_to_top(model):
+    add_image_item(model, "test1", b"IMAGE")
+    add_items(model, "test2")
+    add_source_items(model, formats.valueSourceClipboard, "test3")
+    itemId = model.data(model.index(2), model.itemIdRole)
+
+    model.beginTransaction()
+    model.addItemNoCommit(
+        {
+            formats.mimeText: QByteArray(b"test1"),
+            formats.mimePng: QByteArray(b"IMAGE"),
+            formats.mimeSource: formats.valueSourceSelection,
+        }
+    )
+    model.endTransaction()
+    assert texts(model) == ["test1", "test3", "test2"]
+    assert model.data(model.index(0), model.itemIdRole) > itemId
+    assert model.data(model.index(0), model.itemSourceRole) == "selection"
+    assert model.rowData(0)[formats.mimePng] == b"IMAGE"
+    assert model.getItemCount() == 3
+    assert model.queryValue("SELECT count() FROM data") == 1
+
+    add_source_items(model, formats.valueSourceClipboard, "test2", "test3")
+    assert texts(model) == ["test3", "test2", "test1"]
+    assert model.getItemCount() == 3
+
+
+def test_model_keeps_duplicates_from_other_sources(model):
+    add_items(model, "test1", "test2", "test1")
+    assert texts(model) == ["test1", "test2", "test1"]
+
+    model.deduplicationConfig.sources = [None]
+    add_items(model, "test2")
+    assert texts(model) == ["test2", "test1", "test1"]
+
+
+def add_owned_item(model, data):
+    model.beginTransaction()
+    model.addItemNoCommit(
+        {
+            formats.mimeOwner: data[formats.mimeOwner],
+            formats.mimeSource: formats.valueSourceClipboard,
+        }
+    )
+    model.endTransaction()
+
+
+def test_model_moves_owned_item_to_top(model):
+    add_items(model, "test1", "test2")
+    data = model.rowData(1)
+
+    add_owned_item(model, data)
+    assert texts(model) == ["test1", "test2"]
+    assert model.getItemCount() == 2
+    assert model.stats.counters["deduplicated"] == 1
+
+    add_owned_item(model, model.rowData(0))
+    assert texts(model) == ["test1", "test2"]
+    assert model.stats.counters["ownedSkipped"] == 1
+
+    model.removeItems(0, 1)
+    add_owned_item(model, data)
+    assert texts(model) == ["test2"]
+    assert model.stats.counters["ownedSkipped"] == 2
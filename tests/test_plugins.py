@@ -0,0 +1,32 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+from PySide6.QtCore import QByteArray
+
+import infinitecopy.MimeFormats as formats
+from infinitecopy.plugins.pre import AvoidSpuriousChangesPlugin
+
+
+def image_item(bytes_, source=formats.valueSourceClipboard):
+    return {
+        formats.mimePng: QByteArray(bytes_),
+        formats.mimeSource: source,
+    }
+
+
+def test_avoid_spurious_changes():
+    plugin = AvoidSpuriousChangesPlugin(None)
+    assert plugin.onClipboardChanged(image_item(b"A"))
+    assert not plugin.onClipboardChanged(image_item(b"A"))
+    assert plugin.onClipboardChanged(image_item(b"B"))
+    assert plugin.onClipboardChanged(image_item(b"B", formats.valueSourceSelection))
+    assert not plugin.onClipboardChanged(image_item(b"B"))
+
+
+def test_avoid_spurious_changes_compares_sizes_and_bytes():
+    plugin = AvoidSpuriousChangesPlugin(None)
+    assert plugin.onClipboardChanged(image_item(b"A"))
+    assert plugin.onClipboardChanged(image_item(b"AB"))
+    assert plugin.onClipboardChanged(image_item(b"AC"))
+    assert not plugin.onClipboardChanged(image_item(b"AC"))
+    item = image_item(b"AC")
+    item[formats.mimeText] = QByteArray()
+    assert plugin.onClipboardChanged(item)
@@ -0,0 +1,63 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+from PySide6.QtCore import QBuffer, QDataStream, QIODevice
+from PySide6.QtGui import QGuiApplication
+from PySide6.QtNetwork import QLocalServer
+
+from infinitecopy.protocol import (
+    MessageId,
+    encodeMessageHeader,
+    handleResponseMessage,
+    socketPath,
+    splitMessages,
+)
+
+
+def test_messages_match_qt_format():
+    buffer = QBuffer()
+    buffer.open(QIODevice.WriteOnly)
+    stream = QDataStream(buffer)
+    stream.writeUInt8(MessageId.COMMAND_ARG)
+    stream.writeBytes(b"test")
+
+    encoded = encodeMessageHeader(MessageId.COMMAND_ARG, 4) + b"test"
+    assert bytes(buffer.data()) == encoded
+
+
+def test_split_messages():
+    message = encodeMessageHeader(MessageId.PRINT, 4) + b"test"
+    end = encodeMessageHeader(MessageId.EXIT, 1) + b"0"
+    messages, rest = splitMessages(message + end[:3])
+    assert messages == [(MessageId.PRINT, b"test")]
+    assert rest == end[:3]
+
+    messages, rest = splitMessages(rest + end[3:])
+    assert messages == [(MessageId.EXIT, b"0")]
+    assert rest == b""
+
+
+def test_socket_path_matches_qt():
+    _qapp = QGuiApplication.instance() or QGuiApplication([])
+    name = "__TEST_SOCKET_PATH__"
+    QLocalServer.removeServer(name)
+    server = QLocalServer()
+    assert server.listen(name)
+    try:
+        assert socketPath(name) == server.fullServerName()
+    finally:
+        server.close()
+
+
+class ResponseState:
+    error = None
+    exit_code = None
+
+
+def test_handle_response_message(capsysbinary):
+    state = ResponseState()
+    assert not handleResponseMessage(state, MessageId.PRINT, b"test")
+    assert handleResponseMessage(state, MessageId.EXIT, b"2")
+    assert state.exit_code == 2
+    assert capsysbinary.readouterr().out == b"test"
+
+    assert handleResponseMessage(state, MessageId.ERROR, b"failed")
+    assert state.error == "Error: failed"
@@ -0,0 +1,211 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+import time
+
+from PySide6.QtCore import QCoreApplication
+from PySide6.QtGui import QGuiApplication
+from PySide6.QtNetwork import QLocalServer
+from pytest import fixture
+
+from infinitecopy.Client import (
+    MAX_BUFFERED_OUTPUT_BYTES,
+    PROTOCOL_VERSION,
+    STREAM_CHUNK_SIZE,
+    Client,
+    MessageId,
+)
+from infinitecopy.RequestReader import RequestReader
+
+SERVER_NAME = "__TEST_REQUEST_READER__"
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        QCoreApplication.processEvents()
+    return condition()
+
+
+class Connection:
+    def __init__(self, server, **kwargs):
+        self.client = Client(log_states=False)
+        self.client.socket.readyRead.disconnect(self.client._on_ready_read)
+        assert self.client.connect(SERVER_NAME)
+        assert server.waitForNewConnection(1000)
+        self.server_client = Client(server.nextPendingConnection(), log_states=False)
+        self.reader = RequestReader(self.server_client, **kwargs)
+        self.requests = []
+        self.errors = []
+        self.started = []
+        self.arguments = []
+        self.reader.requestStarted.connect(self.started.append)
+        self.reader.argumentReceived.connect(
+            lambda _request, arg: self.arguments.append(bytes(arg))
+        )
+        self.reader.requestReceived.connect(self.requests.append)
+        self.reader.failed.connect(self.errors.append)
+        self.reader.start()
+
+    def send(self, msg_id, arg=b""):
+        self.client._send(msg_id, arg)
+        self.client.flush()
+
+
+@fixture
+def connect():
+    _qapp = QGuiApplication.instance() or QGuiApplication([])
+    QLocalServer.removeServer(SERVER_NAME)
+    server = QLocalServer()
+    assert server.listen(SERVER_NAME)
+    connections = []
+
+    def connect_(**kwargs):
+        connection = Connection(server, **kwargs)
+        connections.append(connection)
+        return connection
+
+    try:
+        yield connect_
+    finally:
+        for connection in connections:
+            connection.client.disconnect()
+        server.close()
+
+
+def test_request_received_in_parts(connect):
+    connection = connect()
+    connection.send(MessageId.COMMAND_NAME, "add")
+    connection.send(MessageId.COMMAND_ARG, "test1")
+    assert not wait_until(lambda: connection.requests, timeout=0.1)
+
+    connection.send(MessageId.COMMAND_ARG, "test2")
+    connection.send(MessageId.COMMAND_END)
+    assert wait_until(lambda: connection.requests)
+
+    (request,) = connection.requests
+    assert request.request_id is None
+    assert request.name == "add"
+    assert [bytes(arg) for arg in request.arguments] == [b"test1", b"test2"]
+
+
+def test_argument_received_in_chunks(connect):
+    connection = connect(maxMessageBytes=3)
+    connection.send(MessageId.COMMAND_NAME, "add")
+    connection.send(MessageId.COMMAND_ARG_CHUNK, "ab")
+    connection.send(MessageId.COMMAND_ARG_CHUNK, "cd")
+    connection.send(MessageId.COMMAND_ARG, "e")
+    connection.send(MessageId.COMMAND_ARG, "f")
+    connection.send(MessageId.COMMAND_END)
+    assert wait_until(lambda: connection.requests)
+
+    (request,) = connection.requests
+    assert [bytes(arg) for arg in request.arguments] == [b"abcde", b"f"]
+
+
+def test_incomplete_argument(connect):
+    connection = connect()
+    connection.send(MessageId.COMMAND_NAME, "add")
+    connection.send(MessageId.COMMAND_ARG_CHUNK, "ab")
+    connection.send(MessageId.COMMAND_END)
+    assert wait_until(lambda: connection.errors)
+    assert connection.errors == ["Incomplete argument at the end of request"]
+
+
+def test_clients_are_not_blocked(connect):
+    stalled = connect()
+    stalled.send(MessageId.COMMAND_NAME, "add")
+
+    connection = connect()
+    connection.send(MessageId.COMMAND_NAME, "count")
+    connection.send(MessageId.COMMAND_END)
+    assert wait_until(lambda: connection.requests)
+    assert not stalled.requests
+
+
+def test_session_requests(connect):
+    connection = connect()
+    connection.send(MessageId.HELLO, str(PROTOCOL_VERSION))
+    for request_id in ("1", "2"):
+        connection.send(MessageId.REQUEST_ID, request_id)
+        connection.send(MessageId.COMMAND_NAME, "count")
+        connection.send(MessageId.COMMAND_END)
+
+    assert wait_until(lambda: len(connection.requests) == 2)
+    assert [r.request_id for r in connection.requests] == ["1", "2"]
+    assert connection.reader.version == PROTOCOL_VERSION
+
+
+def test_request_timeout(connect):
+    connection = connect(timeoutMs=50)
+    connection.send(MessageId.COMMAND_NAME, "add")
+    assert wait_until(lambda: connection.errors)
+    assert connection.errors == ["Timed out waiting for request"]
+
+
+def test_message_too_large(connect):
+    connection = connect(maxMessageBytes=10)
+    connection.send(MessageId.COMMAND_NAME, "add")
+    connection.send(MessageId.COMMAND_ARG, b"X" * 11)
+    assert wait_until(lambda: connection.errors)
+    assert connection.errors == ["Message exceeds maximum size of 10 bytes"]
+
+
+def test_request_too_large(connect):
+    connection = connect(maxRequestBytes=10)
+    connection.send(MessageId.COMMAND_NAME, "add")
+    connection.send(MessageId.COMMAND_ARG, b"X" * 6)
+    connection.send(MessageId.COMMAND_ARG, b"X" * 6)
+    assert wait_until(lambda: connection.errors)
+    assert connection.errors == ["Request exceeds maximum size of 10 bytes"]
+    assert not connection.requests
+
+
+def test_streaming_request(connect):
+    connection = connect(maxRequestBytes=10, streamingCommands={"import"})
+    connection.send(MessageId.COMMAND_NAME, "import")
+    assert wait_until(lambda: connection.started)
+    assert connection.started[0].name == "import"
+
+    connection.send(MessageId.COMMAND_ARG, b"X" * 6)
+    connection.send(MessageId.COMMAND_ARG_CHUNK, b"Y" * 3)
+    connection.send(MessageId.COMMAND_ARG, b"Y" * 3)
+    assert wait_until(lambda: len(connection.arguments) == 2)
+    assert connection.arguments == [b"X" * 6, b"Y" * 6]
+    assert not connection.requests
+
+    connection.send(MessageId.COMMAND_END)
+    assert wait_until(lambda: connection.requests)
+    assert not connection.errors
+    assert not connection.requests[0].arguments
+
+
+def test_unexpected_message(connect):
+    connection = connect()
+    connection.send(MessageId.COMMAND_ARG, "test")
+    assert wait_until(lambda: connection.errors)
+    assert connection.errors[0].startswith("Unexpected message ID")
+
+
+def test_large_output_written_as_client_reads(connect):
+    connection = connect()
+    data = b"X" * (STREAM_CHUNK_SIZE * 10)
+    connection.server_client.sendPrint(data)
+    connection.server_client.sendExit(0)
+    assert connection.server_client.pending
+    assert (
+        connection.server_client.socket.bytesToWrite()
+        <= MAX_BUFFERED_OUTPUT_BYTES + STREAM_CHUNK_SIZE + 16
+    )
+
+    output = bytearray()
+    messages = []
+
+    def read():
+        for msg_id, arg in connection.client.receiveAvailable():
+            messages.append(msg_id)
+            if msg_id == MessageId.PRINT:
+                output.extend(bytes(arg))
+        return messages and messages[-1] == MessageId.EXIT
+
+    assert wait_until(read)
+    assert output == data
+    assert not connection.server_client.pending
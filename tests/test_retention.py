@@ -0,0 +1,95 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+from PySide6.QtCore import QDateTime
+
+from infinitecopy.Retention import RetentionConfig, pruneItems
+from tests.conftest import add_item, texts
+
+
+class NoLimits(RetentionConfig):
+    maxItems = None
+    maxBytes = None
+    maxAgeDays = None
+    formatLimits = {}
+    batchSize = 2
+
+
+def prune(model, config):
+    ids = pruneItems(model, config)
+    model.select()
+    return ids
+
+
+def test_retention_no_limits(model):
+    for i in range(5):
+        add_item(model, f"test{i}")
+    assert prune(model, NoLimits) == []
+    assert len(texts(model)) == 5
+
+
+def test_retention_max_items_skips_pinned(model):
+    class Config(NoLimits):
+        maxItems = 2
+
+    for i in range(5):
+        add_item(model, f"test{i}")
+    model.togglePinned(4)
+    assert model.data(model.index(4), model.itemPinnedRole)
+
+    removed = prune(model, Config)
+    assert len(removed) == 2
+    assert texts(model) == ["test4", "test3", "test0"]
+    assert any(line.startswith("model.pruned: 2 ") for line in model.stats.report())
+
+
+def test_retention_max_age(model):
+    class Config(NoLimits):
+        maxAgeDays = 30
+
+    old = QDateTime.currentDateTime().addDays(-31)
+    add_item(model, "test1", old)
+    add_item(model, "test2", old.addDays(2))
+    add_item(model, "test3")
+    prune(model, Config)
+    assert texts(model) == ["test3", "test2"]
+
+
+def test_retention_format_limits(model):
+    class Config(NoLimits):
+        formatLimits = {"image/*": 1}
+
+    add_item(model, "test1", image_png=b"IMAGE1")
+    add_item(model, "test2")
+    add_item(model, "test3", image_png=b"IMAGE3")
+    prune(model, Config)
+    assert texts(model) == ["test3", "test2"]
+    assert model.queryValue("SELECT count() FROM blob") == 1
+
+
+def test_retention_text_format_limits(model):
+    class Config(NoLimits):
+        formatLimits = {"text/*": 2}
+
+    add_item(model, "test1")
+    add_item(model, "", image_png=b"IMAGE")
+    add_item(model, "test2")
+    add_item(model, "test3")
+    prune(model, Config)
+    assert texts(model) == ["test3", "test2", ""]
+
+
+def test_retention_disabled_by_default(model):
+    for i in range(3):
+        add_item(model, f"test{i}")
+    assert prune(model, RetentionConfig) == []
+    assert model.getItemCount() == 3
+
+
+def test_retention_max_bytes(model):
+    class Config(NoLimits):
+        maxBytes = 150000
+
+    add_item(model, "test1", image_png=b"1" * 100000)
+    add_item(model, "test2", image_png=b"2" * 100000)
+    add_item(model, "test3")
+    prune(model, Config)
+    assert texts(model) == ["test3", "test2"]
@@ -0,0 +1,69 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+import time
+
+from PySide6.QtCore import QByteArray
+
+import infinitecopy.MimeFormats as formats
+from infinitecopy.ItemWriter import ItemWriter
+from infinitecopy.Storage import (
+    StorageConfig,
+    StorageMaintenance,
+    runMaintenance,
+)
+
+
+def test_storage_pragmas(file_model):
+    assert file_model.queryValue("PRAGMA journal_mode") == "wal"
+    assert file_model.queryValue("PRAGMA synchronous") == 1
+    assert file_model.queryValue("PRAGMA temp_store") == 2
+    assert file_model.queryValue("PRAGMA auto_vacuum") == 2
+    assert file_model.queryValue("PRAGMA cache_size") == -StorageConfig.cacheSizeKiB
+    assert file_model.queryValue("PRAGMA busy_timeout") == StorageConfig.busyTimeoutMs
+
+
+def add_removed_image(model):
+    model.beginTransaction()
+    model.addItemNoCommit({formats.mimePng: QByteArray(b"IMAGE" * 100000)})
+    model.endTransaction()
+    model.removeItems(0, 1)
+    assert model.queryValue("PRAGMA freelist_count") > 0
+
+
+def test_storage_maintenance_frees_pages(file_model):
+    add_removed_image(file_model)
+
+    runMaintenance(file_model, StorageConfig)
+    assert file_model.queryValue("PRAGMA freelist_count") == 0
+    assert file_model.queryValue("PRAGMA wal_checkpoint") == 0
+
+
+def test_storage_maintenance_runs_once_per_interval(model):
+    runs = []
+    maintenance = StorageMaintenance(lambda: runs.append(True), StorageConfig)
+    maintenance.setIdle(True)
+    assert maintenance.timer.isActive()
+    maintenance.setIdle(False)
+    assert not maintenance.timer.isActive()
+
+    maintenance.run()
+    maintenance.run()
+    assert runs == [True]
+
+
+def maintained(writer):
+    return any(
+        line.startswith("writer.maintenance: 1 ") for line in writer.stats.report()
+    )
+
+
+def test_storage_maintenance_runs_in_writer(db_path, file_model):
+    add_removed_image(file_model)
+    writer = ItemWriter(db_path)
+    writer.start()
+    writer.requestMaintenance()
+    deadline = time.monotonic() + 5
+    while not maintained(writer) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.stop()
+    assert maintained(writer)
+    assert file_model.queryValue("PRAGMA freelist_count") == 0
@@ -0,0 +1,112 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+from PySide6.QtCore import QByteArray, QEventLoop, QSize, QTimer
+from PySide6.QtGui import QColor, QImage
+from PySide6.QtSql import QSqlDatabase
+
+import infinitecopy.MimeFormats as formats
+from infinitecopy.ClipboardItemModelImageProvider import (
+    IMAGE_THREAD_COUNT,
+    ClipboardItemModelImageProvider,
+)
+from infinitecopy.Thumbnails import (
+    ThumbnailConfig,
+    Thumbnails,
+    encodeImage,
+    thumbnailSize,
+)
+
+
+def add_image(model, width, height):
+    image = QImage(width, height, QImage.Format_RGB32)
+    image.fill(QColor("red"))
+    model.beginTransaction()
+    model.addItemNoCommit({formats.mimePng: QByteArray(encodeImage(image))})
+    model.endTransaction()
+    return model.data(model.index(0), model.itemImageHashRole)
+
+
+def thumbnail_count(model):
+    return model.queryValue("SELECT count() FROM thumbnail")
+
+
+def test_thumbnail_size():
+    assert thumbnailSize(QSize(), ThumbnailConfig) == ThumbnailConfig.defaultSize
+    assert thumbnailSize(QSize(100, 0), ThumbnailConfig) == 128
+    assert thumbnailSize(QSize(10, 200), ThumbnailConfig) == 256
+    assert thumbnailSize(QSize(5000, 5000), ThumbnailConfig) == 1024
+
+
+def test_thumbnails_stored_and_cached(model):
+    imageHash = add_image(model, 2000, 1000)
+    thumbnails = Thumbnails()
+
+    image = thumbnails.thumbnail(model, imageHash, QSize(200, 200))
+    assert image.size() == QSize(256, 128)
+    assert thumbnail_count(model) == 1
+
+    assert thumbnails.thumbnail(model, imageHash, QSize(250, 250)) is image
+    assert thumbnails.thumbnail(model, imageHash, QSize()).size() == QSize(512, 256)
+    assert thumbnail_count(model) == 2
+
+    # Stored thumbnails are reused after the memory cache is dropped.
+    thumbnails = Thumbnails()
+    image = thumbnails.thumbnail(model, imageHash, QSize(200, 200))
+    assert image.size() == QSize(256, 128)
+    assert thumbnail_count(model) == 2
+
+    model.removeItems(0, 1)
+    assert thumbnail_count(model) == 0
+
+
+def test_thumbnails_small_image_not_stored(model):
+    imageHash = add_image(model, 20, 10)
+    thumbnails = Thumbnails()
+    image = thumbnails.thumbnail(model, imageHash, QSize(200, 200))
+    assert image.size() == QSize(20, 10)
+    assert thumbnail_count(model) == 0
+    assert thumbnails.thumbnail(model, "unknown", QSize(200, 200)).isNull()
+
+
+def test_image_hash_stays_with_item(model):
+    imageHash = add_image(model, 20, 10)
+    model.beginTransaction()
+    model.addItemNoCommit({formats.mimeText: QByteArray(b"test")})
+    model.endTransaction()
+    assert model.data(model.index(0), model.itemImageHashRole) == ""
+    assert model.data(model.index(1), model.itemImageHashRole) == imageHash
+
+
+def request_image(provider, imageHash, size):
+    response = provider.requestImageResponse(imageHash, size)
+    loop = QEventLoop()
+    response.finished.connect(loop.quit)
+    QTimer.singleShot(5000, loop.quit)
+    if response.image.isNull():
+        loop.exec()
+    return response.image
+
+
+def test_image_provider_loads_in_thread(file_model):
+    imageHash = add_image(file_model, 2000, 1000)
+    provider = ClipboardItemModelImageProvider(file_model)
+
+    image = request_image(provider, imageHash, QSize(100, 100))
+    assert image.size() == QSize(128, 64)
+    assert request_image(provider, imageHash, QSize(100, 100)) is image
+    provider.waitForDone()
+    assert thumbnail_count(file_model) == 1
+
+
+def image_connection_count():
+    return sum(name.startswith("images-") for name in QSqlDatabase.connectionNames())
+
+
+def test_image_provider_reuses_connections(file_model):
+    imageHash = add_image(file_model, 2000, 1000)
+    provider = ClipboardItemModelImageProvider(file_model)
+    count = image_connection_count()
+    for size in ThumbnailConfig.sizes:
+        assert not request_image(provider, imageHash, QSize(size, size)).isNull()
+    assert image_connection_count() - count <= IMAGE_THREAD_COUNT
+    provider.waitForDone()
+    assert image_connection_count() == count
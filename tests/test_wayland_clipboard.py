@@ -0,0 +1,126 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+import os
+
+from PySide6.QtCore import QByteArray, QCoreApplication, QDeadlineTimer
+from PySide6.QtGui import QGuiApplication
+
+import infinitecopy.MimeFormats as formats
+from infinitecopy.WaylandClipboard import (
+    LIST_TYPES,
+    ClipboardDataReader,
+    ProcessReader,
+    markOwnedData,
+)
+from infinitecopy.WaylandDataControl import PipeReader
+
+WAIT_TIMEOUT_MS = 5000
+
+
+def wait_until(condition):
+    deadline = QDeadlineTimer(WAIT_TIMEOUT_MS)
+    while not condition() and not deadline.hasExpired():
+        QCoreApplication.processEvents()
+    return condition()
+
+
+def pipe_reader(data=None):
+    readFd, writeFd = os.pipe()
+    if data is None:
+        return PipeReader(readFd, 100), writeFd
+    os.write(writeFd, data)
+    os.close(writeFd)
+    return PipeReader(readFd, 100), None
+
+
+def test_read_all_formats():
+    _qapp = QGuiApplication.instance() or QGuiApplication([])
+    text, _ = pipe_reader(b"TEXT")
+    empty, _ = pipe_reader(b"")
+    html, _ = pipe_reader(b"<b>HTML</b>")
+    reader = ClipboardDataReader(
+        {"text/plain": text, "text/html": html, "image/png": empty}, 10000
+    )
+    results = []
+    reader.finished.connect(results.append)
+    reader.start()
+
+    assert wait_until(lambda: results)
+    assert len(results) == 1
+    assert {k: bytes(v) for k, v in results[0].items()} == {
+        "text/plain": b"TEXT",
+        "text/html": b"<b>HTML</b>",
+    }
+
+
+def test_read_deadline():
+    _qapp = QGuiApplication.instance() or QGuiApplication([])
+    text, _ = pipe_reader(b"TEXT")
+    slow, writeFd = pipe_reader()
+    reader = ClipboardDataReader({"text/plain": text, "image/png": slow}, 100)
+    results = []
+    reader.finished.connect(results.append)
+    reader.start()
+
+    try:
+        assert wait_until(lambda: results)
+    finally:
+        os.close(writeFd)
+
+    assert len(results) == 1
+    assert {k: bytes(v) for k, v in results[0].items()} == {"text/plain": b"TEXT"}
+    assert slow.fd is None
+
+
+def test_read_no_formats():
+    _qapp = QGuiApplication.instance() or QGuiApplication([])
+    reader = ClipboardDataReader({}, 100)
+    results = []
+    reader.finished.connect(results.append)
+    reader.start()
+    assert results == [{}]
+
+
+def test_match_formats():
+    offered = ["text/plain", "image/png", "image/jpeg", "text/uri-list", "x-secret"]
+    assert formats.matchFormats(["text/plain", "image/*"], offered) == [
+        "text/plain",
+        "image/png",
+        "image/jpeg",
+    ]
+    assert formats.matchFormats(["text/html"], offered) == []
+    assert formats.formatsToRead(["text/plain"], offered) == ["text/plain"]
+    assert formats.formatsToRead(["text/plain"], [*offered, formats.mimeOwner]) == [
+        formats.mimeOwner
+    ]
+
+
+def test_process_reader(tmp_path, monkeypatch):
+    _qapp = QGuiApplication.instance() or QGuiApplication([])
+    script = tmp_path / "wl-paste"
+    script.write_text('#!/bin/sh\necho "$@"\n')
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}:{os.environ['PATH']}")
+
+    types = ProcessReader([LIST_TYPES, "--primary"], 100)
+    large = ProcessReader(["--type", "x" * 100], 100)
+    reader = ClipboardDataReader({"types": types, "large": large}, 10000)
+    results = []
+    reader.finished.connect(results.append)
+    reader.start()
+
+    assert wait_until(lambda: results)
+    assert {k: bytes(v) for k, v in results[0].items()} == {
+        "types": b"--list-types --primary"
+    }
+
+
+def test_mark_owned_data():
+    text = {formats.mimeText: QByteArray(b"TEXT")}
+    owned = (formats.mimeText, b"TEXT", b"HASH")
+    assert markOwnedData(text, None) is text
+    assert markOwnedData(text, (formats.mimeText, b"TEXT", None)) is text
+    assert markOwnedData(text, (formats.mimeText, b"OTHER", b"HASH")) is text
+    assert markOwnedData({formats.mimeHtml: QByteArray(b"TEXT")}, owned) == {
+        formats.mimeHtml: QByteArray(b"TEXT")
+    }
+    assert markOwnedData(text, owned) == {formats.mimeOwner: QByteArray(b"HASH")}
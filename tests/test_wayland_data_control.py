@@ -0,0 +1,239 @@
+# SPDX-License-Identifier: LGPL-2.0-or-later
+import os
+import socket
+import threading
+
+from PySide6.QtCore import QCoreApplication
+from PySide6.QtGui import QGuiApplication
+from pytest import fixture, raises
+
+import infinitecopy.WaylandDataControl as wl
+from infinitecopy.WaylandDataControl import (
+    MessageReader,
+    PipeReader,
+    WaylandDataControl,
+    WaylandError,
+    encodeMessage,
+    splitMessages,
+)
+
+MANAGER = "ext_data_control_manager_v1"
+
+
+class FakeCompositor:
+    """Serves registry and sync requests of a single client."""
+
+    def __init__(self, interfaces):
+        self.socket, self.clientSocket = socket.socketpair()
+        self.interfaces = interfaces
+        self.requests = []
+        self.fds = []
+        self.buffer = b""
+        self.managerId = None
+        self.sourceIds = {}
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+
+    def send(self, objectId, opcode, *args, fds=()):
+        message = encodeMessage(objectId, opcode, *args)
+        if fds:
+            socket.send_fds(self.socket, [message], list(fds))
+        else:
+            self.socket.sendall(message)
+
+    def serve(self):
+        while True:
+            try:
+                data, fds, _flags, _address = socket.recv_fds(self.socket, 4096, 4)
+            except OSError:
+                return
+            if not data:
+                return
+            self.fds.extend(fds)
+            messages, self.buffer = splitMessages(self.buffer + data)
+            for objectId, opcode, payload in messages:
+                self.handle(objectId, opcode, MessageReader(payload))
+
+    def handle(self, objectId, opcode, args):
+        self.requests.append((objectId, opcode))
+        if opcode == wl.SOURCE_OFFER and objectId in self.sourceIds:
+            self.sourceIds[objectId].append(args.string())
+        if objectId == self.managerId and opcode == wl.MANAGER_CREATE_DATA_SOURCE:
+            self.sourceIds[args.uint()] = []
+        if objectId != wl.DISPLAY_ID:
+            return
+        if opcode == wl.DISPLAY_GET_REGISTRY:
+            registryId = args.uint()
+            for name, (interface, version) in enumerate(self.interfaces, 1):
+                self.send(registryId, wl.REGISTRY_GLOBAL, name, interface, version)
+        elif opcode == wl.DISPLAY_SYNC:
+            self.send(args.uint(), wl.CALLBACK_DONE, 0)
+
+    def close(self):
+        self.socket.close()
+        self.thread.join()
+
+
+@fixture
+def compositor():
+    _qapp = QGuiApplication.instance() or QGuiApplication([])
+    compositor = FakeCompositor([("wl_seat", 7), (MANAGER, 1)])
+    try:
+        yield compositor
+    finally:
+        compositor.close()
+
+
+@fixture
+def data_control(compositor):
+    dataControl = WaylandDataControl(compositor.clientSocket)
+    dataControl.connectToDisplay()
+    compositor.managerId = dataControl.managerId
+    try:
+        yield dataControl
+    finally:
+        dataControl.close()
+
+
+def dispatch(data_control):
+    data_control.socket.setblocking(True)
+    data_control.readEvents()
+    data_control.socket.setblocking(False)
+
+
+def offer_selection(compositor, data_control, mime_types, primary=False):
+    offerId = 0xFF000000
+    compositor.send(data_control.deviceId, wl.DEVICE_DATA_OFFER, offerId)
+    for mime in mime_types:
+        compositor.send(offerId, wl.OFFER_OFFER, mime)
+    event = wl.DEVICE_PRIMARY_SELECTION if primary else wl.DEVICE_SELECTION
+    compositor.send(data_control.deviceId, event, offerId)
+    return offerId
+
+
+def test_message_encoding():
+    message = encodeMessage(3, 1, 42, "text/plain")
+    messages, rest = splitMessages(message + message[:5])
+    assert rest == message[:5]
+    assert len(messages) == 1
+
+    objectId, opcode, payload = messages[0]
+    assert (objectId, opcode) == (3, 1)
+    assert len(payload) % 4 == 0
+    args = MessageReader(payload)
+    assert args.uint() == 42
+    assert args.string() == "text/plain"
+
+
+def test_message_bad_size():
+    with raises(WaylandError):
+        splitMessages(encodeMessage(1, 0)[:4] + b"\0\0\0\0")
+
+
+def test_connect_without_data_control():
+    _qapp = QGuiApplication.instance() or QGuiApplication([])
+    compositor = FakeCompositor([("wl_seat", 7)])
+    dataControl = WaylandDataControl(compositor.clientSocket)
+    try:
+        with raises(WaylandError, match="data-control"):
+            dataControl.connectToDisplay()
+    finally:
+        dataControl.close()
+        compositor.close()
+
+
+def test_selection_offer(compositor, data_control):
+    changes = []
+    data_control.selectionChanged.connect(
+        lambda offer, primary: changes.append((offer.mimeTypes, primary))
+    )
+    offer_selection(compositor, data_control, ["text/plain", "image/png"])
+    dispatch(data_control)
+    assert changes == [(["text/plain", "image/png"], False)]
+
+
+def test_replaced_offer_is_destroyed(compositor, data_control):
+    offerId = offer_selection(compositor, data_control, ["text/plain"])
+    dispatch(data_control)
+    compositor.send(data_control.deviceId, wl.DEVICE_SELECTION, 0)
+    dispatch(data_control)
+    assert data_control.selections[False] is None
+
+    data_control.roundtrip()
+    assert (offerId, wl.OFFER_DESTROY) in compositor.requests
+
+
+def test_receive_offered_data(compositor, data_control):
+    offer_selection(compositor, data_control, ["text/plain"])
+    dispatch(data_control)
+
+    fd = data_control.receive(data_control.selections[False], "text/plain")
+    data_control.roundtrip()
+    writeFd = compositor.fds.pop()
+    os.write(writeFd, b"TEST")
+    os.close(writeFd)
+
+    result = []
+    reader = PipeReader(fd, 100)
+    reader.finished.connect(result.append)
+    reader.start()
+    reader.read()
+    assert result == [b"TEST"]
+
+
+def test_set_selection(compositor, data_control):
+    data = {"text/plain": b"TEXT", "image/png": b"IMAGE" * 100000}
+    data_control.setSelection(data)
+    data_control.roundtrip()
+
+    ((sourceId, mimeTypes),) = compositor.sourceIds.items()
+    assert mimeTypes == ["text/plain", "image/png"]
+    assert (data_control.deviceId, wl.DEVICE_SET_SELECTION) in compositor.requests
+
+    for mime, expected in data.items():
+        readFd, writeFd = os.pipe()
+        compositor.send(sourceId, wl.SOURCE_SEND, mime, fds=[writeFd])
+        os.close(writeFd)
+        dispatch(data_control)
+        received = []
+        reader = threading.Thread(
+            target=lambda fd=readFd: received.append(os.fdopen(fd, "rb").read())
+        )
+        reader.start()
+        while data_control.writers:
+            QCoreApplication.processEvents()
+        reader.join()
+        assert received == [expected]
+
+    compositor.send(sourceId, wl.SOURCE_CANCELLED)
+    dispatch(data_control)
+    data_control.roundtrip()
+    assert (sourceId, wl.SOURCE_DESTROY) in compositor.requests
+    assert not data_control.sources
+
+
+def test_pipe_reader_aborts_oversized_data():
+    readFd, writeFd = os.pipe()
+    os.write(writeFd, b"X" * 101)
+
+    result = []
+    reader = PipeReader(readFd, 100)
+    reader.finished.connect(result.append)
+    reader.start()
+    reader.read()
+    os.close(writeFd)
+    assert result == [b""]
+    assert reader.fd is None
+
+
+def test_device_finished(compositor, data_control):
+    closed = []
+    data_control.closed.connect(lambda: closed.append(True))
+    compositor.send(data_control.deviceId, wl.DEVICE_FINISHED)
+    data_control.socket.setblocking(True)
+    data_control.dispatch()
+    assert closed == [True]
+    assert data_control.socket is None
+
+    with raises(WaylandError, match="Not connected"):
+        data_control.setSelection({"text/plain": b"TEXT"})